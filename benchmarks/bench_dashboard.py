@@ -0,0 +1,98 @@
+"""
+Benchmark do dashboard (streamlit_app.py) sem navegador: mede o tempo de abertura e de
+cada interação com o AppTest do Streamlit e compara com o orçamento de latência.
+
+Gera contratos sintéticos ligados ao catálogo de órgãos de data/raw, grava
+contratos_limpos em Parquet e calcula os cubos numa pasta temporária. Termina com
+código 1 se alguma etapa estourar o orçamento ou se o app levantar exceção.
+
+Uso:
+    python benchmarks/bench_dashboard.py [--linhas 300000] [--orcamento-abertura 3] [--orcamento-interacao 0.5]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / 'src'))
+import analysis  # noqa: E402
+from bench_transform import gerar_contratos  # noqa: E402
+from storage import salvar_dataset  # noqa: E402
+from transform import transform_contratos  # noqa: E402
+
+
+def preparar_dados(linhas, catalogo, seed=42):
+    rng = np.random.default_rng(seed)
+    orgao = pd.read_csv(catalogo, dtype=str, encoding='utf-8')
+    salvar_dataset(orgao, 'orgao')
+    df = gerar_contratos(linhas, seed=seed)
+    # Órgãos do catálogo e 20 mil fornecedores recorrentes, como nos dados reais
+    df['codigoOrgao'] = rng.choice(orgao['codigoOrgao'].dropna().unique(), len(df))
+    fornecedores = rng.integers(10**13, 10**14, 20_000).astype(str)
+    df['niFornecedor'] = fornecedores[rng.integers(0, len(fornecedores), len(df))]
+    transform_contratos(df)
+    analysis.atualizar_cubos()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=300_000)
+    parser.add_argument('--catalogo', default=str(max((RAIZ / 'data' / 'raw').glob('orgao_*.csv'), default='')),
+                        help='Snapshot CSV do catálogo de órgãos')
+    parser.add_argument('--orcamento-abertura', type=float, default=3.0, help='Segundos para a primeira renderização')
+    parser.add_argument('--orcamento-interacao', type=float, default=0.5, help='Segundos por interação')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        preparar_dados(args.linhas, args.catalogo)
+        ano = int(analysis.gastos_por_trimestre()['ano'].max())
+        superior = analysis.gastos_por_orgao(ano=ano, nivel='nomeOrgaoSuperior', limite=1)['nomeOrgaoSuperior'][0]
+        # Abertura com o app novo: caches do Streamlit e cubos em memória vazios
+        analysis._cubos_em_memoria.clear()
+        app = AppTest.from_file(str(RAIZ / 'streamlit_app.py'), default_timeout=120)
+
+        medicoes = []
+        def medir(nome, acao, orcamento):
+            inicio = time.perf_counter()
+            acao()
+            app.run()
+            duracao = time.perf_counter() - inicio
+            medicoes.append((nome, duracao, orcamento))
+            if app.exception:
+                raise RuntimeError(f"{nome}: {app.exception[0].message}")
+
+        interacoes = [
+            ('filtrar ano', lambda: app.selectbox(key='ano').set_value(ano)),
+            ('filtrar esfera', lambda: app.multiselect(key='esfera').select(app.multiselect(key='esfera').options[0])),
+            ('agrupar por órgão', lambda: app.radio(key='nivel').set_value('Órgão')),
+            ('abrir órgão superior', lambda: app.selectbox(key='superior').set_value(superior)),
+            ('abrir órgão', lambda: app.selectbox(key='orgao').set_value(app.selectbox(key='orgao').options[0].split(' - ')[0])),
+            ('ver contratos', lambda: app.toggle(key='contratos').set_value(True)),
+            ('voltar para todos os anos', lambda: app.selectbox(key='ano').set_value('Todos')),
+            ('filtrar ano (em cache)', lambda: app.selectbox(key='ano').set_value(ano)),
+        ]
+        medir('abertura', lambda: None, args.orcamento_abertura)
+        for nome, acao in interacoes:
+            medir(nome, acao, args.orcamento_interacao)
+
+    print(f"{args.linhas:,} contratos sintéticos")
+    print(f"{'etapa':<28}{'tempo':>10}{'orçamento':>12}")
+    estourou = False
+    for nome, duracao, orcamento in medicoes:
+        estourou |= duracao > orcamento
+        print(f"{nome:<28}{duracao * 1000:>8.0f}ms{orcamento * 1000:>10.0f}ms{'  ESTOUROU' if duracao > orcamento else ''}")
+    sys.exit(1 if estourou else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark da decodificação das páginas da API: resposta -> lista de dicionários ->
+DataFrame (json ou orjson) vs. resposta -> colunas Arrow tipadas (decodificacao.py).
+
+Gera páginas de contratos sintéticos no formato da API ({"resultado": [...], ...},
+500 registros por página) e mede o tempo de decodificar todas e montar o DataFrame
+final, já com o esquema de contratos aplicado, além da memória desse DataFrame.
+
+Uso:
+    python benchmarks/bench_decodificacao.py [--paginas 200] [--repeticoes 3]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+from bench_transform import gerar_contratos  # noqa: E402
+from decodificacao import concatenar, orjson, pagina_para_tabela  # noqa: E402
+from schemas import aplicar_esquema  # noqa: E402
+
+TAMANHO_PAGINA = 500
+
+
+def gerar_paginas(paginas, seed=42):
+    df = gerar_contratos(paginas * TAMANHO_PAGINA, seed=seed).head(paginas * TAMANHO_PAGINA)
+    registros = json.loads(df.to_json(orient='records', force_ascii=False))
+    return [
+        json.dumps({'resultado': registros[i:i + TAMANHO_PAGINA], 'totalRegistros': len(registros),
+                    'totalPaginas': paginas}, ensure_ascii=False).encode('utf-8')
+        for i in range(0, len(registros), TAMANHO_PAGINA)
+    ]
+
+
+def por_dicionarios(loads):
+    def decodificar(paginas):
+        todos = []
+        for conteudo in paginas:
+            todos.extend(loads(conteudo)['resultado'])
+        return aplicar_esquema(pd.DataFrame(todos), 'contratos')
+    return decodificar
+
+
+def colunar(paginas):
+    return aplicar_esquema(concatenar([pagina_para_tabela(conteudo, 'contratos') for conteudo in paginas]), 'contratos')
+
+
+def medir(nome, funcao, paginas, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df = funcao(paginas)
+        tempos.append(time.perf_counter() - inicio)
+    duracao = min(tempos)
+    memoria = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{nome:<12}{duracao:>9.2f}s{duracao / len(paginas) * 1000:>12.1f}ms{memoria:>12.0f}MB")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paginas', type=int, default=200)
+    parser.add_argument('--repeticoes', type=int, default=3, help='Melhor tempo entre as repetições')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    paginas = gerar_paginas(args.paginas)
+    colunas = len(json.loads(paginas[0])['resultado'][0])
+    print(f"{len(paginas)} páginas de {TAMANHO_PAGINA} contratos, {colunas} colunas, "
+          f"{sum(map(len, paginas)) / 2**20:.0f}MB de JSON")
+    print(f"{'abordagem':<12}{'tempo':>10}{'por página':>14}{'memória':>14}")
+    base = medir('json', por_dicionarios(json.loads), paginas, args.repeticoes)
+    if orjson is not None:
+        medir('orjson', por_dicionarios(orjson.loads), paginas, args.repeticoes)
+    else:
+        print("orjson      não instalado (pip install orjson)")
+    duracao = medir('colunar', colunar, paginas, args.repeticoes)
+    print(f"colunar: {base / duracao:.1f}x mais rápido que json")
+
+
+if __name__ == '__main__':
+    main()
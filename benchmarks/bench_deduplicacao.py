@@ -0,0 +1,134 @@
+"""
+Benchmark da deduplicação de contratos por identidade (deduplicacao.py) contra os caminhos
+do notebook:
+
+- em memória: df.duplicated() sobre todas as colunas (só pega cópias idênticas) e
+  sort_values + drop_duplicates na identidade (órgão + UG + número + ano) vs.
+  marcar_duplicatas_contratos (chave de 64 bits + uma ordenação de dois inteiros);
+- incremental: um lote novo deduplicado relendo o histórico (colunas de identidade do
+  Parquet + concat + drop_duplicates) vs. IndiceContratos (índice compacto em disco,
+  busca binária e mesclagem).
+
+Gera contratos sintéticos com 10% de reenvios do mesmo contrato com dataHoraInclusao
+posterior (e valor alterado) e 1% de cópias idênticas. Os dois caminhos em memória são
+conferidos (mesmas linhas mantidas) antes dos tempos.
+
+Uso:
+    python benchmarks/bench_deduplicacao.py [--contratos 3000000] [--lote 100000]
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+from deduplicacao import COLUNAS_IDENTIDADE, IndiceContratos, marcar_duplicatas_contratos  # noqa: E402
+from schemas import TEXTO  # noqa: E402
+
+
+# 1. Contratos sintéticos
+def gerar_contratos(n, seed=42):
+    rng = np.random.default_rng(seed)
+    base = int(n / 1.11)
+    orgao = rng.integers(10_000, 99_999, base)
+    df = pd.DataFrame({
+        'codigoOrgao': orgao.astype(str),
+        'codigoUnidadeGestora': (orgao * 10 + rng.integers(0, 10, base)).astype(str),
+        'numeroContrato': pd.Series(rng.integers(1, 99_999, base)).astype(str).str.zfill(5) + '/'
+                          + rng.integers(2019, 2025, base).astype(str),
+        'dataVigenciaInicial': pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 6 * 365, base), unit='D'),
+        'valorGlobal': rng.lognormal(10, 2, base).round(2),
+        'objeto': 'Contrato ' + pd.Series(rng.integers(0, 1000, base)).astype(str),
+    })
+    df['dataHoraInclusao'] = df['dataVigenciaInicial'] + pd.Timedelta(hours=10)
+    reenvios = df.sample(frac=0.10, random_state=seed)
+    reenvios = reenvios.assign(dataHoraInclusao=reenvios['dataHoraInclusao'] + pd.Timedelta(days=30),
+                               valorGlobal=reenvios['valorGlobal'] * 1.1)
+    copias = df.sample(frac=0.01, random_state=seed + 1)
+    df = pd.concat([df, reenvios, copias], ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+    return df.astype({c: TEXTO for c in COLUNAS_IDENTIDADE + ['objeto']})
+
+
+# 2. Caminhos do notebook
+def por_identidade_pandas(df):
+    """Mantém a última versão de cada (órgão, UG, número, ano) com sort_values + drop_duplicates."""
+    identidade = df[COLUNAS_IDENTIDADE + ['dataHoraInclusao']].assign(ano=df['dataVigenciaInicial'].dt.year)
+    identidade = identidade.sort_values('dataHoraInclusao', kind='stable')
+    mantidas = identidade.drop_duplicates(COLUNAS_IDENTIDADE + ['ano'], keep='last').index
+    duplicata = np.ones(len(df), dtype=bool)
+    duplicata[mantidas] = False
+    return duplicata
+
+
+def incremental_relendo_historico(historico_parquet, lote):
+    """Relê a identidade de todo o histórico e descarta do lote o que já estava lá na mesma versão ou mais nova."""
+    colunas = COLUNAS_IDENTIDADE + ['dataVigenciaInicial', 'dataHoraInclusao']
+    historico = pd.read_parquet(historico_parquet, columns=colunas)
+    juntos = pd.concat([historico.assign(novo=False), lote[colunas].assign(novo=True)], ignore_index=True)
+    juntos['ano'] = juntos['dataVigenciaInicial'].dt.year
+    # Na mesma versão o histórico prevalece: a cópia reenviada não é nova
+    juntos = juntos.sort_values(['dataHoraInclusao', 'novo'], ascending=[True, False], kind='stable')
+    mantidas = juntos.drop_duplicates(COLUNAS_IDENTIDADE + ['ano'], keep='last')
+    return int(mantidas['novo'].sum()), historico.memory_usage(deep=True).sum()
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contratos', type=int, default=3_000_000)
+    parser.add_argument('--lote', type=int, default=100_000, help='Contratos do lote incremental')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = gerar_contratos(args.contratos)
+    print(f"{len(df):,} contratos sintéticos, {df.memory_usage(deep=True).sum() / 2**20:.0f}MB em memória")
+
+    t_duplicated, duplicated = medir(lambda: df.duplicated(keep='first').to_numpy())
+    t_pandas, por_pandas = medir(lambda: por_identidade_pandas(df))
+    t_chave, por_chave = medir(lambda: marcar_duplicatas_contratos(df.copy(deep=False))['flag_duplicata'].to_numpy())
+    assert (por_pandas == por_chave).all(), "Deduplicação por chave diverge de drop_duplicates"
+
+    print(f"\n{'em memória':<34}{'tempo':>10}{'duplicatas':>14}")
+    print(f"{'df.duplicated() (linha inteira)':<34}{t_duplicated:>9.2f}s{int(duplicated.sum()):>14,}")
+    print(f"{'sort_values + drop_duplicates':<34}{t_pandas:>9.2f}s{int(por_pandas.sum()):>14,}")
+    print(f"{'chave de 64 bits':<34}{t_chave:>9.2f}s{int(por_chave.sum()):>14,}")
+
+    # Histórico = tudo menos o último lote; o lote mistura contratos novos e reenvios
+    historico, lote = df.iloc[:-args.lote], df.iloc[-args.lote:]
+    with tempfile.TemporaryDirectory() as pasta:
+        historico_parquet = Path(pasta) / 'historico.parquet'
+        historico.to_parquet(historico_parquet, index=False)
+        caminho_indice = Path(pasta) / 'chaves_contratos.parquet'
+        indice = IndiceContratos()
+        indice.atualizar(historico)
+        indice.gravar(caminho_indice)
+
+        t_releitura, (novos_releitura, memoria_releitura) = medir(
+            lambda: incremental_relendo_historico(historico_parquet, lote))
+
+        def pelo_indice():
+            indice = IndiceContratos.ler(caminho_indice)
+            duplicata, _, _ = indice.atualizar(lote)
+            indice.gravar(caminho_indice)
+            return int((~duplicata).sum()), indice.nbytes
+        t_indice, (novos_indice, memoria_indice) = medir(pelo_indice)
+    assert novos_releitura == novos_indice, "Lote incremental diverge da releitura do histórico"
+
+    print(f"\n{f'lote de {args.lote:,} sobre {len(historico):,}':<34}{'tempo':>10}{'memória':>12}{'mantidos':>12}")
+    print(f"{'relendo o histórico':<34}{t_releitura:>9.2f}s{memoria_releitura / 2**20:>10.0f}MB{novos_releitura:>12,}")
+    print(f"{'índice de chaves':<34}{t_indice:>9.2f}s{memoria_indice / 2**20:>10.0f}MB{novos_indice:>12,}")
+    print(f"índice: {t_releitura / t_indice:.1f}x mais rápido, {memoria_releitura / memoria_indice:.0f}x menos memória")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark da validação de CPF/CNPJ (documentos.py): normalização, zeros à esquerda,
+classificação e dígitos verificadores de milhões de identificadores de uma vez vs. o
+laço Python por identificador (re.sub + len(ni) <= 11 + módulo 11 em Python).
+
+Gera identificadores sintéticos no formato em que chegam da API e das planilhas: metade
+CPF e metade CNPJ, parte com pontuação (529.982.247-25, 11.222.333/0001-81), parte de
+CPFs sem os zeros à esquerda, 5% com verificador errado e 1% vazios. O laço Python roda
+só em uma amostra (o tempo total é extrapolado) e serve de referência para conferir
+o resultado vetorizado.
+
+Uso:
+    python benchmarks/bench_documentos.py [--documentos 10000000] [--amostra 200000]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+from documentos import analisar_documentos  # noqa: E402
+
+PESOS_CPF = (list(range(10, 1, -1)), list(range(11, 1, -1)))
+PESOS_CNPJ = ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+
+# 1. Identificadores sintéticos
+def _verificador(digitos, pesos):
+    resto = (digitos[:, :len(pesos)] @ np.array(pesos)) % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+def _pontuar(texto, cortes, separadores):
+    partes = [pc.utf8_slice_codeunits(texto, inicio, fim) for inicio, fim in zip([0] + cortes, cortes + [None])]
+    intercalado = [partes[0]]
+    for separador, parte in zip(separadores, partes[1:]):
+        intercalado += [pa.scalar(separador), parte]
+    return pc.binary_join_element_wise(*intercalado, '')
+
+def gerar_documentos(n, seed=42):
+    rng = np.random.default_rng(seed)
+    digitos = rng.integers(0, 10, (n, 14))
+    cnpj = rng.random(n) < 0.5
+    # CNPJ: 12 dígitos + 2 verificadores; CPF: 9 dígitos + 2 verificadores nas 11 últimas posições
+    digitos[:, 12] = _verificador(digitos, PESOS_CNPJ[0])
+    digitos[:, 13] = _verificador(digitos, PESOS_CNPJ[1])
+    cpf = digitos[~cnpj, 3:]
+    cpf[:, 9] = _verificador(cpf, PESOS_CPF[0])
+    cpf[:, 10] = _verificador(cpf, PESOS_CPF[1])
+    digitos[~cnpj, 3:] = cpf
+    errado = rng.random(n) < 0.05
+    digitos[errado, 13] = (digitos[errado, 13] + 1) % 10
+
+    texto = pa.StringArray.from_buffers(n, pa.py_buffer(np.arange(n + 1, dtype=np.int32) * 14),
+                                        pa.py_buffer((digitos + ord('0')).astype(np.uint8)))
+    texto = pc.if_else(pa.array(cnpj), texto, pc.utf8_slice_codeunits(texto, 3))
+    sorteio = rng.random(n)
+    pontuado_cnpj = _pontuar(texto, [2, 5, 8, 12], ['.', '.', '/', '-'])
+    pontuado_cpf = _pontuar(texto, [3, 6, 9], ['.', '.', '-'])
+    texto = pc.if_else(pa.array(sorteio < 1 / 3), pc.if_else(pa.array(cnpj), pontuado_cnpj, pontuado_cpf), texto)
+    # CPFs lidos como número perdem os zeros à esquerda
+    sem_zeros = pa.array(~cnpj & (sorteio > 0.9))
+    texto = pc.if_else(sem_zeros, pc.utf8_ltrim(texto, '0'), texto)
+    texto = pc.if_else(pa.array(rng.random(n) < 0.01), pa.scalar(None, pa.string()), texto)
+    return pd.Series(pd.arrays.ArrowStringArray(texto))
+
+
+# 2. Referência: um identificador por vez
+def _confere(ni, pesos):
+    for posicao, peso in zip((len(pesos[0]), len(pesos[1])), pesos):
+        resto = sum(int(d) * p for d, p in zip(ni, peso)) % 11
+        if int(ni[posicao]) != (0 if resto < 2 else 11 - resto):
+            return False
+    return len(set(ni)) > 1
+
+def por_registro(valores):
+    documentos, validos = [], []
+    for valor in valores:
+        ni = re.sub(r'[^\d]', '', valor) if isinstance(valor, str) else ''
+        if ni and len(ni) <= 11 and _confere(ni.zfill(11), PESOS_CPF):
+            ni, valido = ni.zfill(11), True
+        elif ni and len(ni) <= 14 and _confere(ni.zfill(14), PESOS_CNPJ):
+            ni, valido = ni.zfill(14), True
+        else:
+            valido = False
+        documentos.append(ni or None)
+        validos.append(valido)
+    return documentos, np.array(validos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documentos', type=int, default=10_000_000)
+    parser.add_argument('--amostra', type=int, default=200_000, help='Identificadores validados pelo laço Python')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    valores = gerar_documentos(args.documentos)
+    print(f"{args.documentos:,} identificadores gerados em {time.perf_counter() - inicio:.1f}s")
+
+    amostra = valores.head(args.amostra).tolist()
+    inicio = time.perf_counter()
+    documentos, validos = por_registro(amostra)
+    laco = (time.perf_counter() - inicio) * args.documentos / len(amostra)
+
+    inicio = time.perf_counter()
+    analise = analisar_documentos(valores)
+    vetorizado = time.perf_counter() - inicio
+
+    conferido = analise.head(len(amostra))
+    assert (conferido['valido'].to_numpy() == validos).all(), "Validação diverge do laço Python"
+    assert (conferido.loc[validos, 'documento'].to_numpy() == np.array(documentos, dtype=object)[validos]).all(), \
+        "Normalização diverge do laço Python"
+
+    tipos = analise['tipo'].value_counts()
+    print(f"{tipos.get('CPF', 0):,} CPFs e {tipos.get('CNPJ', 0):,} CNPJs válidos, "
+          f"{int((~analise['valido']).sum()):,} inválidos ou vazios")
+    print(f"{'abordagem':<22}{'tempo':>10}{'ids/s':>14}")
+    print(f"{'laço Python (estim.)':<22}{laco:>9.1f}s{args.documentos / laco:>14,.0f}")
+    print(f"{'vetorizado':<22}{vetorizado:>9.1f}s{args.documentos / vetorizado:>14,.0f}")
+    print(f"vetorizado: {laco / vetorizado:.0f}x mais rápido")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Suíte de benchmarks da extração contra a API simulada (benchmarks/mock_api.py).
+
+Roda cada modo de extração em cada cenário (sem falhas, com erros 503, com 429) e
+reporta registros/s, páginas/s, retries, erros, 429 e percentis de latência vistos pelo
+cliente (src/metricas.py). Cada modo recebe um servidor novo com a mesma semente, então
+todos enfrentam a mesma sequência de latências e falhas. O cache HTTP fica desligado.
+
+Para comparar mudanças pelos números:
+    python benchmarks/bench_extracao.py --json antes.json
+    (aplica a mudança)
+    python benchmarks/bench_extracao.py --comparar antes.json
+
+Uso:
+    python benchmarks/bench_extracao.py [--cenarios limpo,erros,throttle] [--modos serial,concorrente]
+                                        [--latencia 0.05] [--contratos 20000] [--rps-maximo 12]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import extract  # noqa: E402
+import metricas  # noqa: E402
+from extract import (endpoint_contratos, endpoint_orgao, endpoint_uasg, extract_contratos_particionado,  # noqa: E402
+                     extract_data, extract_uasg, iter_contratos_particionado)
+from mock_api import ApiSimulada, carregar_fixtures  # noqa: E402
+
+# Sem cache HTTP: cada execução mede requisições reais ao servidor local
+extract.USAR_CACHE_HTTP = False
+
+ANO = 2024
+CENARIOS = {
+    'limpo': {},
+    'erros': {'taxa_erros': 0.05},
+    'throttle': {'taxa_429': 0.05, 'retry_after': 0.5},
+}
+PARAMS_ORGAO = {'statusOrgao': 'true', 'tamanhoPagina': 500}
+MODOS = {
+    'serial': lambda url: extract_data(url, endpoint_orgao, params=PARAMS_ORGAO, max_workers=1),
+    'concorrente': lambda url: extract_data(url, endpoint_orgao, params=PARAMS_ORGAO),
+    'uasg': lambda url: extract_uasg(url, endpoint_uasg, save=False),
+    'contratos_janelas': lambda url: extract_contratos_particionado(url, endpoint_contratos, save=False,
+                                                                    ano=ANO, checkpoint=False),
+    'contratos_stream': lambda url: [c for pagina in iter_contratos_particionado(url, endpoint_contratos, ano=ANO,
+                                                                                 checkpoint=False) for c in pagina],
+}
+COLUNAS = [('registros', 11, ',.0f'), ('tempo_s', 9, '.2f'), ('registros_s', 13, ',.0f'), ('paginas_s', 11, '.1f'),
+           ('retries', 9, 'd'), ('erros', 7, 'd'), ('throttles', 11, 'd'),
+           ('p50_ms', 8, '.0f'), ('p90_ms', 8, '.0f'), ('p99_ms', 8, '.0f')]
+
+
+def medir(modo, fixtures, cenario, args):
+    servidor = ApiSimulada(fixtures, latencia=args.latencia, dispersao=args.dispersao, **CENARIOS[cenario]).iniciar()
+    metricas.reiniciar()
+    inicio = time.perf_counter()
+    try:
+        registros, erro = len(MODOS[modo](servidor.url)), None
+    except Exception as e:
+        registros, erro = 0, str(e)
+    duracao = time.perf_counter() - inicio
+    servidor.shutdown()
+    servidor.server_close()
+
+    http = {}
+    for est in metricas.relatorio()['endpoints'].values():
+        http = est if not http else {k: http.get(k, 0) + v for k, v in est.items()}
+    return {
+        'cenario': cenario, 'modo': modo, 'registros': registros, 'tempo_s': duracao,
+        'registros_s': registros / duracao, 'paginas_s': http.get('paginas', 0) / duracao,
+        'retries': http.get('retries', 0), 'erros': http.get('erros', 0), 'throttles': http.get('throttles', 0),
+        'p50_ms': http.get('latencia_p50', 0) * 1000, 'p90_ms': http.get('latencia_p90', 0) * 1000,
+        'p99_ms': http.get('latencia_p99', 0) * 1000, 'erro': erro,
+    }
+
+
+def cabecalho():
+    print(f"{'cenário':<10}{'modo':<19}" + ''.join(f"{nome:>{largura}}" for nome, largura, _ in COLUNAS))
+
+
+def imprimir(r, anterior=None):
+    linha = f"{r['cenario']:<10}{r['modo']:<19}" + ''.join(f"{r[nome]:>{largura}{fmt}}" for nome, largura, fmt in COLUNAS)
+    if anterior and anterior['registros_s'] and anterior['p99_ms']:
+        linha += (f"  vazão {r['registros_s'] / anterior['registros_s'] - 1:+.0%}"
+                  f", p99 {r['p99_ms'] / anterior['p99_ms'] - 1:+.0%}")
+    print(linha + (f"  FALHOU: {r['erro']}" if r['erro'] else ''), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cenarios', default=','.join(CENARIOS), help=f"Entre {', '.join(CENARIOS)}")
+    parser.add_argument('--modos', default=','.join(MODOS), help=f"Entre {', '.join(MODOS)}")
+    parser.add_argument('--latencia', type=float, default=0.05, help='Latência mediana do servidor (s)')
+    parser.add_argument('--dispersao', type=float, default=0.5, help='Desvio do log da latência (cauda)')
+    parser.add_argument('--contratos', type=int, default=20_000, help='Contratos sintéticos servidos')
+    parser.add_argument('--rps-maximo', type=float, default=extract.REQUISICOES_POR_SEGUNDO_MAXIMO,
+                        help='Teto do limitador adaptativo (padrão: o do pipeline)')
+    parser.add_argument('--json', help='Grava os resultados neste arquivo')
+    parser.add_argument('--comparar', help='Resultados anteriores (--json) para mostrar a variação')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    extract.REQUISICOES_POR_SEGUNDO_MAXIMO = args.rps_maximo
+    fixtures = carregar_fixtures(contratos=args.contratos, ano=ANO)
+    print(', '.join(f"{endpoint.split('/')[-1]}: {len(df):,}" for endpoint, df in fixtures.items())
+          + f" | latência {args.latencia * 1000:.0f}ms, teto {args.rps_maximo:g} req/s")
+
+    anteriores = json.loads(Path(args.comparar).read_text(encoding='utf-8')) if args.comparar else []
+    anteriores = {(r['cenario'], r['modo']): r for r in anteriores}
+    resultados = []
+    cabecalho()
+    with tempfile.TemporaryDirectory() as pasta:
+        diretorio = os.getcwd()
+        os.chdir(pasta)  # Checkpoints das extrações vão para a pasta temporária
+        try:
+            for cenario in args.cenarios.split(','):
+                for modo in args.modos.split(','):
+                    resultados.append(medir(modo, fixtures, cenario, args))
+                    imprimir(resultados[-1], anteriores.get((cenario, modo)))
+        finally:
+            os.chdir(diretorio)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
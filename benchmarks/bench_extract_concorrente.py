@@ -0,0 +1,95 @@
+"""
+Benchmark da extração paginada: loop serial vs. busca concorrente de páginas.
+
+Sobe um servidor HTTP local que imita a paginação da API (com latência
+artificial por página) e mede páginas/segundo do extract_data com
+max_workers=1 (serial) e com várias páginas em voo.
+
+Uso:
+    python benchmarks/bench_extract_concorrente.py [--paginas 40] [--latencia 0.2] [--workers 8]
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import extract  # noqa: E402
+from extract import extract_data  # noqa: E402
+
+# Sem cache HTTP: cada execução mede requisições reais ao servidor local
+extract.USAR_CACHE_HTTP = False
+
+
+def criar_handler(total_registros, latencia):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            pagina = int(query.get('pagina', ['1'])[0])
+            tamanho = int(query.get('tamanhoPagina', ['500'])[0])
+            time.sleep(latencia)
+
+            inicio = (pagina - 1) * tamanho
+            fim = min(inicio + tamanho, total_registros)
+            resultado = [{'id': i, 'numeroContrato': f'{i:08d}'} for i in range(inicio, fim)]
+            corpo = json.dumps({'resultado': resultado}).encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def medir(base_url, endpoint, max_workers, requisicoes_por_segundo):
+    inicio = time.perf_counter()
+    dados = extract_data(base_url, endpoint, params={'tamanhoPagina': 500},
+                         max_workers=max_workers, requisicoes_por_segundo=requisicoes_por_segundo)
+    duracao = time.perf_counter() - inicio
+    return len(dados), duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paginas', type=int, default=40, help='Páginas completas servidas pelo stub')
+    parser.add_argument('--latencia', type=float, default=0.2, help='Latência por página (s)')
+    parser.add_argument('--workers', type=int, default=8, help='Páginas em voo no modo concorrente')
+    parser.add_argument('--rps', type=float, default=50.0, help='Orçamento de requisições por segundo')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    total_registros = args.paginas * 500 + 123  # última página incompleta
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), criar_handler(total_registros, args.latencia))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{servidor.server_port}/'
+    endpoint = 'modulo-contratos/1_consultarContratos'
+
+    try:
+        print(f"Stub: {args.paginas + 1} páginas, latência {args.latencia}s, orçamento {args.rps} req/s")
+        resultados = {}
+        for nome, workers in [('serial', 1), ('concorrente', args.workers)]:
+            registros, duracao = medir(base_url, endpoint, workers, args.rps)
+            assert registros == total_registros, f"{nome}: {registros} != {total_registros}"
+            paginas_por_segundo = (args.paginas + 1) / duracao
+            resultados[nome] = paginas_por_segundo
+            print(f"{nome:<12} workers={workers:<3} {duracao:6.2f}s  {paginas_por_segundo:6.2f} páginas/s")
+        print(f"Ganho: {resultados['concorrente'] / resultados['serial']:.1f}x")
+    finally:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark do índice da hierarquia de órgãos (hierarquia.py) contra o caminho por
+DataFrames que ele substitui:
+
+- cadeia de ancestrais: merges repetidos dos contratos com o catálogo, um por nível,
+  vs. HierarquiaOrgaos.ancestrais (uma consulta na matriz de caminhos);
+- roll-up "todos os contratos sob um órgão": filtros recursivos no catálogo até
+  esgotar os subordinados + isin vs. HierarquiaOrgaos.subordinado_a (comparação de
+  intervalos do percurso em profundidade);
+- roll-up de todos os órgãos de um nível (ex.: cada estado, profundidade 2): o mesmo,
+  repetido por órgão, com as posições dos contratos no índice calculadas uma só vez.
+
+Os contratos sintéticos recebem códigos de órgão sorteados do catálogo de data/raw.
+Os dois caminhos são conferidos (mesmos ancestrais e mesma máscara) antes dos tempos.
+
+Uso:
+    python benchmarks/bench_hierarquia.py [--contratos 2000000] [--orgao 'ESP-ESTADO DE SÃO PAULO'] [--nivel 2]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / 'src'))
+from hierarquia import HierarquiaOrgaos  # noqa: E402
+from schemas import TEXTO, aplicar_esquema  # noqa: E402
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def pais_do_catalogo(hierarquia):
+    """Tabela código -> pai, como sairia de um merge do catálogo com ele mesmo."""
+    pai = np.append(hierarquia.codigos.to_numpy(), None)[hierarquia.pai]
+    return pd.DataFrame({'codigoOrgao': hierarquia.codigos.astype(TEXTO), 'pai': pd.array(pai, dtype=TEXTO)})
+
+
+def ancestrais_por_merges(codigos, pais):
+    """Sobe um nível por merge até nenhum contrato ter pai; colunas do órgão até a raiz."""
+    niveis = [codigos.to_frame('codigoOrgao').reset_index(drop=True)['codigoOrgao']]
+    while niveis[-1].notna().any():
+        atual = niveis[-1].to_frame('codigoOrgao').merge(pais, on='codigoOrgao', how='left')
+        niveis.append(atual['pai'])
+    return pd.concat(niveis[:-1], axis=1, ignore_index=True)
+
+
+def subordinados_recursivos(pais, raiz):
+    """Códigos sob `raiz`, filtrando o catálogo pelos filhos do nível anterior até esgotar."""
+    subordinados = fronteira = {raiz}
+    while fronteira:
+        fronteira = set(pais.loc[pais['pai'].isin(fronteira), 'codigoOrgao']) - subordinados
+        subordinados = subordinados | fronteira
+    return subordinados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contratos', type=int, default=2_000_000)
+    parser.add_argument('--orgao', default='ESP-ESTADO DE SÃO PAULO', help='Órgão do roll-up (código ou nome)')
+    parser.add_argument('--nivel', type=int, default=2, help='Profundidade dos órgãos do roll-up por nível')
+    parser.add_argument('--catalogo', default=str(max((RAIZ / 'data' / 'raw').glob('orgao_*.csv'), default='')),
+                        help='Snapshot CSV do catálogo de órgãos')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Melhor tempo entre as repetições')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    orgao = aplicar_esquema(pd.read_csv(args.catalogo, dtype=str, encoding='utf-8'), 'orgao')
+    inicio = time.perf_counter()
+    hierarquia = HierarquiaOrgaos(orgao)
+    construcao = time.perf_counter() - inicio
+    rng = np.random.default_rng(42)
+    codigos = pd.Series(rng.choice(orgao['codigoOrgao'].dropna().to_numpy(dtype=object), args.contratos), dtype=TEXTO)
+    pais = pais_do_catalogo(hierarquia)
+    raiz = hierarquia.codigos[hierarquia.resolver(args.orgao)]
+    print(f"{len(hierarquia):,} órgãos, profundidade máxima {hierarquia.caminho.shape[1] - 1}, "
+          f"índice construído em {construcao * 1000:.0f}ms; {args.contratos:,} contratos")
+
+    t_merges, por_merges = medir(lambda: ancestrais_por_merges(codigos, pais), args.repeticoes)
+    t_indice, por_indice = medir(lambda: hierarquia.ancestrais(codigos), args.repeticoes)
+    # Merges vão do órgão para a raiz; o índice, da raiz para o órgão
+    profundidade = por_merges.notna().sum(axis=1).to_numpy()
+    raizes = por_merges.to_numpy(dtype=object)[np.arange(len(por_merges)), profundidade - 1]
+    assert (raizes == por_indice['nivel_0'].to_numpy()).all(), "Raízes divergentes"
+
+    t_recursivo, mascara_recursiva = medir(
+        lambda: codigos.isin(subordinados_recursivos(pais, raiz)).to_numpy(), args.repeticoes)
+    t_intervalo, mascara_intervalo = medir(lambda: hierarquia.subordinado_a(codigos, raiz), args.repeticoes)
+    assert (mascara_recursiva == mascara_intervalo).all(), "Roll-ups divergentes"
+
+    no_nivel = hierarquia.codigos[hierarquia.profundidade == args.nivel]
+    def rollup_recursivo():
+        return [codigos.isin(subordinados_recursivos(pais, codigo)).to_numpy() for codigo in no_nivel]
+    def rollup_indice():
+        posicoes = hierarquia.posicoes(codigos)
+        return [hierarquia.subordinado_a(None, codigo, posicoes=posicoes) for codigo in no_nivel]
+    t_nivel_recursivo, por_recursao = medir(rollup_recursivo, 1)
+    t_nivel_indice, por_intervalo = medir(rollup_indice, args.repeticoes)
+    assert all((a == b).all() for a, b in zip(por_recursao, por_intervalo)), "Roll-ups por nível divergentes"
+
+    print(f"{'consulta':<34}{'DataFrames':>12}{'índice':>10}{'ganho':>8}")
+    print(f"{'cadeia de ancestrais':<34}{t_merges:>11.2f}s{t_indice:>9.2f}s{t_merges / t_indice:>7.1f}x")
+    print(f"{f'contratos sob {args.orgao}'[:33]:<34}{t_recursivo:>11.2f}s{t_intervalo:>9.2f}s"
+          f"{t_recursivo / t_intervalo:>7.1f}x  ({int(mascara_intervalo.sum()):,} contratos)")
+    print(f"{f'roll-up de {len(no_nivel)} órgãos do nível {args.nivel}':<34}{t_nivel_recursivo:>11.2f}s"
+          f"{t_nivel_indice:>9.2f}s{t_nivel_recursivo / t_nivel_indice:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark da carga de contratos no SQLite: DataFrame.to_sql (INSERT por linha,
+com a chave única criada antes) vs. load.carregar_tabela (staging sem índices,
+upsert em uma transação e índices criados depois dos dados).
+
+Uso:
+    python benchmarks/bench_load.py [--linhas 200000] [--banco sqlite]
+"""
+import argparse
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import load  # noqa: E402
+from bench_transform import gerar_contratos  # noqa: E402
+from transform import transform_contratos  # noqa: E402
+
+
+def carga_to_sql(df, arquivo):
+    conexao = sqlite3.connect(arquivo)
+    df.head(0).to_sql('contratos', conexao, index=False)
+    conexao.execute('CREATE UNIQUE INDEX ux ON contratos ("codigoUnidadeGestora", "numeroContrato")')
+    for i in range(len(df)):
+        df.iloc[[i]].to_sql('contratos', conexao, index=False, if_exists='append')
+    conexao.commit()
+    conexao.close()
+
+
+def medir(nome, funcao, linhas):
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<26}{duracao:>10.2f}s{linhas / duracao:>14,.0f} linhas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=200_000)
+    parser.add_argument('--banco', default='sqlite', choices=['sqlite', 'duckdb'])
+    parser.add_argument('--amostra-to-sql', type=int, default=2000,
+                        help='Linhas carregadas com to_sql linha a linha (compare a vazão)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = transform_contratos(gerar_contratos(args.linhas), save=False)
+    df = df[~df['flag_duplicata']]  # Uma versão por contrato (mesma identidade da chave de carga)
+    print(f"{len(df):,} contratos limpos")
+    print(f"{'abordagem':<26}{'tempo':>11}{'vazão':>16}")
+    with tempfile.TemporaryDirectory() as pasta:
+        amostra = df.head(args.amostra_to_sql)
+        medir(f"to_sql ({len(amostra)} linhas)", lambda: carga_to_sql(amostra, Path(pasta) / 'to_sql.sqlite'), len(amostra))
+        backend = load.BANCOS[args.banco]
+        backend.arquivo = Path(pasta) / f"carga.{args.banco}"
+        medir('carregar_tabela', lambda: load.carregar_tabela(df, 'contratos', banco=args.banco), len(df))
+        medir('carregar_tabela (upsert)', lambda: load.carregar_tabela(df, 'contratos', banco=args.banco), len(df))
+
+
+if __name__ == '__main__':
+    main()
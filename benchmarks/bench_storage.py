@@ -0,0 +1,62 @@
+"""
+Benchmark de armazenamento: CSV vs. Parquet para um snapshot de órgãos.
+
+Compara tamanho em disco e tempo de recarga (completa e com projeção de colunas)
+usando um dos snapshots de data/raw/orgao_*.csv, replicado para simular volumes maiores.
+
+Uso:
+    python benchmarks/bench_storage.py [--arquivo data/raw/orgao_2025-08-29.csv] [--replicas 10]
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import storage  # noqa: E402
+
+
+def tamanho_em_disco(caminho):
+    caminho = Path(caminho)
+    if caminho.is_file():
+        return caminho.stat().st_size
+    return sum(p.stat().st_size for p in caminho.rglob('*') if p.is_file())
+
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--arquivo', default='data/raw/orgao_2025-08-29.csv')
+    parser.add_argument('--replicas', type=int, default=10, help='Quantas vezes o snapshot é replicado')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    base = pd.read_csv(args.arquivo, encoding='utf-8', low_memory=False)
+    df = pd.concat([base] * args.replicas, ignore_index=True)
+    colunas = ['codigoOrgao', 'nomeOrgao', 'esfera']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.CAMADAS['raw'] = Path(tmp)
+        print(f"{len(df):,} registros, {df.shape[1]} colunas")
+        print(f"{'formato':<9}{'disco':>12}{'leitura':>12}{'projeção':>12}")
+        for formato in ('csv', 'parquet'):
+            caminho = storage.salvar_dataset(df, 'orgao', formato=formato)
+            completo = cronometrar(lambda: storage.ler_dataset('orgao', formato=formato))
+            projecao = cronometrar(lambda: storage.ler_dataset('orgao', colunas=colunas, formato=formato))
+            print(f"{formato:<9}{tamanho_em_disco(caminho) / 1e6:>10.2f}MB{completo:>11.3f}s{projecao:>11.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark da limpeza de contratos: regras do notebook (apply por linha, loops por
+coluna, cópias do DataFrame) vs. transform_contratos vetorizado.
+
+Gera um DataFrame sintético de contratos com o mesmo formato da API (textos com
+espaços e caixa irregular, URLs em nomeSubcategoria, duplicatas, valores extremos)
+e mede tempo e memória final de cada abordagem.
+
+Uso:
+    python benchmarks/bench_transform.py [--linhas 1000000] [--sem-notebook]
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+from transform import transform_contratos  # noqa: E402
+
+MODALIDADES = ['Pregão', 'Dispensa', 'Inexigibilidade', 'Não se Aplica', 'Concorrência', ' pregão ', 'DISPENSA']
+CATEGORIAS = ['Compras', 'Serviços', 'Obras', 'Serviços de Engenharia', 'Locação Imóveis', 'Cessão']
+PALAVRAS = ['aquisição', 'de', 'material', 'serviço', 'manutenção', 'predial', 'limpeza', 'equipamentos',
+            'informática', 'locação', 'veículos', 'consultoria', 'obra', 'reforma', 'ESCOLA', 'Hospital']
+
+
+def gerar_contratos(linhas, seed=42):
+    rng = np.random.default_rng(seed)
+    orgaos = [f"  ministério {i} " if i % 3 else f"MINISTERIO DO ORGAO {i}" for i in range(300)]
+    unidades = [f"unidade gestora {i}" for i in range(3000)]
+    objetos = np.array([' '.join(rng.choice(PALAVRAS, 8)) for _ in range(50_000)], dtype=object)
+    fornecedores = np.array([f" fornecedor {i} ltda" for i in range(100_000)], dtype=object)
+    inicio = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 366, linhas), unit='D')
+    modalidade = rng.choice(MODALIDADES, linhas)
+    sem_compra = modalidade == 'Não se Aplica'
+    valor = np.round(rng.lognormal(10, 2, linhas), 2)
+    valor[rng.random(linhas) < 0.001] *= -1
+
+    df = pd.DataFrame({
+        'codigoOrgao': rng.integers(20000, 99999, linhas).astype(str),
+        'nomeOrgao': np.array(orgaos, dtype=object)[rng.integers(0, len(orgaos), linhas)],
+        'codigoUnidadeGestora': rng.integers(100000, 999999, linhas).astype(str),
+        'nomeUnidadeGestora': np.array(unidades, dtype=object)[rng.integers(0, len(unidades), linhas)],
+        'codigoUnidadeGestoraOrigemContrato': rng.integers(100000, 999999, linhas).astype(str),
+        'nomeUnidadeGestoraOrigemContrato': np.array(unidades, dtype=object)[rng.integers(0, len(unidades), linhas)],
+        'receitaDespesa': rng.choice(['Despesa', 'Receita'], linhas),
+        'numeroContrato': rng.integers(1, 99999, linhas).astype(str),
+        'codigoUnidadeRealizadoraCompra': np.where(sem_compra & (rng.random(linhas) < 0.9), None,
+                                                   rng.integers(100000, 999999, linhas).astype(str)),
+        'nomeUnidadeRealizadoraCompra': np.where(sem_compra & (rng.random(linhas) < 0.9), None,
+                                                 np.array(unidades, dtype=object)[rng.integers(0, len(unidades), linhas)]),
+        'numeroCompra': np.where(sem_compra & (rng.random(linhas) < 0.9), None,
+                                 rng.integers(1, 99999, linhas).astype(str)),
+        'codigoModalidadeCompra': rng.integers(1, 10, linhas).astype(str),
+        'nomeModalidadeCompra': modalidade,
+        'codigoCategoria': rng.integers(1, 10, linhas).astype(str),
+        'nomeCategoria': rng.choice(CATEGORIAS, linhas),
+        'codigoSubcategoria': None,
+        'nomeSubcategoria': np.where(rng.random(linhas) < 0.05, 'https://exemplo.gov.br/x', None),
+        'niFornecedor': rng.integers(10**13, 10**14, linhas).astype(str),
+        'nomeRazaoSocialFornecedor': fornecedores[rng.integers(0, len(fornecedores), linhas)],
+        'processo': rng.integers(10**9, 10**10, linhas).astype(str),
+        'objeto': objetos[rng.integers(0, len(objetos), linhas)],
+        'informacoesComplementares': None,
+        'dataVigenciaInicial': inicio.strftime('%Y-%m-%d'),
+        'dataVigenciaFinal': np.where(rng.random(linhas) < 0.01, None,
+                                      (inicio + pd.Timedelta(days=365)).strftime('%Y-%m-%d')),
+        'valorGlobal': valor,
+        'numeroParcelas': rng.integers(1, 24, linhas),
+        'valorParcela': np.round(valor / 12, 2),
+        'valorAcumulado': np.where(rng.random(linhas) < 0.5, np.nan, valor),
+        'dataHoraInclusao': (inicio + pd.Timedelta(hours=10)).strftime('%Y-%m-%dT%H:%M:%S'),
+        'nomeTipo': None,
+        'codigoTipo': None,
+        'idCompra': rng.integers(10**10, 10**11, linhas).astype(str),
+        'contratoExcluido': False,
+    })
+    # ~1% de linhas duplicadas
+    duplicadas = df.sample(frac=0.01, random_state=seed)
+    return pd.concat([df, duplicadas], ignore_index=True)
+
+
+def transform_notebook(df_contratos):
+    """Reprodução das regras como estão no notebook: apply por linha, loops por coluna e cópias."""
+    df = df_contratos.copy()
+    df['nomeSubcategoria'] = df['nomeSubcategoria'].apply(
+        lambda x: x if pd.isnull(x) or not re.match(r'^https?://', str(x)) else None)
+    df.drop(['dataHoraExclusao', 'nomeSubcategoria', 'codigoSubcategoria', 'unidadesRequisitantes',
+             'valorAcumulado', 'nomeTipo', 'codigoTipo'], axis=1, inplace=True, errors='ignore')
+    for col in ['codigoOrgao', 'codigoUnidadeGestora', 'codigoUnidadeGestoraOrigemContrato',
+                'codigoUnidadeRealizadoraCompra', 'codigoCategoria']:
+        df[col] = df[col].astype(str)
+    for col in ['dataVigenciaInicial', 'dataVigenciaFinal', 'dataHoraInclusao']:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+        if 'dataVigencia' in col:
+            df[col] = df[col].dt.normalize()
+    for col in df.select_dtypes(include=['object']).columns:
+        if not ('codigo' in col.lower() or 'numero' in col.lower() or 'id' in col.lower() or 'ni' in col.lower()):
+            df[col] = df[col].str.strip().str.title() if not pd.isna(df[col]).all() else df[col]
+    for col in [c for c in df.columns if 'valor' in c.lower()]:
+        q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+        df[f'flag_{col}_outlier'] = (df[col] < q1 - 3 * (q3 - q1)) | (df[col] > q3 + 3 * (q3 - q1))
+    df['flag_inconsistencia_compra'] = False
+    df.loc[(df['nomeModalidadeCompra'] == 'Não Se Aplica') &
+           (df['numeroCompra'].notna() | df['nomeUnidadeRealizadoraCompra'].notna()), 'flag_inconsistencia_compra'] = True
+    df['flag_vigencia_final_nula'] = df['dataVigenciaFinal'].isna()
+    df['flag_duplicata'] = df.duplicated(keep='first')
+    return df
+
+
+def medir(nome, funcao, df):
+    inicio = time.perf_counter()
+    resultado = funcao(df)
+    duracao = time.perf_counter() - inicio
+    memoria = resultado.memory_usage(deep=True).sum() / 2**20
+    print(f"{nome:<14}{duracao:>10.2f}s{memoria:>12.0f}MB")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--sem-notebook', action='store_true', help='Mede apenas transform_contratos')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = gerar_contratos(args.linhas)
+    print(f"{len(df):,} contratos sintéticos, {df.memory_usage(deep=True).sum() / 2**20:.0f}MB em memória")
+    print(f"{'abordagem':<14}{'tempo':>11}{'memória':>14}")
+    if not args.sem_notebook:
+        medir('notebook', transform_notebook, df)
+    # transform_contratos modifica o DataFrame no lugar
+    medir('vetorizado', lambda d: transform_contratos(d, save=False), df)
+
+
+if __name__ == '__main__':
+    main()
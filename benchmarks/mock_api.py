@@ -0,0 +1,213 @@
+"""
+Servidor local que imita a API de Dados Abertos de Compras para medir a extração sem rede.
+
+Serve os três endpoints do pipeline com a mesma paginação da API (pagina, tamanhoPagina,
+totalRegistros, totalPaginas). Os dados vêm de fixtures:
+- órgãos: snapshot mais recente de data/raw/orgao_*.csv (ou outro CSV gravado);
+- UASGs: CSV gravado, se informado; senão, UASGs sintéticas ligadas aos órgãos;
+- contratos: CSV gravado, se informado; senão, contratos sintéticos de bench_transform,
+  filtrados por dataVigenciaInicialMin/Max como na API.
+
+Latência (lognormal), erros 503 e 429 com Retry-After são configuráveis e sorteados com
+semente fixa. Também roda sozinho, para apontar o pipeline para ele:
+
+    python benchmarks/mock_api.py --porta 8000 --latencia 0.1 --taxa-429 0.02
+    COMPRAS_API_URL=http://127.0.0.1:8000/ python src/main.py
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / 'src'))
+from extract import endpoint_contratos, endpoint_orgao, endpoint_uasg  # noqa: E402
+from bench_transform import gerar_contratos  # noqa: E402
+
+TAMANHO_PAGINA_MAXIMO = 500
+
+
+# 1. Fixtures
+def _registros(df):
+    """DataFrame -> lista de dicionários prontos para JSON (NaN vira null)."""
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+def uasg_sinteticas(orgao, por_orgao=3, seed=42):
+    rng = np.random.default_rng(seed)
+    orgao = orgao.loc[orgao.index.repeat(por_orgao)].reset_index(drop=True)
+    codigos = rng.choice(np.arange(100000, 999999), len(orgao), replace=False).astype(str)
+    return pd.DataFrame({
+        'codigoUasg': codigos,
+        'nomeUasg': 'UASG ' + codigos + ' - ' + orgao['nomeOrgao'].astype(str),
+        'usoSisg': rng.random(len(orgao)) < 0.8,
+        'siglaUf': rng.choice(['DF', 'SP', 'RJ', 'MG', 'RS', 'BA', 'PE'], len(orgao)),
+        'codigoOrgao': orgao['codigoOrgao'].astype(str),
+        'cnpjCpfOrgao': orgao['cnpjCpfOrgao'].astype(str),
+        'statusUasg': True,
+        'dataHoraMovimento': '2024-01-01T00:00:00',
+    })
+
+def carregar_fixtures(orgao_csv=None, uasg_csv=None, contratos_csv=None, contratos=20_000, ano=2024, seed=42):
+    """
+    Monta os registros servidos por endpoint.
+
+    Args:
+        orgao_csv: Snapshot de órgãos (None = mais recente em data/raw)
+        uasg_csv: Snapshot de UASGs (None = sintéticas, 3 por órgão)
+        contratos_csv: Contratos gravados (None = sintéticos)
+        contratos: Quantidade de contratos sintéticos
+        ano: Ano de vigência dos contratos sintéticos
+    Returns:
+        Dicionário {endpoint: DataFrame}
+    """
+    orgao_csv = orgao_csv or max((RAIZ / 'data' / 'raw').glob('orgao_*.csv'))
+    orgao = pd.read_csv(orgao_csv, dtype=str, encoding='utf-8')
+    uasg = pd.read_csv(uasg_csv, dtype=str, encoding='utf-8') if uasg_csv else uasg_sinteticas(orgao, seed=seed)
+    if contratos_csv:
+        df_contratos = pd.read_csv(contratos_csv, dtype=str, encoding='utf-8')
+    else:
+        df_contratos = gerar_contratos(contratos, seed=seed)
+        deslocamento = pd.DateOffset(years=ano - 2024)
+        for col in ('dataVigenciaInicial', 'dataVigenciaFinal'):
+            df_contratos[col] = (pd.to_datetime(df_contratos[col]) + deslocamento).dt.strftime('%Y-%m-%d')
+    df_contratos = df_contratos.sort_values('dataVigenciaInicial', kind='stable').reset_index(drop=True)
+    return {endpoint_orgao: orgao, endpoint_uasg: uasg, endpoint_contratos: df_contratos}
+
+
+# 2. Servidor
+class ApiSimulada(ThreadingHTTPServer):
+    """
+    Servidor HTTP com os endpoints da API. Cada requisição sorteia latência, erro 503 e
+    429 (nessa ordem de prioridade) a partir de uma semente fixa.
+
+    Args:
+        fixtures: Dicionário {endpoint: DataFrame} (ver carregar_fixtures)
+        latencia: Latência mediana por requisição em segundos
+        dispersao: Desvio do log da latência (0 = latência fixa); gera a cauda
+        taxa_erros: Fração de requisições respondidas com 503
+        taxa_429: Fração de requisições respondidas com 429
+        retry_after: Valor do cabeçalho Retry-After nos 429, em segundos
+        porta: Porta local (0 = qualquer porta livre)
+    """
+    daemon_threads = True
+
+    def __init__(self, fixtures, latencia=0.05, dispersao=0.5, taxa_erros=0.0, taxa_429=0.0,
+                 retry_after=1, porta=0, seed=42):
+        super().__init__(('127.0.0.1', porta), _Handler)
+        self.registros = {endpoint: _registros(df) for endpoint, df in fixtures.items()}
+        datas = fixtures.get(endpoint_contratos, pd.DataFrame()).get('dataVigenciaInicial')
+        self.datas_contratos = datas.fillna('').to_numpy(dtype=str) if datas is not None else None
+        self.latencia, self.dispersao = latencia, dispersao
+        self.taxa_erros, self.taxa_429, self.retry_after = taxa_erros, taxa_429, retry_after
+        self._sorteio = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/'
+
+    def sortear(self):
+        """Retorna (latência, status) da próxima resposta."""
+        with self._lock:
+            latencia = self.latencia * (self._sorteio.lognormvariate(0, self.dispersao) if self.dispersao else 1)
+            sorteio = self._sorteio.random()
+        if sorteio < self.taxa_erros:
+            return latencia, 503
+        if sorteio < self.taxa_erros + self.taxa_429:
+            return latencia, 429
+        return latencia, 200
+
+    def pagina(self, endpoint, query):
+        registros = self.registros[endpoint]
+        inicio, fim = 0, len(registros)
+        if endpoint == endpoint_contratos and self.datas_contratos is not None:
+            # Contratos ordenados por vigência: o filtro de datas é uma busca binária
+            if 'dataVigenciaInicialMin' in query:
+                inicio = int(np.searchsorted(self.datas_contratos, query['dataVigenciaInicialMin'][0], side='left'))
+            if 'dataVigenciaInicialMax' in query:
+                fim = int(np.searchsorted(self.datas_contratos, query['dataVigenciaInicialMax'][0], side='right'))
+        total = max(0, fim - inicio)
+        pagina = int(query.get('pagina', ['1'])[0])
+        tamanho = min(int(query.get('tamanhoPagina', [TAMANHO_PAGINA_MAXIMO])[0]), TAMANHO_PAGINA_MAXIMO)
+        primeiro = inicio + (pagina - 1) * tamanho
+        resultado = registros[primeiro:min(primeiro + tamanho, fim)] if pagina >= 1 else []
+        total_paginas = -(-total // tamanho)
+        return {'resultado': resultado, 'totalRegistros': total, 'totalPaginas': total_paginas,
+                'paginasRestantes': max(0, total_paginas - pagina)}
+
+    def iniciar(self):
+        """Atende em uma thread de fundo e retorna o próprio servidor."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como a API
+
+    def do_GET(self):
+        partes = urlparse(self.path)
+        endpoint = partes.path.lstrip('/')
+        if endpoint not in self.server.registros:
+            return self._responder(404, {'erro': f'Endpoint {endpoint} não simulado'})
+        latencia, status = self.server.sortear()
+        time.sleep(latencia)
+        if status != 200:
+            cabecalhos = {'Retry-After': str(self.server.retry_after)} if status == 429 else {}
+            return self._responder(status, {'erro': 'simulado'}, cabecalhos)
+        try:
+            corpo = self.server.pagina(endpoint, parse_qs(partes.query))
+        except (ValueError, TypeError) as e:
+            return self._responder(400, {'erro': str(e)})
+        self._responder(200, corpo)
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--latencia', type=float, default=0.05, help='Latência mediana (s)')
+    parser.add_argument('--dispersao', type=float, default=0.5, help='Desvio do log da latência (cauda)')
+    parser.add_argument('--taxa-erros', type=float, default=0.0, help='Fração de respostas 503')
+    parser.add_argument('--taxa-429', type=float, default=0.0, help='Fração de respostas 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After dos 429 (s)')
+    parser.add_argument('--contratos', type=int, default=20_000, help='Contratos sintéticos')
+    parser.add_argument('--ano', type=int, default=2024, help='Ano de vigência dos contratos sintéticos')
+    parser.add_argument('--orgao-csv', help='Snapshot de órgãos (padrão: o mais recente de data/raw)')
+    parser.add_argument('--uasg-csv', help='Snapshot de UASGs (padrão: sintéticas)')
+    parser.add_argument('--contratos-csv', help='Contratos gravados (padrão: sintéticos)')
+    args = parser.parse_args()
+
+    fixtures = carregar_fixtures(args.orgao_csv, args.uasg_csv, args.contratos_csv, args.contratos, args.ano)
+    servidor = ApiSimulada(fixtures, latencia=args.latencia, dispersao=args.dispersao, taxa_erros=args.taxa_erros,
+                           taxa_429=args.taxa_429, retry_after=args.retry_after, porta=args.porta)
+    for endpoint, df in fixtures.items():
+        print(f"{endpoint}: {len(df):,} registros")
+    print(f"API simulada em {servidor.url} (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
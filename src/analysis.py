@@ -0,0 +1,270 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+from hierarquia import hierarquia_orgaos
+from modelo_dimensional import COLUNAS_ORGAO, achatar_hierarquia_orgao
+from schemas import TEXTO, TIPOS_PANDAS, aplicar_esquema
+from storage import CAMADAS, aplicar_filtros, ler_dataset, ler_particao, listar_particoes, listar_snapshots
+
+cubos_dir = Path('data/analysis')
+arquivo_estado = cubos_dir / 'estado.json'
+
+# CUBOS MATERIALIZADOS
+# Cada cubo guarda, por combinação das dimensões, a quantidade de contratos e a soma e o
+# máximo de cada medida. Atributos do órgão (superior, esfera, poder) dependem só de
+# codigoOrgao, então não aumentam o número de linhas do cubo.
+# Ordem: do mais agregado para o mais detalhado. Cada consulta usa o primeiro cubo que
+# tem todas as colunas pedidas (o menor possível).
+MEDIDAS = ['valorGlobal', 'valorParcela']
+CUBOS = {
+    'hierarquia': ['ano', 'trimestre', 'nomeOrgaoSuperior', 'esfera', 'poder', 'nomeModalidadeCompra', 'nomeCategoria'],
+    'contratos': ['ano', 'trimestre', 'codigoOrgao', 'nomeOrgao', 'nomeOrgaoSuperior', 'esfera', 'poder',
+                  'nomeModalidadeCompra', 'nomeCategoria'],
+    'fornecedores': ['ano', 'trimestre', 'niFornecedor', 'nomeRazaoSocialFornecedor'],
+}
+ATRIBUTOS_ORGAO = ['nomeOrgaoSuperior', 'esfera', 'poder']  # Vêm do catálogo de órgãos
+
+# Cubos já lidos do disco: {cubo: (versão do estado, DataFrame)}
+_cubos_em_memoria = {}
+
+# 1. Funções auxiliares
+def _assinatura(caminho):
+    """
+    Hash do conteúdo dos arquivos de uma partição (ou de um arquivo). Usa o conteúdo e não
+    a data de modificação: a transformação regrava partições idênticas a cada execução.
+    """
+    caminho = Path(caminho)
+    arquivos = sorted(a for a in caminho.rglob('*') if a.is_file()) if caminho.is_dir() else [caminho]
+    digest = hashlib.blake2b(digest_size=16)
+    for arquivo in arquivos:
+        digest.update(arquivo.name.encode())
+        with open(arquivo, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                digest.update(bloco)
+    return digest.hexdigest()
+
+def _fatias(origem):
+    """
+    Fatias do dataset processado que podem ser agregadas de forma independente.
+    Parquet: uma por partição ano/trimestre; CSV: o arquivo mais recente inteiro.
+
+    Returns:
+        Dicionário {id da fatia: caminho}
+    """
+    base = CAMADAS['processed']
+    particoes = listar_particoes(origem, base)
+    if particoes:
+        return {p.relative_to(base / origem).as_posix(): p for p in particoes}
+    arquivos = sorted(base.glob(f"{origem}_????-??-??.csv"))
+    if not arquivos:
+        raise FileNotFoundError(f"Dataset {origem} não encontrado em {base}")
+    return {'completo': arquivos[-1]}
+
+def _ler_estado():
+    return json.loads(arquivo_estado.read_text(encoding='utf-8')) if arquivo_estado.exists() else {}
+
+def _gravar_estado(estado):
+    cubos_dir.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo_estado.with_suffix('.tmp')
+    temporario.write_text(json.dumps(estado, indent=2), encoding='utf-8')
+    os.replace(temporario, arquivo_estado)
+
+def _arquivo_fatia(cubo, fatia):
+    return cubos_dir / cubo / f"{fatia.replace('/', '__')}.parquet"
+
+def _atributos_orgao():
+    """
+    Atributos hierárquicos de cada órgão (catálogo mais recente, hierarquia achatada).
+
+    Returns:
+        Tupla (DataFrame indexado por codigoOrgao, versão do catálogo) ou (None, None)
+    """
+    try:
+        orgao = ler_dataset('orgao')
+    except FileNotFoundError:
+        logging.warning("Catálogo de órgãos não encontrado: cubo de hierarquia não atualizado e cubo de "
+                        "contratos sem órgão superior, esfera e poder")
+        return None, None
+    versao = (listar_snapshots('orgao') or [str(len(orgao))])[-1]
+    orgao = aplicar_esquema(orgao.reindex(columns=COLUNAS_ORGAO), 'orgao').astype(TEXTO)
+    orgao = orgao.dropna(subset=['codigoOrgao']).drop_duplicates('codigoOrgao', keep='last')
+    achatar_hierarquia_orgao(orgao)
+    return orgao.set_index('codigoOrgao')[ATRIBUTOS_ORGAO], versao
+
+def _agregar(df, dimensoes):
+    """Agrega as medidas de um conjunto de contratos pelas dimensões do cubo (sem duplicatas)."""
+    if 'flag_duplicata' in df.columns:
+        df = df[~df['flag_duplicata'].fillna(False).astype(bool)]
+    agregacoes = {'quantidade': ('valorGlobal', 'size')}
+    for medida in MEDIDAS:
+        agregacoes[f'soma_{medida}'] = (medida, 'sum')
+        agregacoes[f'max_{medida}'] = (medida, 'max')
+    cubo = df.groupby(dimensoes, observed=True, dropna=False, sort=False).agg(**agregacoes).reset_index()
+    return cubo.astype({col: TEXTO for col in dimensoes if col not in ('ano', 'trimestre')})
+
+# 2. Atualização incremental dos cubos
+def atualizar_cubos(origem='contratos_limpos', forcar=False):
+    """
+    Recalcula apenas as fatias dos cubos cujas partições de origem mudaram (ou surgiram)
+    desde a última atualização; fatias de partições removidas são apagadas. Cada fatia
+    é lida uma única vez, só com as colunas necessárias, e alimenta todos os cubos.
+
+    A assinatura de cada partição é um hash do conteúdo dos seus arquivos; nos cubos com
+    atributos de órgão ela inclui também a versão do catálogo de órgãos. Sem o catálogo, o
+    cubo de hierarquia não é atualizado (aviso no log); ele é recalculado na primeira
+    execução em que o catálogo existir.
+
+    Args:
+        origem: Dataset de contratos limpos em data/processed
+        forcar: Se True, recalcula todas as fatias
+    Returns:
+        Dicionário {cubo: número de fatias recalculadas}
+    """
+    fatias = _fatias(origem)
+    estado = _ler_estado()
+    atributos, versao_orgao = _atributos_orgao()
+    # Sem o catálogo, cubos que agrupam só por atributos do órgão (sem codigoOrgao) ficariam
+    # com tudo nulo: não são gravados (as fatias já existentes continuam como estão)
+    ativos = {cubo: dimensoes for cubo, dimensoes in CUBOS.items()
+              if atributos is not None or 'codigoOrgao' in dimensoes or not set(ATRIBUTOS_ORGAO) & set(dimensoes)}
+    assinaturas = {fatia: _assinatura(caminho) for fatia, caminho in fatias.items()}
+    versoes = {cubo: {fatia: f"{assinatura}:{versao_orgao}" if set(ATRIBUTOS_ORGAO) & set(CUBOS[cubo]) else assinatura
+                      for fatia, assinatura in assinaturas.items()} for cubo in CUBOS}
+
+    pendentes = sorted({fatia for cubo in ativos for fatia in fatias
+                        if forcar or estado.get(cubo, {}).get(fatia) != versoes[cubo][fatia]})
+    colunas = sorted({c for dims in CUBOS.values() for c in dims if c not in ('ano', 'trimestre', *ATRIBUTOS_ORGAO)}
+                     | set(MEDIDAS) | {'dataVigenciaInicial', 'flag_duplicata'})
+    atualizadas = {cubo: 0 for cubo in CUBOS}
+    for fatia in pendentes:
+        caminho = fatias[fatia]
+        if caminho.is_dir():
+            df = ler_particao(caminho, 'contratos', colunas=colunas)
+        else:
+            df = ler_dataset(origem, camada='processed', colunas=colunas, formato='csv', esquema='contratos')
+        vigencia = df['dataVigenciaInicial']
+        df['ano'] = vigencia.dt.year.astype('Int16')
+        df['trimestre'] = vigencia.dt.quarter.astype('Int8')
+        for col in ATRIBUTOS_ORGAO:
+            df[col] = atributos[col].reindex(df['codigoOrgao'].astype(TEXTO)).to_numpy() if atributos is not None else None
+
+        for cubo, dimensoes in ativos.items():
+            if not forcar and estado.get(cubo, {}).get(fatia) == versoes[cubo][fatia]:
+                continue
+            arquivo = _arquivo_fatia(cubo, fatia)
+            arquivo.parent.mkdir(parents=True, exist_ok=True)
+            temporario = arquivo.with_suffix('.tmp')
+            _agregar(df, dimensoes).to_parquet(temporario, index=False)
+            os.replace(temporario, arquivo)
+            estado.setdefault(cubo, {})[fatia] = versoes[cubo][fatia]
+            atualizadas[cubo] += 1
+        # Estado gravado a cada fatia: uma interrupção não obriga a recalcular as já prontas
+        _gravar_estado(estado)
+
+    for cubo in CUBOS:
+        for fatia in set(estado.get(cubo, {})) - set(fatias):
+            _arquivo_fatia(cubo, fatia).unlink(missing_ok=True)
+            del estado[cubo][fatia]
+            atualizadas[cubo] += 1
+    _gravar_estado(estado)
+    logging.info(f"Cubos atualizados ({len(fatias)} partições de {origem}): "
+                 + ', '.join(f"{cubo} {n} fatias recalculadas" for cubo, n in atualizadas.items()))
+    return atualizadas
+
+# 3. Consultas sobre os cubos
+def ler_cubo(nome='contratos'):
+    """
+    Retorna o cubo inteiro (todas as fatias). Fica em memória até a próxima
+    atualização dos cubos; dimensões de texto viram category para agrupar rápido.
+    """
+    if not arquivo_estado.exists():
+        raise FileNotFoundError("Cubos ainda não calculados: execute atualizar_cubos()")
+    versao = arquivo_estado.stat().st_mtime_ns
+    if nome in _cubos_em_memoria and _cubos_em_memoria[nome][0] == versao:
+        return _cubos_em_memoria[nome][1]
+    arquivos = sorted((cubos_dir / nome).glob('*.parquet'))
+    if arquivos:
+        cubo = pd.concat([pq.read_table(a).to_pandas(types_mapper=TIPOS_PANDAS.get) for a in arquivos], ignore_index=True)
+    else:
+        cubo = pd.DataFrame(columns=CUBOS[nome])
+    cubo = cubo.astype({col: 'category' for col in CUBOS[nome] if col not in ('ano', 'trimestre')})
+    _cubos_em_memoria[nome] = (versao, cubo)
+    return cubo
+
+def escolher_cubo(colunas):
+    """Primeiro cubo de CUBOS (o mais agregado) que tem todas as colunas pedidas."""
+    for nome, dimensoes in CUBOS.items():
+        if set(colunas) <= set(dimensoes):
+            return nome
+    raise ValueError(f"Nenhum cubo tem as colunas {sorted(colunas)}")
+
+def consultar(por=None, filtros=None, ordenar_por='soma_valorGlobal', limite=None, cubo=None):
+    """
+    Agrega um cubo pelas dimensões pedidas, sem reler os contratos.
+
+    Args:
+        por: Lista de dimensões do cubo (None = total geral)
+        filtros: Lista de tuplas (coluna, operador, valor), como em ler_dataset.
+                 Ex.: [('ano', '=', 2024), ('esfera', 'in', ['F', 'E'])]
+        ordenar_por: Coluna do resultado para ordenar (decrescente); None mantém a ordem das dimensões
+        limite: Número máximo de linhas
+        cubo: Nome do cubo (None = o menor que responde à consulta, ver escolher_cubo)
+    Returns:
+        DataFrame com quantidade, somas, máximos e médias de cada medida
+    """
+    cubo = cubo or escolher_cubo(list(por or []) + [f[0] for f in filtros or []])
+    df = aplicar_filtros(ler_cubo(cubo), filtros)
+    agregacoes = {'quantidade': 'sum'}
+    for medida in MEDIDAS:
+        agregacoes[f'soma_{medida}'] = 'sum'
+        agregacoes[f'max_{medida}'] = 'max'
+    if por:
+        resultado = df.groupby(list(por), observed=True, dropna=False).agg(agregacoes).reset_index()
+    else:
+        resultado = df.agg(agregacoes).to_frame().T
+    for medida in MEDIDAS:
+        resultado[f'media_{medida}'] = resultado[f'soma_{medida}'] / resultado['quantidade']
+    if ordenar_por and limite:
+        resultado = resultado.nlargest(limite, ordenar_por)
+    elif ordenar_por:
+        resultado = resultado.sort_values(ordenar_por, ascending=False)
+    elif limite:
+        resultado = resultado.head(limite)
+    return resultado.reset_index(drop=True)
+
+# 4. Análises planejadas
+def _filtro_ano(ano):
+    return [('ano', '=', ano)] if ano else None
+
+def gastos_por_orgao(ano=None, nivel='nomeOrgao', limite=20):
+    """Valor contratado por órgão (nivel='nomeOrgaoSuperior' ou 'esfera' sobe na hierarquia)."""
+    return consultar(por=[nivel], filtros=_filtro_ano(ano), limite=limite)
+
+def gastos_sob_orgao(orgao, ano=None, por='nomeOrgao', limite=20):
+    """
+    Valor contratado por todos os órgãos sob `orgao`, em qualquer nível
+    (ex.: 'ESP-ESTADO DE SÃO PAULO'). A subárvore vem do índice da hierarquia
+    (uma fatia do percurso em profundidade), então vira um único filtro 'in' no cubo.
+    """
+    subordinados = list(hierarquia_orgaos().subordinados(orgao))
+    filtros = [('codigoOrgao', 'in', subordinados)] + (_filtro_ano(ano) or [])
+    return consultar(por=[por] if por else None, filtros=filtros, limite=limite)
+
+def gastos_por_trimestre(ano=None):
+    """Valor contratado por ano e trimestre de início da vigência."""
+    return consultar(por=['ano', 'trimestre'], filtros=_filtro_ano(ano), ordenar_por=None)
+
+def gastos_por_modalidade(ano=None):
+    """Valor contratado por modalidade de compra."""
+    return consultar(por=['nomeModalidadeCompra'], filtros=_filtro_ano(ano))
+
+def top_fornecedores(ano=None, limite=10):
+    """Fornecedores com maior valor contratado (agrupa pelo CPF/CNPJ; o nome é anexado só aos selecionados)."""
+    resultado = consultar(por=['niFornecedor'], filtros=_filtro_ano(ano), limite=limite, cubo='fornecedores')
+    nomes = ler_cubo('fornecedores').drop_duplicates('niFornecedor', keep='last').set_index('niFornecedor')
+    resultado.insert(1, 'nomeRazaoSocialFornecedor', nomes['nomeRazaoSocialFornecedor'].reindex(resultado['niFornecedor']).to_numpy())
+    return resultado
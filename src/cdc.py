@@ -0,0 +1,203 @@
+import logging
+import shutil
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from schemas import ESQUEMAS, TEXTO, TIPOS_PANDAS, aplicar_esquema
+from storage import CAMADAS, listar_snapshots, ler_dataset
+
+cdc_dir = Path('data/cdc')
+CHAVES = {
+    'orgao': 'codigoOrgao',
+    'uasg': 'codigoUasg',
+}
+# Colunas que não fazem parte do conteúdo do registro
+COLUNAS_IGNORADAS = {'data_extracao', 'data_snapshot', 'operacao', 'fingerprint'}
+
+# 1. Função para calcular a impressão digital de cada linha
+def fingerprint(df, chave):
+    """
+    Calcula um hash de 64 bits do conteúdo de cada linha (exceto a chave), de forma vetorizada.
+    Colunas são ordenadas por nome para que a ordem no arquivo não altere o hash.
+
+    Args:
+        df: DataFrame com o snapshot (tipos já aplicados pelo esquema)
+        chave: Coluna de chave primária
+    Returns:
+        Series uint64 alinhada ao índice do DataFrame
+    """
+    colunas = sorted(c for c in df.columns if c != chave and c not in COLUNAS_IGNORADAS)
+    # Texto é normalizado para object: o hash não pode depender do backend (python/pyarrow) da coluna.
+    # Códigos Int32 entram como texto, para manter o hash de quando eram declarados como texto
+    conteudo = df[colunas].astype({c: object for c in colunas if pd.api.types.is_string_dtype(df[c])})
+    for c in colunas:
+        if str(df[c].dtype) == 'Int32':
+            conteudo[c] = df[c].astype(TEXTO).astype(object)
+    return pd.util.hash_pandas_object(conteudo, index=False)
+
+# 2. Função para comparar dois conjuntos de chaves/fingerprints
+def _diff(antigo, novo, chave):
+    """
+    Compara DataFrames (chave, fingerprint) com um único merge vetorizado.
+
+    Returns:
+        Tupla (chaves inseridas, chaves atualizadas, chaves removidas)
+    """
+    m = antigo.merge(novo, on=chave, how='outer', suffixes=('_antigo', '_novo'), indicator=True)
+    inseridas = m.loc[m['_merge'] == 'right_only', chave]
+    removidas = m.loc[m['_merge'] == 'left_only', chave]
+    ambos = m['_merge'] == 'both'
+    atualizadas = m.loc[ambos & (m['fingerprint_antigo'] != m['fingerprint_novo']), chave]
+    return inseridas, atualizadas, removidas
+
+def comparar_snapshots(antigo, novo, dataset):
+    """
+    Compara dois snapshots completos de um catálogo pela chave primária.
+
+    Args:
+        antigo: DataFrame do snapshot anterior
+        novo: DataFrame do snapshot atual
+        dataset: 'orgao' ou 'uasg'
+    Returns:
+        Dicionário com 'inserts' e 'updates' (linhas do snapshot novo) e 'deletes' (linhas do snapshot antigo)
+    """
+    chave = CHAVES[dataset]
+    antigo = aplicar_esquema(antigo.copy(deep=False), dataset)
+    novo = aplicar_esquema(novo.copy(deep=False), dataset)
+    inseridas, atualizadas, removidas = _diff(
+        pd.DataFrame({chave: antigo[chave], 'fingerprint': fingerprint(antigo, chave)}),
+        pd.DataFrame({chave: novo[chave], 'fingerprint': fingerprint(novo, chave)}),
+        chave,
+    )
+    return {
+        'inserts': novo[novo[chave].isin(inseridas)],
+        'updates': novo[novo[chave].isin(atualizadas)],
+        'deletes': antigo[antigo[chave].isin(removidas)],
+    }
+
+# 3. Funções do log de mudanças
+def _caminho_changelog(dataset):
+    return cdc_dir / dataset / 'changelog'
+
+def _caminho_estado(dataset):
+    return cdc_dir / dataset / 'estado.parquet'
+
+def cdc_inicializado(dataset):
+    """Indica se o catálogo já tem estado de CDC (changelog iniciado)."""
+    return _caminho_estado(dataset).exists()
+
+def ler_changelog(dataset, colunas=None, filtros=None):
+    """
+    Lê o log de mudanças de um catálogo.
+
+    Returns:
+        DataFrame com as colunas do catálogo mais 'operacao' (I/U/D), 'fingerprint' e 'data_snapshot'
+    """
+    caminho = _caminho_changelog(dataset)
+    if not caminho.exists():
+        return pd.DataFrame()
+    particionamento = ds.partitioning(pa.schema([('data_snapshot', pa.string())]), flavor='hive')
+    tabela = pq.read_table(caminho, columns=colunas, filters=filtros or None, partitioning=particionamento)
+    return tabela.to_pandas(types_mapper=TIPOS_PANDAS.get)
+
+def registrar_snapshot(dataset, df, data_snapshot):
+    """
+    Compara um snapshot com o estado atual (chave + fingerprint) e grava no
+    changelog apenas as linhas inseridas, atualizadas ou removidas.
+    O snapshot anterior completo não é necessário: só o estado compacto é lido.
+
+    Args:
+        dataset: 'orgao' ou 'uasg'
+        df: DataFrame com o snapshot completo
+        data_snapshot: Data do snapshot (YYYY-MM-DD)
+    Returns:
+        Dicionário com a quantidade de inserts, updates e deletes
+    """
+    chave = CHAVES[dataset]
+    df = aplicar_esquema(df.drop(columns=list(COLUNAS_IGNORADAS & set(df.columns))), dataset)
+    df = df.drop_duplicates(subset=chave, keep='last')
+    novo = pd.DataFrame({chave: df[chave].to_numpy(), 'fingerprint': fingerprint(df, chave).to_numpy()})
+
+    caminho_estado = _caminho_estado(dataset)
+    if caminho_estado.exists():
+        antigo = pd.read_parquet(caminho_estado)
+        antigo[chave] = antigo[chave].astype(novo[chave].dtype)
+    else:
+        antigo = novo.iloc[0:0]
+    inseridas, atualizadas, removidas = _diff(antigo, novo, chave)
+
+    # Linhas de insert/update levam o conteúdo completo; deletes levam só a chave
+    mudancas = pd.concat([
+        df[df[chave].isin(inseridas)].assign(operacao='I'),
+        df[df[chave].isin(atualizadas)].assign(operacao='U'),
+        pd.DataFrame({chave: removidas.to_numpy(), 'operacao': 'D'}).astype({chave: df[chave].dtype}),
+    ], ignore_index=True)
+    mudancas['fingerprint'] = mudancas[chave].map(novo.set_index(chave)['fingerprint']).astype('UInt64')
+    mudancas['data_snapshot'] = data_snapshot
+
+    if not mudancas.empty:
+        pq.write_to_dataset(
+            pa.Table.from_pandas(mudancas, preserve_index=False), root_path=_caminho_changelog(dataset),
+            partition_cols=['data_snapshot'], existing_data_behavior='delete_matching',
+            basename_template='part-{i}.parquet',
+        )
+    caminho_estado.parent.mkdir(parents=True, exist_ok=True)
+    novo.to_parquet(caminho_estado, index=False)
+
+    contagem = {'inserts': len(inseridas), 'updates': len(atualizadas), 'deletes': len(removidas)}
+    logging.info(f"CDC {dataset} {data_snapshot}: {contagem['inserts']} inserts, "
+                 f"{contagem['updates']} updates, {contagem['deletes']} deletes")
+    return contagem
+
+# 4. Funções para inicializar o CDC a partir dos snapshots existentes
+def snapshots_disponiveis(dataset):
+    """
+    Lista os snapshots completos disponíveis em data/raw, tanto em CSV
+    (<dataset>_YYYY-MM-DD.csv) quanto em Parquet (<dataset>/data_extracao=YYYY-MM-DD).
+
+    Returns:
+        Dicionário {data: função sem argumentos que carrega o snapshot}, em ordem de data
+    """
+    raw_dir = CAMADAS['raw']
+    snapshots = {}
+    for arquivo in raw_dir.glob(f"{dataset}_????-??-??.csv"):
+        data = arquivo.stem.rsplit('_', 1)[1]
+        texto = {c: 'string' for c, t in ESQUEMAS[dataset].items() if t == 'string'}
+        snapshots[data] = lambda arquivo=arquivo: pd.read_csv(arquivo, dtype=texto, encoding='utf-8', low_memory=False)
+    for data in listar_snapshots(dataset, raw_dir):
+        snapshots[data] = lambda data=data: ler_dataset(dataset, filtros=[('data_extracao', '=', data)], formato='parquet')
+    return dict(sorted(snapshots.items()))
+
+def inicializar_cdc(dataset):
+    """
+    Reconstrói o changelog reprocessando, em ordem, todos os snapshots disponíveis.
+    O primeiro vira um conjunto de inserts; os seguintes geram apenas as diferenças.
+    """
+    pasta = cdc_dir / dataset
+    if pasta.exists():
+        shutil.rmtree(pasta)
+    for data, carregar in snapshots_disponiveis(dataset).items():
+        registrar_snapshot(dataset, carregar(), data)
+
+# 5. Função para montar o histórico SCD tipo 2 a partir do changelog
+def historico_scd2(dataset):
+    """
+    Monta o histórico de versões (SCD tipo 2) a partir do changelog, sem precisar
+    de cópias completas dos snapshots. Cada insert/update abre uma versão, que é
+    fechada pela próxima mudança da mesma chave.
+
+    Returns:
+        DataFrame com as colunas do catálogo mais 'valido_de', 'valido_ate' (NaT = vigente) e 'atual'
+    """
+    chave = CHAVES[dataset]
+    log = ler_changelog(dataset)
+    if log.empty:
+        return log
+    log['data_snapshot'] = pd.to_datetime(log['data_snapshot'])
+    log = log.sort_values([chave, 'data_snapshot'], kind='stable')
+    log['valido_ate'] = log.groupby(chave)['data_snapshot'].shift(-1)
+    versoes = log[log['operacao'] != 'D'].rename(columns={'data_snapshot': 'valido_de'})
+    versoes['atual'] = versoes['valido_ate'].isna()
+    return versoes.drop(columns=['fingerprint']).reset_index(drop=True)
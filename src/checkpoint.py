@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+checkpoint_dir = Path('data/checkpoints')
+# Journals mais antigos que isso são descartados: as páginas já não refletem a API
+# (vale sobretudo para os catálogos de UASG e órgão, que mudam de um dia para o outro)
+CHECKPOINT_VALIDADE_HORAS = 24  # None = sem prazo
+
+# 1. Journal de páginas extraídas
+class PageJournal:
+    """
+    Persiste em disco cada página extraída de uma partição (endpoint + parâmetros),
+    para que uma nova execução retome a extração a partir das páginas já obtidas.
+
+    Cada página é gravada como a resposta da API chegou (JSON em bytes), sem decodificar.
+    As páginas ficam em data/checkpoints/<grupo>/<chave>/, onde a chave é um hash
+    do endpoint e dos parâmetros da consulta (exceto 'pagina'). O grupo reúne as
+    partições de uma mesma extração e é apagado quando ela termina com sucesso.
+    O manifesto guarda quando a partição foi criada; uma partição criada há mais de
+    validade_horas é apagada e a extração recomeça do zero.
+
+    Args:
+        grupo: Nome do grupo de checkpoints (ex.: 'contratos_2024', 'uasg')
+        endpoint: Endpoint consultado
+        params: Parâmetros da consulta
+        directory: Diretório raiz dos checkpoints
+        validade_horas: Idade máxima da partição em horas (None = sem prazo)
+    """
+
+    def __init__(self, grupo, endpoint, params, directory=checkpoint_dir, validade_horas=CHECKPOINT_VALIDADE_HORAS):
+        params_chave = {k: v for k, v in params.items() if k != 'pagina'}
+        identificacao = json.dumps({'endpoint': endpoint, 'params': params_chave}, sort_keys=True, default=str)
+        self.chave = hashlib.sha1(identificacao.encode('utf-8')).hexdigest()[:16]
+        self.directory = Path(directory) / grupo / self.chave
+        manifesto = self.directory / 'manifesto.json'
+        criado_em = self._criado_em(manifesto)
+        if criado_em and validade_horas is not None and datetime.now() - criado_em > timedelta(hours=validade_horas):
+            logging.info(f"Checkpoint {grupo}/{self.chave} criado em {criado_em:%Y-%m-%d %H:%M} expirou; "
+                         f"a extração recomeça do zero")
+            shutil.rmtree(self.directory)
+            criado_em = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Registro legível de qual consulta gerou a partição e de quando ela foi criada
+        if criado_em is None:
+            conteudo = {'endpoint': endpoint, 'params': params_chave, 'criado_em': datetime.now().isoformat()}
+            manifesto.write_text(json.dumps(conteudo, sort_keys=True, default=str), encoding='utf-8')
+
+    @staticmethod
+    def _criado_em(manifesto):
+        """Data de criação registrada no manifesto (ou a data do arquivo, nos manifestos antigos); None se não existe."""
+        try:
+            conteudo = json.loads(manifesto.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            conteudo = {}
+        if 'criado_em' in conteudo:
+            return datetime.fromisoformat(conteudo['criado_em'])
+        return datetime.fromtimestamp(manifesto.stat().st_mtime)
+
+    def _arquivo(self, pagina):
+        return self.directory / f"pagina_{pagina:05d}.json"
+
+    def carregar(self, pagina):
+        """Retorna o corpo (bytes) da página salva, ou None se ela ainda não foi extraída."""
+        try:
+            return self._arquivo(pagina).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def salvar(self, pagina, conteudo):
+        """Grava o corpo da resposta da página de forma atômica (arquivo temporário + rename)."""
+        arquivo = self._arquivo(pagina)
+        temporario = arquivo.with_suffix('.tmp')
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, arquivo)
+
+    def paginas_salvas(self):
+        """Retorna o conjunto de páginas já persistidas."""
+        return {int(p.stem.split('_')[1]) for p in self.directory.glob('pagina_*.json')}
+
+# 2. Função para limpar os checkpoints de uma extração concluída
+def limpar_checkpoint(grupo, directory=checkpoint_dir):
+    """
+    Remove todas as partições de um grupo de checkpoints.
+
+    Args:
+        grupo: Nome do grupo de checkpoints
+        directory: Diretório raiz dos checkpoints
+    """
+    caminho = Path(directory) / grupo
+    if caminho.exists():
+        shutil.rmtree(caminho)
+        logging.info(f"Checkpoints de '{grupo}' removidos")
@@ -0,0 +1,108 @@
+import io
+import json
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pj
+from schemas import ESQUEMAS, TIPOS_PANDAS, aplicar_esquema
+
+try:
+    import orjson  # Opcional (pip install orjson): decodifica JSON várias vezes mais rápido que o json
+except ImportError:
+    orjson = None
+
+# Tipo Arrow de cada tipo declarado em schemas.ESQUEMAS
+TIPOS_ARROW = {
+    'string': pa.string(),
+    'boolean': pa.bool_(),
+    'float64': pa.float64(),
+    'Int32': pa.int32(),
+    'Int64': pa.int64(),
+    'datetime64[ns]': pa.timestamp('ns'),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+}
+# Arrow -> pandas sem objetos Python: além dos tipos da leitura, booleanos com nulos em boolean
+TIPOS_DATAFRAME = {**TIPOS_PANDAS, pa.bool_(): pd.BooleanDtype()}
+
+# 1. Decodificação de uma página
+def decodificar(conteudo):
+    """JSON (bytes) -> objetos Python, com orjson quando disponível."""
+    return orjson.loads(conteudo) if orjson is not None else json.loads(conteudo)
+
+def registros_da_pagina(conteudo):
+    """
+    Lista de registros de uma página. Aceita a resposta da API ({"resultado": [...]})
+    ou só a lista de registros (formato antigo dos checkpoints).
+    """
+    payload = decodificar(conteudo)
+    return payload if isinstance(payload, list) else payload.get('resultado', [])
+
+def _conformar(tabela, esquema):
+    """Converte as colunas declaradas no esquema para o tipo Arrow correspondente (quando possível)."""
+    for col, dtype in ESQUEMAS.get(esquema, {}).items():
+        if col not in tabela.column_names or dtype not in TIPOS_ARROW:
+            continue
+        coluna, destino = tabela.column(col), TIPOS_ARROW[dtype]
+        if coluna.type == destino:
+            continue
+        # Datas em formatos que o Arrow não reconhece continuam texto e são convertidas por aplicar_esquema
+        if dtype.startswith('datetime') and pa.types.is_string(coluna.type):
+            continue
+        # Códigos numéricos (96320 ou 96320.0) viram texto sem o sufixo '.0'
+        if dtype in ('string', 'category') and pa.types.is_floating(coluna.type) and pc.all(pc.equal(pc.floor(coluna), coluna)).as_py() is not False:
+            coluna = coluna.cast(pa.int64())
+        try:
+            if dtype == 'category' and not pa.types.is_string(coluna.type):
+                coluna = coluna.cast(pa.string())
+            tabela = tabela.set_column(tabela.column_names.index(col), col, coluna.cast(destino))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    return tabela
+
+def pagina_para_tabela(conteudo, esquema):
+    """
+    Decodifica a página direto em colunas Arrow, sem criar um dicionário por registro:
+    o leitor JSON do Arrow lê a resposta inteira e 'resultado' vira uma coluna por campo,
+    com os tipos declarados em schemas.ESQUEMAS.
+
+    Páginas com tipos misturados na mesma coluna (ex.: número e texto) caem no caminho
+    por registros + aplicar_esquema.
+
+    Args:
+        conteudo: Corpo da resposta (bytes)
+        esquema: Esquema do dataset ('contratos', 'uasg' ou 'orgao')
+    Returns:
+        pa.Table com os registros da página
+    """
+    if conteudo.lstrip()[:1] == b'[':
+        conteudo = b'{"resultado":' + conteudo + b'}'
+    try:
+        bruta = pj.read_json(io.BytesIO(conteudo), read_options=pj.ReadOptions(use_threads=False, block_size=len(conteudo) + 1))
+        if 'resultado' not in bruta.column_names or not pa.types.is_list(bruta.column('resultado').type):
+            return pa.table({})
+        registros = bruta.column('resultado').combine_chunks().flatten()
+        if not pa.types.is_struct(registros.type):
+            return pa.table({})
+        tabela = pa.Table.from_struct_array(registros)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        logging.debug(f"Página decodificada registro a registro ({e})")
+        df = pd.DataFrame(registros_da_pagina(conteudo))
+        tabela = pa.Table.from_pandas(aplicar_esquema(df, esquema), preserve_index=False).replace_schema_metadata(None)
+    return _conformar(tabela, esquema)
+
+# 2. Montagem do DataFrame a partir das páginas
+def concatenar(tabelas):
+    """
+    Junta as tabelas das páginas e converte para DataFrame (texto em string[pyarrow]).
+    Colunas que só aparecem em algumas páginas ficam nulas nas demais.
+    """
+    tabelas = [t for t in tabelas if t.num_columns]
+    if not tabelas:
+        return pd.DataFrame()
+    try:
+        tabela = pa.concat_tables(tabelas, promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mesma coluna com tipos incompatíveis entre páginas: o pandas resolve como object
+        return pd.concat([t.to_pandas(types_mapper=TIPOS_DATAFRAME.get) for t in tabelas], ignore_index=True)
+    return tabela.to_pandas(types_mapper=TIPOS_DATAFRAME.get)
@@ -0,0 +1,272 @@
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from cdc import fingerprint
+from schemas import TEXTO
+
+state_dir = Path('data/state')
+arquivo_chaves = state_dir / 'chaves_contratos.parquet'
+
+# IDENTIDADE DE CONTRATOS
+# Um contrato é identificado por órgão + UG + número + ano da vigência inicial. Janelas de
+# datas sobrepostas e reexecuções trazem o mesmo contrato de novo, às vezes com outro
+# dataHoraInclusao: fica a versão mais recente e as demais são marcadas como duplicata.
+COLUNAS_IDENTIDADE = ['codigoOrgao', 'codigoUnidadeGestora', 'numeroContrato']
+COLUNA_ANO = 'dataVigenciaInicial'
+COLUNA_VERSAO = 'dataHoraInclusao'
+# A mesma identidade como colunas, para chaves naturais (ex.: upsert da carga em load.py)
+COLUNA_ANO_CHAVE = 'anoVigenciaInicial'
+COLUNAS_CHAVE = COLUNAS_IDENTIDADE + [COLUNA_ANO_CHAVE]
+ANO_DESCONHECIDO = -1  # Ano de quem não tem dataVigenciaInicial
+# Colunas que não fazem parte do conteúdo do contrato (partição, extração e flags derivadas)
+COLUNAS_FORA_DO_CONTEUDO = {'ano', 'trimestre', 'data_extracao'}
+# Versão de quem não tem dataHoraInclusao: perde para qualquer versão datada
+SEM_VERSAO = np.iinfo(np.int64).min
+# A identidade (órgão, UG e número unidos por SEPARADOR) vira uma matriz de bytes de largura fixa,
+# hasheada como palavras de 64 bits; identidades mais longas que LARGURA_MAXIMA usam o hash do pandas
+SEPARADOR = '\x1f'
+LARGURA_MAXIMA = 64
+TAMANHO_BLOCO = 1_000_000  # Linhas por bloco da matriz de bytes (limita a memória)
+
+# 1. Chave e hashes por linha
+def _misturar(x):
+    """Finalizador do splitmix64: espalha os bits de um array uint64 (aritmética módulo 2**64)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _identidade(df):
+    """Órgão, UG e número normalizados (sem espaços nas pontas, em maiúsculas) unidos em um texto Arrow."""
+    partes = [pc.utf8_upper(pc.utf8_trim_whitespace(pa.array(df[col].astype(TEXTO)).cast(pa.string())))
+              for col in COLUNAS_IDENTIDADE]
+    # Nulo vira um caractere de controle, diferente do texto vazio
+    texto = pc.binary_join_element_wise(*partes, SEPARADOR, null_handling='replace', null_replacement='\x00')
+    return texto.combine_chunks() if isinstance(texto, pa.ChunkedArray) else texto
+
+def _hash_texto(texto):
+    """
+    Hash de 64 bits de cada texto, sem criar objetos Python: cada bloco vira uma matriz
+    [linhas, largura] completada com zeros à direita e lida como palavras de 64 bits.
+    """
+    hashes = np.empty(len(texto), dtype=np.uint64)
+    for inicio in range(0, len(texto), TAMANHO_BLOCO):
+        bloco = texto.slice(inicio, TAMANHO_BLOCO)
+        tamanho = pc.binary_length(bloco).to_numpy().astype(np.uint64)
+        largura = max(8, -(-int(tamanho.max()) // 8) * 8)
+        if pc.all(pc.string_is_ascii(bloco)).as_py() is not False:
+            # Só ASCII: o preenchimento do Arrow já dá o mesmo número de bytes por linha
+            alinhado = pc.utf8_rpad(bloco, largura, '\x00')
+            offsets = np.frombuffer(alinhado.buffers()[1], dtype=np.int32)[alinhado.offset:alinhado.offset + len(alinhado) + 1]
+            matriz = np.frombuffer(alinhado.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+        else:
+            # Acentos: cada byte é copiado para a sua coluna na matriz
+            offsets = np.frombuffer(bloco.buffers()[1], dtype=np.int32)[bloco.offset:bloco.offset + len(bloco) + 1]
+            comprimentos = np.diff(offsets)
+            destino = np.arange(offsets[0], offsets[-1]) + np.repeat(np.arange(len(bloco)) * largura - offsets[:-1], comprimentos)
+            matriz = np.zeros(len(bloco) * largura, dtype=np.uint8)
+            matriz[destino] = np.frombuffer(bloco.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+        palavras = matriz.reshape(len(bloco), largura).view(np.uint64)
+        h = _misturar(tamanho)
+        # Só as palavras com bytes do texto entram: o hash não depende da largura do bloco
+        for k in range(palavras.shape[1]):
+            h = np.where(tamanho > 8 * k, _misturar(h ^ palavras[:, k]), h)
+        hashes[inicio:inicio + len(bloco)] = h
+    return hashes
+
+def ano_contrato(df):
+    """Ano da vigência inicial de cada linha, como entra na chave (ANO_DESCONHECIDO quando ausente)."""
+    return pd.to_datetime(df[COLUNA_ANO]).dt.year.fillna(ANO_DESCONHECIDO).to_numpy().astype(np.int64)
+
+def chave_contrato(df):
+    """
+    Chave estável de 64 bits de cada contrato (órgão + UG + numeroContrato + ano da vigência inicial).
+    Códigos são comparados como texto normalizado, então '  123 ' e 123 dão a mesma chave.
+    Linhas sem numeroContrato não têm identidade: a chave delas é o hash de todas as colunas
+    do DataFrame, e só cópias idênticas são agrupadas (como em df.duplicated()).
+
+    Returns:
+        Array uint64 alinhado às linhas do DataFrame
+    """
+    identidade = _identidade(df)
+    longa = (pc.binary_length(identidade).to_numpy() > LARGURA_MAXIMA) if len(identidade) else np.zeros(0, dtype=bool)
+    if longa.any():
+        chave = np.empty(len(df), dtype=np.uint64)
+        chave[~longa] = _hash_texto(identidade.filter(pa.array(~longa)))
+        chave[longa] = pd.util.hash_array(identidade.filter(pa.array(longa)).to_numpy(zero_copy_only=False))
+    else:
+        chave = _hash_texto(identidade)
+    chave = _misturar(chave ^ ano_contrato(df).view(np.uint64))
+    sem_numero = df['numeroContrato'].isna().to_numpy()
+    if sem_numero.any():
+        chave[sem_numero] = pd.util.hash_pandas_object(df[sem_numero], index=False).to_numpy()
+    return chave
+
+def versao_contrato(df):
+    """dataHoraInclusao de cada linha em nanossegundos (SEM_VERSAO quando ausente)."""
+    if COLUNA_VERSAO not in df.columns:
+        return np.full(len(df), SEM_VERSAO, dtype=np.int64)
+    # NaT vira o menor int64, que é SEM_VERSAO
+    return pd.to_datetime(df[COLUNA_VERSAO]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+def hash_conteudo(df):
+    """
+    Hash de 64 bits do conteúdo de cada linha (cdc.fingerprint), sem dataHoraInclusao, colunas
+    de partição e flags: a mesma versão reenviada pela API tem o mesmo hash.
+    """
+    fora = [c for c in df.columns if c in COLUNAS_FORA_DO_CONTEUDO or c.startswith('flag_')]
+    return fingerprint(df.drop(columns=fora), COLUNA_VERSAO).to_numpy()
+
+def _mais_recentes(chave, versao):
+    """Posições da versão mais recente de cada chave (empate: a última na ordem das linhas), em ordem de chave."""
+    if len(chave) == 0:
+        return np.empty(0, dtype=np.int64)
+    # lexsort é estável: dentro da mesma chave e versão, as linhas ficam na ordem original
+    ordem = np.lexsort((versao, chave))
+    chave_ordenada = chave[ordem]
+    ultima = np.append(chave_ordenada[1:] != chave_ordenada[:-1], True)
+    return ordem[ultima]
+
+# 2. Índice de chaves já armazenadas
+class IndiceContratos:
+    """
+    Chaves dos contratos já vistos, com a versão (dataHoraInclusao) e o hash do conteúdo
+    de cada uma, em três arrays NumPy ordenados pela chave (24 bytes por contrato).
+
+    Cada lote novo é comparado por busca binária e mesclado em uma passada, sem reler
+    o histórico: o custo é linear no tamanho do lote mais o do índice.
+
+    Args:
+        chaves, versoes, conteudos: Arrays do índice (vazios por padrão), ordenados por chave
+    """
+
+    def __init__(self, chaves=None, versoes=None, conteudos=None):
+        # Cópias graváveis (arrays lidos do Parquet são somente leitura)
+        self.chaves = np.array([] if chaves is None else chaves, dtype=np.uint64)
+        self.versoes = np.array([] if versoes is None else versoes, dtype=np.int64)
+        self.conteudos = np.array([] if conteudos is None else conteudos, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.chaves)
+
+    @property
+    def nbytes(self):
+        return self.chaves.nbytes + self.versoes.nbytes + self.conteudos.nbytes
+
+    @classmethod
+    def ler(cls, caminho=arquivo_chaves):
+        """Carrega o índice gravado em disco (vazio se ainda não existir)."""
+        caminho = Path(caminho)
+        if not caminho.exists():
+            return cls()
+        tabela = pq.read_table(caminho)
+        return cls(*(tabela.column(col).to_numpy() for col in ('chave', 'versao', 'conteudo')))
+
+    def gravar(self, caminho=arquivo_chaves):
+        """Grava o índice em Parquet (gravação atômica)."""
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix('.tmp')
+        tabela = pa.table({'chave': self.chaves, 'versao': self.versoes, 'conteudo': self.conteudos})
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, caminho)
+
+    def atualizar(self, df):
+        """
+        Marca as duplicatas de um lote e registra as versões novas no índice.
+
+        É duplicata a linha que não é a versão mais recente do contrato no lote, ou cujo
+        contrato já está no índice com versão mais nova, ou com a mesma versão e o mesmo
+        conteúdo. Mesma versão com conteúdo diferente conta como atualização.
+
+        Args:
+            df: Lote de contratos (tipos do esquema 'contratos')
+        Returns:
+            Tupla (array booleano de duplicatas alinhado ao lote, número de contratos novos,
+            número de contratos atualizados)
+        """
+        chave, versao = chave_contrato(df), versao_contrato(df)
+        vencedores = _mais_recentes(chave, versao)
+        duplicata = np.ones(len(df), dtype=bool)
+        duplicata[vencedores] = False
+
+        chave_v, versao_v = chave[vencedores], versao[vencedores]
+        conteudo_v = hash_conteudo(df.iloc[vencedores]) if len(vencedores) else np.empty(0, dtype=np.uint64)
+        posicao = np.searchsorted(self.chaves, chave_v)
+        existe = posicao < len(self.chaves)
+        existe[existe] = self.chaves[posicao[existe]] == chave_v[existe]
+        versao_anterior = self.versoes[posicao[existe]]
+        mesma_versao = versao_v[existe] == versao_anterior
+        obsoleto = np.zeros(len(vencedores), dtype=bool)
+        obsoleto[existe] = (versao_v[existe] < versao_anterior) | (mesma_versao & (conteudo_v[existe] == self.conteudos[posicao[existe]]))
+        duplicata[vencedores[obsoleto]] = True
+
+        # Atualizados: sobrescritos no lugar; novos: inseridos na posição da busca (chave_v já está ordenada)
+        atualizado = existe & ~obsoleto
+        self.versoes[posicao[atualizado]] = versao_v[atualizado]
+        self.conteudos[posicao[atualizado]] = conteudo_v[atualizado]
+        novo = ~existe
+        self.chaves = np.insert(self.chaves, posicao[novo], chave_v[novo])
+        self.versoes = np.insert(self.versoes, posicao[novo], versao_v[novo])
+        self.conteudos = np.insert(self.conteudos, posicao[novo], conteudo_v[novo])
+        return duplicata, int(novo.sum()), int(atualizado.sum())
+
+# 3. Deduplicação em memória, em lotes e incremental
+def marcar_duplicatas_contratos(df):
+    """
+    Cria flag_duplicata: True em toda linha que não é a versão mais recente do seu contrato
+    (pela chave de identidade e dataHoraInclusao). Substitui df.duplicated(), que só pega
+    linhas idênticas em todas as colunas. O DataFrame é modificado no lugar.
+
+    Returns:
+        O próprio DataFrame
+    """
+    mantidas = np.zeros(len(df), dtype=bool)
+    mantidas[_mais_recentes(chave_contrato(df), versao_contrato(df))] = True
+    df['flag_duplicata'] = ~mantidas
+    return df
+
+def versoes_mais_recentes(chaves, versoes):
+    """
+    Deduplicação fora da memória: recebe a chave e a versão de cada linha, lote a lote
+    (chave_contrato e versao_contrato de cada lote da primeira passada), e indica quais
+    linhas são a versão mais recente do seu contrato. Durante a leitura só são guardados
+    16 bytes por linha; o resultado tem 1 byte por linha.
+
+    Args:
+        chaves: Lista com o array de chaves de cada lote, na ordem de leitura
+        versoes: Lista com o array de versões de cada lote, na mesma ordem
+    Returns:
+        Array booleano com uma posição por linha do dataset (True = versão mantida)
+    """
+    chave = np.concatenate(chaves) if chaves else np.empty(0, dtype=np.uint64)
+    versao = np.concatenate(versoes) if versoes else np.empty(0, dtype=np.int64)
+    mantidas = np.zeros(len(chave), dtype=bool)
+    mantidas[_mais_recentes(chave, versao)] = True
+    return mantidas
+
+def deduplicar_incremental(df, caminho=arquivo_chaves):
+    """
+    Deduplica um lote novo de contratos contra as chaves já armazenadas em data/state,
+    sem reler o histórico: só o índice compacto (chave, versão, hash do conteúdo) é
+    carregado. Para lotes acrescentados ao histórico (ex.: novas janelas de extração);
+    reprocessar um lote já registrado devolve um DataFrame vazio.
+
+    Args:
+        df: Lote de contratos (tipos do esquema 'contratos')
+        caminho: Arquivo do índice de chaves
+    Returns:
+        DataFrame só com os contratos novos ou com versão mais recente que a armazenada
+    """
+    indice = IndiceContratos.ler(caminho)
+    duplicata, novos, atualizados = indice.atualizar(df)
+    indice.gravar(caminho)
+    logging.info(f"Deduplicação incremental: {novos} contratos novos, {atualizados} atualizados, "
+                 f"{int(duplicata.sum())} duplicatas descartadas (índice com {len(indice):,} chaves)")
+    return df[~duplicata]
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from schemas import TEXTO, _para_texto
+
+# DOCUMENTOS (CPF/CNPJ)
+# Cada documento vira uma linha de uma matriz [n, 14] com o valor de cada caractere
+# (ASCII - 48), alinhada à direita com zeros: o CPF ocupa as 11 últimas posições e o CNPJ
+# as 14. Os dígitos verificadores de todos são calculados de uma vez com produtos matriciais.
+TAMANHO_CPF = 11
+TAMANHO_CNPJ = 14
+CPF, CNPJ = 'CPF', 'CNPJ'
+# Pesos do módulo 11 por coluna da matriz: [1º e 2º verificadores do CNPJ, 1º e 2º do CPF].
+# Os verificadores dos dois ficam nas duas últimas colunas.
+PESOS = np.zeros((TAMANHO_CNPJ, 4), dtype=np.float32)
+PESOS[:12, 0] = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+PESOS[:13, 1] = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+PESOS[3:12, 2] = np.arange(10, 1, -1)
+PESOS[3:13, 3] = np.arange(11, 1, -1)
+TAMANHO_BLOCO = 1_000_000  # Documentos por bloco no cálculo dos verificadores (limita a memória da matriz)
+# Byte -> caractere mantido (dígitos e letras ASCII, em maiúsculas); 0 = descartado (pontuação, espaços, acentos)
+_CARACTERES = np.zeros(256, dtype=np.uint8)
+_CARACTERES[ord('0'):ord('9') + 1] = np.arange(ord('0'), ord('9') + 1)
+_CARACTERES[ord('A'):ord('Z') + 1] = _CARACTERES[ord('a'):ord('z') + 1] = np.arange(ord('A'), ord('Z') + 1)
+
+# 1. Funções auxiliares
+def _bytes(texto):
+    """Offsets e bytes de um array de texto Arrow (sem cópia)."""
+    offsets = np.frombuffer(texto.buffers()[1], dtype=np.int32)[texto.offset:texto.offset + len(texto) + 1]
+    return offsets, np.frombuffer(texto.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+
+def _para_arrow(valores):
+    """
+    Valores (lista, array, Series) -> (texto Arrow só com dígitos e letras maiúsculas, índice pandas).
+    Nulos viram ''. A limpeza é feita direto nos bytes do Arrow, com uma tabela de tradução,
+    em vez de uma expressão regular por valor. Letras ficam: o CNPJ alfanumérico
+    (a partir de 2026) as usa nas 12 primeiras posições.
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    # Documentos lidos como número (CSV sem dtype) perdem o '.0' antes da limpeza
+    texto = pa.array(_para_texto(serie.astype(object) if isinstance(serie.dtype, pd.CategoricalDtype) else serie))
+    texto = texto.cast(pa.string()).fill_null('')
+    if isinstance(texto, pa.ChunkedArray):
+        texto = texto.combine_chunks()
+    if len(texto) == 0:
+        return texto, serie.index
+    offsets, dados = _bytes(texto)
+    if (dados - np.uint8(ord('0')) < 10).all():
+        return texto, serie.index
+    caracteres = _CARACTERES[dados]
+    mantidos = caracteres != 0
+    # Caracteres mantidos por valor (valores vazios somariam o byte seguinte e ficam com 0)
+    # (um 0 no fim permite que valores vazios no final apontem para depois do último byte)
+    somas = np.add.reduceat(np.append(mantidos, False).view(np.uint8), offsets[:-1] - offsets[0], dtype=np.int64)
+    por_valor = np.where(np.diff(offsets) > 0, somas, 0)
+    return _texto(np.concatenate([[0], np.cumsum(por_valor)]), caracteres[mantidos]), serie.index
+
+def _texto(offsets, dados, validos=None):
+    """Monta um array de texto Arrow a partir de offsets e bytes (nulo onde validos é False)."""
+    nulos = None if validos is None else pa.py_buffer(np.packbits(validos, bitorder='little'))
+    return pa.StringArray.from_buffers(len(offsets) - 1, pa.py_buffer(offsets.astype(np.int32)), pa.py_buffer(dados), nulos)
+
+def _matriz(alinhado):
+    """Texto Arrow com exatamente 14 caracteres ASCII -> matriz [n, 14] com o valor de cada caractere."""
+    if isinstance(alinhado, pa.ChunkedArray):
+        alinhado = alinhado.combine_chunks()
+    if len(alinhado) == 0:
+        return np.zeros((0, TAMANHO_CNPJ), dtype=np.uint8)
+    return _bytes(alinhado)[1].reshape(-1, TAMANHO_CNPJ) - np.uint8(ord('0'))
+
+def _repetido(matriz):
+    """
+    Linhas com todos os caracteres iguais (000.000.000-00, 11.111.111/1111-11), que passam
+    no módulo 11. Cada linha é completada até 16 bytes com o primeiro caractere e comparada
+    como dois inteiros de 64 bits, em vez de caractere a caractere.
+    """
+    alinhada = np.repeat(matriz[:, :1], 16, axis=1)
+    alinhada[:, :matriz.shape[1]] = matriz
+    palavras = alinhada.view(np.uint64)
+    return (palavras[:, 0] == palavras[:, 1]) & (palavras[:, 0] == matriz[:, 0].astype(np.uint64) * np.uint64(0x0101010101010101))
+
+def _validar(matriz, tamanho, numerico):
+    """Máscaras de CPF e CNPJ válidos, bloco a bloco."""
+    cpf = np.zeros(len(matriz), dtype=bool)
+    cnpj = np.zeros(len(matriz), dtype=bool)
+    for inicio in range(0, len(matriz), TAMANHO_BLOCO):
+        bloco = slice(inicio, inicio + TAMANHO_BLOCO)
+        valores = matriz[bloco]
+        # Os quatro verificadores de todas as linhas em um produto float32 (BLAS): somas < 2**24 são exatas
+        resto = (valores.astype(np.float32) @ PESOS).astype(np.int16) % 11
+        esperado = np.where(resto < 2, 0, 11 - resto)
+        confere = esperado == valores[:, -2:].astype(np.int16)[:, [0, 1, 0, 1]]
+        cpf[bloco] = (numerico[bloco] & (tamanho[bloco] <= TAMANHO_CPF) & confere[:, 2] & confere[:, 3]
+                      & ~_repetido(valores[:, TAMANHO_CNPJ - TAMANHO_CPF:]))
+        # Os verificadores do CNPJ são sempre numéricos, mesmo no alfanumérico
+        cnpj[bloco] = confere[:, 0] & confere[:, 1] & ~_repetido(valores)
+    return cpf, cnpj
+
+# 2. Análise de documentos em lote
+def analisar_documentos(valores):
+    """
+    Normaliza, completa com zeros à esquerda, classifica e valida CPFs e CNPJs de uma vez,
+    sem laço Python por documento (niFornecedor, cnpjCpfOrgao, cnpjCpfUasg...).
+
+    Pontuação e espaços são removidos e valores sem nenhum dígito ('nan', '-') viram nulo.
+    Até 11 dígitos é CPF; se não for um CPF válido, o valor ainda pode ser um CNPJ que
+    perdeu os zeros à esquerda. De 12 a 14 caracteres, só CNPJ (numérico ou alfanumérico).
+
+    Args:
+        valores: Lista, array ou Series de documentos (texto ou número)
+    Returns:
+        DataFrame alinhado aos valores, com as colunas:
+        - documento: documento normalizado (11 dígitos no CPF, 14 caracteres no CNPJ);
+          sem pontuação, mas sem completar, quando inválido; nulo se vazio
+        - tipo: 'CPF' ou 'CNPJ' (nulo quando inválido)
+        - valido: se os dígitos verificadores conferem
+    """
+    texto, indice = _para_arrow(valores)
+    numerico = pc.ascii_is_decimal(texto).to_numpy(zero_copy_only=False)
+    tem_digito = numerico.copy()
+    if not numerico.all():
+        outros = pc.filter(texto, pa.array(~numerico))
+        tem_digito[~numerico] = pc.match_substring_regex(outros, r'[0-9]').to_numpy(zero_copy_only=False)
+    tamanho = np.where(tem_digito, pc.binary_length(texto).to_numpy(zero_copy_only=False), 0)
+    # Valores vazios ou longos demais viram '00000000000000' (repetido, logo inválido)
+    cabe = pa.array((tamanho > 0) & (tamanho <= TAMANHO_CNPJ))
+    alinhado = pc.utf8_lpad(pc.if_else(cabe, texto, pa.scalar('', pa.string())), TAMANHO_CNPJ, '0')
+    matriz = _matriz(alinhado)
+    cpf, cnpj = _validar(matriz, tamanho, numerico)
+    cnpj &= ~cpf
+
+    # Documento = os últimos 11 (CPF), 14 (CNPJ) ou tamanho (inválido) caracteres da linha alinhada
+    comprimento = np.where(cpf, TAMANHO_CPF, np.where(cnpj, TAMANHO_CNPJ, np.minimum(tamanho, TAMANHO_CNPJ)))
+    mantidos = np.arange(TAMANHO_CNPJ) >= (TAMANHO_CNPJ - comprimento)[:, None]
+    offsets = np.concatenate([[0], np.cumsum(comprimento)])
+    documento = _texto(offsets, (matriz + np.uint8(ord('0')))[mantidos], tamanho > 0)
+    if (tamanho > TAMANHO_CNPJ).any():
+        documento = pc.if_else(pa.array(tamanho <= TAMANHO_CNPJ), documento, texto)
+    tipo = pd.Categorical.from_codes(np.where(cpf, 0, np.where(cnpj, 1, -1)), categories=[CPF, CNPJ])
+    return pd.DataFrame({
+        'documento': pd.Series(pd.arrays.ArrowStringArray(documento), index=indice, dtype=TEXTO),
+        'tipo': pd.Series(tipo, index=indice),
+        'valido': pd.Series(cpf | cnpj, index=indice),
+    })
+
+def normalizar_documentos(valores, manter_invalidos=False):
+    """
+    Documentos normalizados (ver analisar_documentos).
+
+    Args:
+        valores: Lista, array ou Series de documentos
+        manter_invalidos: Se True, documentos inválidos ficam só sem pontuação; se False, viram nulo
+    Returns:
+        Series de texto alinhada aos valores
+    """
+    analise = analisar_documentos(valores)
+    if manter_invalidos:
+        return analise['documento']
+    return analise['documento'].where(analise['valido'])
+
+def documentos_validos(valores):
+    """Array booleano: True para CPFs e CNPJs com dígitos verificadores corretos."""
+    return analisar_documentos(valores)['valido'].to_numpy()
@@ -1,9 +1,21 @@
+import os
 import pandas as pd
 import time
 from pathlib import Path
 from datetime import datetime
 import requests
 import logging
+import queue
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from http_client import criar_sessao, RateLimiter, calcular_espera, ler_retry_after
+from http_cache import CacheHttp
+from checkpoint import PageJournal, limpar_checkpoint
+from storage import salvar_dataset
+from decodificacao import concatenar, decodificar, pagina_para_tabela, registros_da_pagina
+from metricas import registrar_http
 
 # Configuração de logging
 logging.basicConfig(
@@ -12,19 +24,279 @@ logging.basicConfig(
     datefmt="%H:%M:%S"
 )
 
+load_dotenv()
+
 # CONFIGURAÇÕES INICIAIS PARA EXTRAÇÃO DE DADOS
-url = 'https://dadosabertos.compras.gov.br/'
+# COMPRAS_API_URL troca a API real por outra (ex.: benchmarks/mock_api.py, para rodar sem rede)
+url = os.getenv('COMPRAS_API_URL', 'https://dadosabertos.compras.gov.br/')
 endpoint_contratos = 'modulo-contratos/1_consultarContratos'
 endpoint_uasg = 'modulo-uasg/1_consultarUasg'
 endpoint_orgao = 'modulo-uasg/2_consultarOrgao'
+MAX_WORKERS = 4  # Páginas buscadas em paralelo por extração
+REQUISICOES_POR_SEGUNDO = 4.0  # Orçamento inicial de requisições por segundo
+REQUISICOES_POR_SEGUNDO_MAXIMO = 12.0  # Teto da taxa adaptativa (igual à inicial = taxa fixa)
+LATENCIA_SAUDAVEL = 1.0  # Respostas mais rápidas que isso (s) permitem aumentar a taxa
+JANELAS_PARALELAS = 4  # Janelas de vigência de contratos extraídas em paralelo
+PROFUNDIDADE_MAXIMA_PAGINAS = 200  # Janelas mais profundas que isso são divididas
+GRANULARIDADES = {'trimestre': 'Q', 'mes': 'M', 'semana': 'W', 'dia': 'D'}
+USAR_CACHE_HTTP = True  # Reaproveita respostas já baixadas (data/cache) dentro do TTL
+CACHE_TTL = {  # TTL das respostas em cache, em segundos
+    endpoint_contratos: 60 * 60,
+    endpoint_uasg: 24 * 60 * 60,
+    endpoint_orgao: 24 * 60 * 60,
+}
+CACHE_TAMANHO_MAXIMO_MB = 500
 data_dir = Path('data/raw')
 data_dir.mkdir(parents=True, exist_ok=True)
 
+_cache_http = None
+_cache_lock = threading.Lock()
+
 # 1. Função genérica de extração
-def extract_data(url, endpoint, max_records=None, params=None, max_retries=3):
+def obter_cache_http():
+    """Retorna o cache HTTP compartilhado (criado na primeira chamada), ou None se USAR_CACHE_HTTP for False."""
+    global _cache_http
+    if not USAR_CACHE_HTTP:
+        return None
+    with _cache_lock:
+        if _cache_http is None:
+            _cache_http = CacheHttp(ttl_por_endpoint=CACHE_TTL, tamanho_maximo_mb=CACHE_TAMANHO_MAXIMO_MB)
+        return _cache_http
+
+def criar_limiter(requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO):
+    """
+    Cria o limitador de requisições adaptativo usado pelas extrações: começa em
+    requisicoes_por_segundo e se ajusta às respostas da API até REQUISICOES_POR_SEGUNDO_MAXIMO.
+    """
+    return RateLimiter(requisicoes_por_segundo, maximo=REQUISICOES_POR_SEGUNDO_MAXIMO,
+                       latencia_saudavel=LATENCIA_SAUDAVEL)
+
+def registrar_estatisticas(limiter):
+    """Registra no log as estatísticas por endpoint e a taxa final do limitador."""
+    for endpoint, est in limiter.estatisticas().items():
+        logging.info(f"{endpoint}: {est['requisicoes']} requisições, {est['throttles']} throttles (429), "
+                     f"{est['erros']} erros, latência média {est['latencia_media']}s (máx. {est['latencia_max']}s)")
+    logging.info(f"Taxa final do limitador: {limiter.taxa:.1f} req/s")
+
+def _baixar_pagina(session, url, endpoint, params, pagina, max_retries, limiter):
+    """
+    Requisita uma única página do endpoint, com retry em caso de falha.
+    Respostas dentro do TTL vêm do cache HTTP sem consumir o orçamento de requisições;
+    respostas vencidas são revalidadas com ETag/Last-Modified quando disponíveis.
+
+    Returns:
+        Corpo da resposta (JSON em bytes), ainda sem decodificar
+    Raises:
+        requests.RequestException: se todas as tentativas falharem
+    """
+    params = {**params, 'pagina': pagina}
+    cache = obter_cache_http()
+    entrada = cache.obter(url, endpoint, params) if cache is not None else None
+    if entrada is not None and entrada.fresca:
+        registrar_http(endpoint, cache=1)
+        return entrada.conteudo
+
+    headers = {}
+    if entrada is not None and entrada.etag:
+        headers['If-None-Match'] = entrada.etag
+    if entrada is not None and entrada.last_modified:
+        headers['If-Modified-Since'] = entrada.last_modified
+
+    for retry in range(max_retries):
+        inicio_espera = time.monotonic()
+        limiter.aguardar()
+        inicio = time.monotonic()
+        registrar_http(endpoint, tempo_espera=inicio - inicio_espera, retries=int(retry > 0))
+        retry_after = None
+        try:
+            response = session.get(url + endpoint, params=params, headers=headers, timeout=20)
+        except requests.RequestException as e:
+            latencia = time.monotonic() - inicio
+            limiter.registrar(endpoint, None, latencia)
+            registrar_http(endpoint, latencia, requisicoes=1, erros=1, tempo_rede=latencia)
+            erro = e
+        else:
+            latencia = time.monotonic() - inicio
+            retry_after = ler_retry_after(response)
+            limiter.registrar(endpoint, response.status_code, latencia, retry_after)
+            registrar_http(endpoint, latencia, requisicoes=1, bytes=len(response.content), tempo_rede=latencia,
+                           throttles=int(response.status_code == 429), erros=int(response.status_code >= 500))
+            if response.status_code == 304 and entrada is not None:
+                cache.renovar(url, endpoint, params)
+                registrar_http(endpoint, revalidacoes=1)
+                return entrada.conteudo
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                # Erros do cliente (400, 404...) não mudam com uma nova tentativa
+                if response.status_code != 429 and response.status_code < 500:
+                    raise
+                erro = e
+            else:
+                if cache is not None:
+                    cache.guardar(url, endpoint, params, response.content,
+                                  response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                return response.content
+
+        if retry == max_retries - 1:
+            raise erro
+        wait_time = calcular_espera(retry, retry_after)
+        logging.warning(f"Erro na requisição (página {pagina}): {erro}. Tentando novamente em {wait_time:.1f}s...")
+        time.sleep(wait_time)
+        registrar_http(endpoint, tempo_espera=wait_time)
+
+def _decodificar_pagina(endpoint, conteudo, esquema=None):
+    """
+    Decodifica o corpo de uma página: em colunas Arrow tipadas, se houver esquema,
+    ou em lista de dicionários.
+    """
+    inicio = time.monotonic()
+    try:
+        return pagina_para_tabela(conteudo, esquema) if esquema else registros_da_pagina(conteudo)
+    finally:
+        registrar_http(endpoint, tempo_parse=time.monotonic() - inicio)
+
+def _requisitar_pagina(session, url, endpoint, params, pagina, max_retries, limiter):
+    """
+    Requisita e decodifica uma única página do endpoint (ver _baixar_pagina).
+
+    Returns:
+        Dicionário com a resposta da API ("resultado", "totalRegistros", "totalPaginas"...)
+    Raises:
+        requests.RequestException: se todas as tentativas falharem
+    """
+    conteudo = _baixar_pagina(session, url, endpoint, params, pagina, max_retries, limiter)
+    inicio = time.monotonic()
+    payload = decodificar(conteudo)
+    registrar_http(endpoint, tempo_parse=time.monotonic() - inicio)
+    return payload
+
+def _obter_pagina(session, url, endpoint, params, pagina, max_retries, limiter, journal=None, esquema=None):
+    """
+    Retorna os registros de uma página, lendo do checkpoint quando ela já foi extraída
+    e persistindo-a no checkpoint (como veio da API) assim que chega.
+    Com esquema, os registros vêm em uma pa.Table (ver decodificacao.pagina_para_tabela).
+    """
+    conteudo = journal.carregar(pagina) if journal is not None else None
+    if conteudo is not None:
+        try:
+            registros = _decodificar_pagina(endpoint, conteudo, esquema)
+            registrar_http(endpoint, paginas_checkpoint=1)
+            return registros
+        except ValueError:
+            logging.warning(f"Checkpoint corrompido da página {pagina} em {journal.directory}. A página será refeita.")
+
+    conteudo = _baixar_pagina(session, url, endpoint, params, pagina, max_retries, limiter)
+    registrar_http(endpoint, paginas=1)
+    if journal is not None:
+        journal.salvar(pagina, conteudo)
+    return _decodificar_pagina(endpoint, conteudo, esquema)
+
+def iter_data(url, endpoint, max_records=None, params=None, max_retries=3,
+              max_workers=MAX_WORKERS, requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+              session=None, limiter=None, checkpoint=None, esquema=None):
+    """
+    Versão em streaming de extract_data: gera os registros página a página,
+    na ordem das páginas, assim que cada uma é recebida. Apenas as páginas em voo
+    ficam em memória. Os argumentos são os mesmos de extract_data.
+
+    Com esquema (chave de schemas.ESQUEMAS), cada página é decodificada direto em
+    colunas Arrow tipadas, sem passar por um dicionário por registro.
+
+    Yields:
+        Lista de dicionários com os registros de cada página (pa.Table, com esquema)
+    Raises:
+        requests.RequestException: se uma página falhar após max_retries tentativas
+    """
+    params = {} if params is None else params.copy()
+    params.setdefault("pagina", 1)
+    params.setdefault("tamanhoPagina", 500)
+    page_size = params["tamanhoPagina"]
+    max_pages = -(-max_records // page_size) if max_records else None
+
+    propria_sessao = session is None
+    session = criar_sessao(max_workers) if propria_sessao else session
+    proprio_limiter = limiter is None
+    limiter = criar_limiter(requisicoes_por_segundo) if proprio_limiter else limiter
+    journal = PageJournal(checkpoint, endpoint, params) if checkpoint else None
+    
+    total_records = 0
+    current_page = 1
+    proxima_pagina = 1
+    pendentes = {}
+
+    logging.info(f"Iniciando extração de {endpoint}...")
+    if journal is not None and journal.paginas_salvas():
+        logging.info(f"Retomando do checkpoint: {len(journal.paginas_salvas())} páginas já extraídas")
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    # Mantém até max_workers páginas em voo à frente da página atual
+    def agendar():
+        nonlocal proxima_pagina
+        while len(pendentes) < max_workers and (max_pages is None or proxima_pagina <= max_pages):
+            pendentes[proxima_pagina] = executor.submit(
+                _obter_pagina, session, url, endpoint, params, proxima_pagina, max_retries, limiter, journal, esquema
+            )
+            proxima_pagina += 1
+
+    try:
+        agendar()
+        while current_page in pendentes:
+            try:
+                results = pendentes.pop(current_page).result()
+            except requests.RequestException as e:
+                logging.error(f"Falha na página {current_page}: {e}")
+                if journal is not None:
+                    logging.error("As páginas já extraídas estão no checkpoint e serão reaproveitadas na próxima execução.")
+                raise
+
+            if not results:
+                logging.info("Nenhum dado retornado. Fim da extração.")
+                break
+
+            total_records += len(results)
+            logging.info(f"Página {current_page}: {len(results)} registros (Total: {total_records})")
+
+            # Já agenda as próximas páginas antes de entregar esta ao consumidor
+            ultima = len(results) < page_size or (max_records and total_records >= max_records)
+            if not ultima:
+                current_page += 1
+                agendar()
+            yield results
+
+            # Se a página retornou menos que o tamanho, é a última
+            if len(results) < page_size:
+                logging.info("Última página alcançada.")
+                break
+
+            # Verifica limite de registros se definido
+            if max_records and total_records >= max_records:
+                logging.info(f"Limite de {max_records} registros atingido.")
+                break
+    finally:
+        # Páginas além da última não são mais necessárias
+        executor.shutdown(wait=True, cancel_futures=True)
+        if propria_sessao:
+            session.close()
+        if proprio_limiter:
+            registrar_estatisticas(limiter)
+
+def extract_data(url, endpoint, max_records=None, params=None, max_retries=3,
+                 max_workers=MAX_WORKERS, requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+                 session=None, limiter=None, checkpoint=None):
     """
     Extrai dados de um endpoint da API até atingir max_records.
     Mantém paginação e retry em caso de falha.
+
+    As páginas N+1..N+k são buscadas em paralelo (k = max_workers) enquanto a
+    página N é processada, sempre respeitando o orçamento global de requisições
+    por segundo. Os resultados são consumidos na ordem das páginas e a extração
+    para na primeira página vazia ou incompleta. Com max_workers=1 o
+    comportamento é o da extração serial.
+
+    Com checkpoint, cada página é gravada em disco assim que chega e uma nova
+    execução reaproveita as páginas já salvas, buscando na API apenas as que faltam.
     
     Args:
         url: URL base da API
@@ -32,105 +304,267 @@ def extract_data(url, endpoint, max_records=None, params=None, max_retries=3):
         max_records: Número máximo de registros a serem extraídos
         params: Parâmetros da consulta (opcional). Se None, usa parâmetros padrão.
         max_retries: Número máximo de tentativas em caso de falha
+        max_workers: Número de páginas buscadas simultaneamente
+        requisicoes_por_segundo: Orçamento de requisições por segundo (ignorado se limiter for informado)
+        session: Sessão HTTP a reutilizar (opcional). Se None, cria uma sessão com pool de conexões.
+        limiter: RateLimiter compartilhado (opcional), para dividir o orçamento entre extrações
+        checkpoint: Nome do grupo de checkpoints (opcional). Se None, as páginas não são persistidas.
     Returns:
         Lista de dicionários com os dados extraídos
+    Raises:
+        requests.RequestException: se uma página falhar após max_retries tentativas
     """
-    params = {} if params is None else params.copy()
-    params.setdefault("pagina", 1)
-    params.setdefault("tamanhoPagina", 500)
-    page_size = params["tamanhoPagina"]
-    
     all_data = []
-    total_records = 0
-    current_page = 1
+    for results in iter_data(url, endpoint, max_records=max_records, params=params, max_retries=max_retries,
+                             max_workers=max_workers, requisicoes_por_segundo=requisicoes_por_segundo,
+                             session=session, limiter=limiter, checkpoint=checkpoint):
+        all_data.extend(results)
+    return all_data
 
-    logging.info(f"Iniciando extração de {endpoint}...")
+def extract_dataframe(url, endpoint, esquema, **kwargs):
+    """
+    Extrai o endpoint como extract_data, mas monta o DataFrame direto das colunas Arrow
+    de cada página, já nos tipos de schemas.ESQUEMAS[esquema] e com texto em string[pyarrow].
+    Evita a lista de dicionários intermediária e a inferência de tipos sobre ela.
+
+    Args:
+        url: URL base da API
+        endpoint: Endpoint específico a ser consultado
+        esquema: Esquema de tipos do dataset ('contratos', 'uasg' ou 'orgao')
+        **kwargs: Demais argumentos de extract_data
+    Returns:
+        DataFrame com os dados extraídos
+    """
+    return concatenar(list(iter_data(url, endpoint, esquema=esquema, **kwargs)))
+
+# 2. Funções para extrair contratos particionados por janelas de vigência
+def gerar_janelas(ano, granularidade='trimestre'):
+    """
+    Divide o ano em janelas de datas consecutivas.
+
+    Args:
+        ano: Ano de referência
+        granularidade: 'trimestre', 'mes', 'semana' ou 'dia'
+    Returns:
+        Lista de tuplas (data_inicio, data_fim) no formato YYYY-MM-DD
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade}. Use uma de {list(GRANULARIDADES)}")
 
-    while True:
-        params['pagina'] = current_page
+    periodos = pd.period_range(f"{ano}-01-01", f"{ano}-12-31", freq=GRANULARIDADES[granularidade])
+    inicio_ano, fim_ano = pd.Timestamp(f"{ano}-01-01"), pd.Timestamp(f"{ano}-12-31")
+    # Semanas podem atravessar a virada do ano, então as bordas são recortadas
+    return [
+        (max(p.start_time, inicio_ano).strftime('%Y-%m-%d'), min(p.end_time, fim_ano).strftime('%Y-%m-%d'))
+        for p in periodos
+    ]
 
-        # Tentativas com retry em caso de falha
-        for retry in range(max_retries):
+def _dividir_janela(url, endpoint_contratos, janela, params, session, limiter, max_retries=3, checkpoint=None):
+    """
+    Consulta o total de páginas de uma janela e a divide ao meio, recursivamente,
+    enquanto ela ultrapassar PROFUNDIDADE_MAXIMA_PAGINAS. A primeira página de
+    cada janela consultada vai para o checkpoint, se informado, e não é baixada de novo.
+
+    Returns:
+        Lista de janelas (data_inicio, data_fim) que cabem na profundidade máxima
+    """
+    data_inicio, data_fim = janela
+    params = {**params, 'dataVigenciaInicialMin': data_inicio, 'dataVigenciaInicialMax': data_fim}
+    try:
+        conteudo = _baixar_pagina(session, url, endpoint_contratos, params, 1, max_retries, limiter)
+        resposta = decodificar(conteudo)
+    except requests.RequestException as e:
+        logging.warning(f"Não foi possível consultar o tamanho da janela {data_inicio} a {data_fim}: {e}")
+        return [janela]
+
+    if checkpoint:
+        PageJournal(checkpoint, endpoint_contratos, {**params, 'pagina': 1}).salvar(1, conteudo)
+
+    total_paginas = resposta.get("totalPaginas") or 0
+    if total_paginas <= PROFUNDIDADE_MAXIMA_PAGINAS:
+        return [janela]
+
+    inicio, fim = pd.Timestamp(data_inicio), pd.Timestamp(data_fim)
+    if inicio == fim:
+        logging.warning(f"Janela {data_inicio} tem {total_paginas} páginas e não pode ser dividida além de um dia")
+        return [janela]
+
+    meio = inicio + (fim - inicio) // 2
+    logging.info(f"Janela {data_inicio} a {data_fim} tem {total_paginas} páginas. Dividindo em duas...")
+    return (
+        _dividir_janela(url, endpoint_contratos, (data_inicio, meio.strftime('%Y-%m-%d')),
+                        params, session, limiter, max_retries, checkpoint)
+        + _dividir_janela(url, endpoint_contratos, ((meio + pd.Timedelta(days=1)).strftime('%Y-%m-%d'), data_fim),
+                          params, session, limiter, max_retries, checkpoint)
+    )
+
+def _planejar_janelas(url, endpoint_contratos, ano, granularidade, contratos_por_janela, params,
+                      session, limiter, executor, checkpoint=None):
+    """
+    Gera as janelas do ano e, sem limite por janela, divide em paralelo as que
+    ultrapassam a profundidade máxima de páginas.
+
+    Returns:
+        Lista de janelas (data_inicio, data_fim) em ordem cronológica
+    """
+    janelas = gerar_janelas(ano, granularidade)
+    # Janelas limitadas por contratos_por_janela nunca chegam à profundidade máxima
+    if contratos_por_janela is None:
+        divididas = executor.map(
+            lambda j: _dividir_janela(url, endpoint_contratos, j, params, session, limiter, checkpoint=checkpoint),
+            janelas
+        )
+        janelas = [j for sublista in divididas for j in sublista]
+    return janelas
+
+def iter_contratos_particionado(url, endpoint_contratos, ano=None, granularidade='trimestre',
+                                contratos_por_janela=None, janelas_paralelas=JANELAS_PARALELAS,
+                                requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO, checkpoint=True,
+                                session=None, limiter=None, esquema=None):
+    """
+    Versão em streaming de extract_contratos_particionado: gera as páginas de
+    contratos conforme chegam de qualquer janela (sem ordem garantida entre janelas).
+    Uma fila limitada aplica contrapressão, então a memória fica restrita a poucas
+    páginas por janela ativa, independentemente do tamanho do ano.
+    Os argumentos são os mesmos de extract_contratos_particionado (exceto save), e
+    as estatísticas do limitador são registradas da mesma forma quando ele é criado aqui.
+
+    Args:
+        esquema: Com 'contratos', cada página é decodificada direto em colunas Arrow
+            tipadas, como em extract_contratos_particionado (None = dicionários)
+
+    Yields:
+        Lista de dicionários com os contratos de cada página (pa.Table, com esquema)
+    """
+    if ano is None:
+        ano = datetime.now().year - 1
+        logging.info(f"Ano não especificado. Usando o ano anterior: {ano}")
+
+    grupo_checkpoint = f"contratos_{ano}" if checkpoint else None
+    params = {'tamanhoPagina': 500}
+    propria_sessao = session is None
+    session = criar_sessao(janelas_paralelas * MAX_WORKERS) if propria_sessao else session
+    proprio_limiter = limiter is None
+    limiter = criar_limiter(requisicoes_por_segundo) if proprio_limiter else limiter
+    fila = queue.Queue(maxsize=janelas_paralelas * 2)
+    parar = threading.Event()
+    fim_janela = object()
+
+    def entregar(item):
+        # put interrompível: se o consumidor desistir, os produtores não ficam bloqueados
+        while not parar.is_set():
             try:
-                response = requests.get(url + endpoint, params=params, timeout=20)
-                response.raise_for_status()
-                data = response.json()
-                results = data.get("resultado", [])
-
-                if not results:
-                    logging.info("Nenhum dado retornado. Fim da extração.")
-                    return all_data
-                
-                # Adiciona resultados ao conjunto total
-                all_data.extend(results)
-                total_records += len(results)
-                logging.info(f"Página {current_page}: {len(results)} registros (Total: {total_records})")
-
-                # Se a página retornou menos que o tamanho, é a última
-                if len(results) < page_size:
-                    logging.info("Última página alcançada.")
-                    return all_data
-                
-                time.sleep(0.5)
-                break
-            except requests.RequestException as e:
-                if retry < max_retries - 1:
-                    wait_time = (retry + 1) * 5 # Aumenta o tempo de espera a cada tentativa
-                    logging.warning(f"Erro na requisição: {e}. Tentando novamente em {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logging.error(f"Falha após {max_retries} tentativas: {e}")
-                    return all_data
-                
-        # Verifica limite de registros se definido
-        if max_records and total_records >= max_records:
-            logging.info(f"Limite de {max_records} registros atingido.")
-            return all_data
-
-        current_page += 1
-
-# 2. Função para extrair contratos por trimestre
-def extract_contratos_por_trimestre(url, endpoint_contratos, save=True, ano=None, contratos_por_trimestre=None):
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produzir(janela):
+        data_inicio, data_fim = janela
+        params_janela = {**params, 'dataVigenciaInicialMin': data_inicio, 'dataVigenciaInicialMax': data_fim}
+        try:
+            with closing(iter_data(url, endpoint_contratos, max_records=contratos_por_janela, params=params_janela,
+                                   session=session, limiter=limiter, checkpoint=grupo_checkpoint,
+                                   esquema=esquema)) as paginas:
+                for pagina in paginas:
+                    if not entregar(pagina):
+                        return
+            entregar(fim_janela)
+        except Exception as e:
+            entregar(e)
+
+    executor = ThreadPoolExecutor(max_workers=janelas_paralelas)
+    try:
+        janelas = _planejar_janelas(url, endpoint_contratos, ano, granularidade, contratos_por_janela, params,
+                                    session, limiter, executor, grupo_checkpoint)
+        logging.info(f"Extraindo {len(janelas)} janelas ({granularidade}) com {janelas_paralelas} em paralelo")
+        for janela in janelas:
+            executor.submit(produzir, janela)
+
+        ativas = len(janelas)
+        while ativas:
+            item = fila.get()
+            if item is fim_janela:
+                ativas -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        parar.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if propria_sessao:
+            session.close()
+        if proprio_limiter:
+            registrar_estatisticas(limiter)
+
+    if grupo_checkpoint:
+        limpar_checkpoint(grupo_checkpoint)
+
+def extract_contratos_particionado(url, endpoint_contratos, save=True, ano=None, granularidade='trimestre',
+                                   contratos_por_janela=None, janelas_paralelas=JANELAS_PARALELAS,
+                                   requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO, checkpoint=True,
+                                   session=None, limiter=None):
     """
-    Extrai contratos divididos por trimestre, respeitando o limite.
-    
+    Extrai contratos dividindo o ano em janelas de vigência extraídas em paralelo.
+    Todas as janelas compartilham a mesma sessão HTTP e o mesmo orçamento de
+    requisições por segundo. Sem limite por janela, janelas mais profundas que
+    PROFUNDIDADE_MAXIMA_PAGINAS são divididas automaticamente.
+
+    Com checkpoint, as páginas de cada janela ficam em data/checkpoints/contratos_<ano>
+    até o fim da extração, e uma execução interrompida é retomada de onde parou.
+
     Args:
         url: URL base da API
         endpoint_contratos: Endpoint de contratos
-        ano: Ano de referência (None = ano atual)
-        contratos_por_trimestre: Número máximo de contratos por trimestre (None = sem limite)
-        save: Se True, salva o DataFrame em CSV
+        save: Se True, salva o DataFrame em data/raw no formato de storage.FORMATO_ARMAZENAMENTO (Parquet por padrão)
+        ano: Ano de referência (None = ano anterior)
+        granularidade: Tamanho das janelas: 'trimestre', 'mes', 'semana' ou 'dia'
+        contratos_por_janela: Número máximo de contratos por janela (None = sem limite)
+        janelas_paralelas: Número de janelas extraídas simultaneamente
+        requisicoes_por_segundo: Orçamento global de requisições por segundo (ignorado se limiter for informado)
+        checkpoint: Se True, persiste as páginas extraídas para permitir retomada
+        session: Sessão HTTP a reutilizar (opcional). Se None, cria uma sessão com pool de conexões.
+        limiter: RateLimiter compartilhado (opcional), para dividir o orçamento com outras extrações
     Returns:
         DataFrame com os contratos extraídos
     """
     if ano is None:
         ano = datetime.now().year - 1
         logging.info(f"Ano não especificado. Usando o ano anterior: {ano}")
-        
-    todos_contratos = []
-    
-    trimestres = [
-        ("01-01", "03-31"),
-        ("04-01", "06-30"),
-        ("07-01", "09-30"),
-        ("10-01", "12-31")
-    ]
-    
-    for inicio_dia, fim_dia in trimestres:
-        data_inicio = f"{ano}-{inicio_dia}"
-        data_fim = f"{ano}-{fim_dia}"
+
+    grupo_checkpoint = f"contratos_{ano}" if checkpoint else None
+    params = {'tamanhoPagina': 500}
+    propria_sessao = session is None
+    session = criar_sessao(janelas_paralelas * MAX_WORKERS) if propria_sessao else session
+    proprio_limiter = limiter is None
+    limiter = criar_limiter(requisicoes_por_segundo) if proprio_limiter else limiter
+
+    def extrair_janela(janela):
+        data_inicio, data_fim = janela
         logging.info(f"-> Extraindo contratos de {data_inicio} até {data_fim}")
-        
-        params = {
-            'tamanhoPagina': 500,
-            'dataVigenciaInicialMin': data_inicio,
-            'dataVigenciaInicialMax': data_fim,
-        }
-        contratos_trimestre = extract_data(url, endpoint_contratos, max_records=contratos_por_trimestre, params=params)
-        logging.info(f"Trimestre {data_inicio} a {data_fim}: {len(contratos_trimestre)} contratos extraídos")
-        todos_contratos.extend(contratos_trimestre)
-
-    df = pd.DataFrame(todos_contratos)
+        params_janela = {**params, 'dataVigenciaInicialMin': data_inicio, 'dataVigenciaInicialMax': data_fim}
+        paginas = list(iter_data(url, endpoint_contratos, max_records=contratos_por_janela, params=params_janela,
+                                 session=session, limiter=limiter, checkpoint=grupo_checkpoint, esquema='contratos'))
+        logging.info(f"Janela {data_inicio} a {data_fim}: {sum(len(p) for p in paginas)} contratos extraídos")
+        return paginas
+
+    try:
+        with ThreadPoolExecutor(max_workers=janelas_paralelas) as executor:
+            janelas = _planejar_janelas(url, endpoint_contratos, ano, granularidade, contratos_por_janela, params,
+                                        session, limiter, executor, grupo_checkpoint)
+            logging.info(f"Extraindo {len(janelas)} janelas ({granularidade}) com {janelas_paralelas} em paralelo")
+
+            # executor.map preserva a ordem das janelas no resultado
+            paginas = [p for paginas_janela in executor.map(extrair_janela, janelas) for p in paginas_janela]
+    finally:
+        if propria_sessao:
+            session.close()
+        if proprio_limiter:
+            registrar_estatisticas(limiter)
+
+    df = concatenar(paginas)
     
     # Distribuição por trimestre
     if not df.empty and 'dataVigenciaInicial' in df.columns:
@@ -146,18 +580,39 @@ def extract_contratos_por_trimestre(url, endpoint_contratos, save=True, ano=None
             logging.error(f"Não foi possível verificar distribuição por trimestre: {e}")
 
     if save:
-       df =  save_to_csv(df, f"contratos_amostra_{datetime.now().strftime('%Y-%m-%d')}.csv")
+        df = save_dataset(df, "contratos_amostra" if contratos_por_janela else "contratos", esquema='contratos')
+    if grupo_checkpoint:
+        limpar_checkpoint(grupo_checkpoint)
     return df
 
+def extract_contratos_por_trimestre(url, endpoint_contratos, save=True, ano=None, contratos_por_trimestre=None):
+    """
+    Extrai contratos divididos por trimestre, respeitando o limite.
+    Os quatro trimestres são extraídos em paralelo (ver extract_contratos_particionado).
+    
+    Args:
+        url: URL base da API
+        endpoint_contratos: Endpoint de contratos
+        ano: Ano de referência (None = ano atual)
+        contratos_por_trimestre: Número máximo de contratos por trimestre (None = sem limite)
+        save: Se True, salva o DataFrame em data/raw no formato de storage.FORMATO_ARMAZENAMENTO (Parquet por padrão)
+    Returns:
+        DataFrame com os contratos extraídos
+    """
+    return extract_contratos_particionado(url, endpoint_contratos, save=save, ano=ano, granularidade='trimestre',
+                                          contratos_por_janela=contratos_por_trimestre)
+
 # 3. Função para extrair todos os dados do endpoint UASG
-def extract_uasg(url, endpoint_uasg, save=True):
+def extract_uasg(url, endpoint_uasg, save=True, session=None, limiter=None):
     """
     Extrai todos os UASGs usando paginação interna da API.
     
     Args:
         url: URL base da API
         endpoint_uasg: Endpoint de UASG
-        save: Se True, salva os dados em CSV
+        save: Se True, salva os dados em data/raw no formato de storage.FORMATO_ARMAZENAMENTO (Parquet por padrão)
+        session: Sessão HTTP a reutilizar (opcional)
+        limiter: RateLimiter compartilhado (opcional), para dividir o orçamento com outras extrações
     """
     logging.info("Iniciando extração de UASGs...")
     
@@ -166,23 +621,41 @@ def extract_uasg(url, endpoint_uasg, save=True):
         'tamanhoPagina': 500
     }
     # OBS: max_records=None garante que todos os registros sejam puxados
-    uasg_data = extract_data(url, endpoint_uasg, max_records=None, params=params)
+    df = extract_dataframe(url, endpoint_uasg, 'uasg', max_records=None, params=params, checkpoint='uasg',
+                          session=session, limiter=limiter)
     
-    logging.info(f"Extração concluída: {len(uasg_data)} UASGs")
+    logging.info(f"Extração concluída: {len(df)} UASGs")
     
     if save:
-        return save_to_csv(uasg_data, f"uasg_{datetime.now().strftime('%Y-%m-%d')}.csv")
-    return pd.DataFrame(uasg_data)
+        df = save_dataset(df, 'uasg')
+    limpar_checkpoint('uasg')
+    return df
+
+def iter_uasg(url, endpoint_uasg):
+    """
+    Versão em streaming de extract_uasg: gera as UASGs página a página.
+
+    Yields:
+        Lista de dicionários com as UASGs de cada página
+    """
+    params = {
+        'statusUasg': 'true',
+        'tamanhoPagina': 500
+    }
+    yield from iter_data(url, endpoint_uasg, max_records=None, params=params, checkpoint='uasg')
+    limpar_checkpoint('uasg')
 
 # 4. Função para extrair todos os dados do endpoint Órgão
-def extract_orgao(url, endpoint_orgao, save=True):
+def extract_orgao(url, endpoint_orgao, save=True, session=None, limiter=None):
     """
     Extrai todos os órgãos usando paginação interna da API.
 
     Args:
         url: URL base da API
         endpoint_orgao: Endpoint de órgãos
-        save: Se True, salva os dados em CSV
+        save: Se True, salva os dados em data/raw no formato de storage.FORMATO_ARMAZENAMENTO (Parquet por padrão)
+        session: Sessão HTTP a reutilizar (opcional)
+        limiter: RateLimiter compartilhado (opcional), para dividir o orçamento com outras extrações
     """
     logging.info("Iniciando extração de órgãos...")
 
@@ -191,15 +664,51 @@ def extract_orgao(url, endpoint_orgao, save=True):
         'tamanhoPagina': 500
     }
     # OBS: max_records=None garante que todos os registros sejam puxados
-    orgaos_data = extract_data(url, endpoint_orgao, max_records=None, params=params)
+    df = extract_dataframe(url, endpoint_orgao, 'orgao', max_records=None, params=params, checkpoint='orgao',
+                          session=session, limiter=limiter)
 
-    logging.info(f"Extração concluída: {len(orgaos_data)} órgãos")
+    logging.info(f"Extração concluída: {len(df)} órgãos")
 
     if save:
-        return save_to_csv(orgaos_data, f"orgao_{datetime.now().strftime('%Y-%m-%d')}.csv")
-    return pd.DataFrame(orgaos_data)
+        df = save_dataset(df, 'orgao')
+    limpar_checkpoint('orgao')
+    return df
+
+def iter_orgao(url, endpoint_orgao):
+    """
+    Versão em streaming de extract_orgao: gera os órgãos página a página.
+
+    Yields:
+        Lista de dicionários com os órgãos de cada página
+    """
+    params = {
+        'statusOrgao': 'true',
+        'tamanhoPagina': 500
+    }
+    yield from iter_data(url, endpoint_orgao, max_records=None, params=params, checkpoint='orgao')
+    limpar_checkpoint('orgao')
+
+# 5. Funções para salvar dados de endpoints
+def save_dataset(data, nome, esquema=None):
+    """
+    Salva os dados na camada raw, no formato configurado em storage.FORMATO_ARMAZENAMENTO
+    (Parquet particionado ou CSV), e retorna o DataFrame
+    
+    Args:
+        data: Lista de dicionários ou DataFrame a ser salvo
+        nome: Nome do dataset (ex.: 'contratos', 'orgao')
+        esquema: Esquema de tipos do dataset (None = mesmo nome do dataset)
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    if df.empty:
+        logging.warning(f"Nenhum dado para salvar em {nome}")
+        return df
+    try:
+        salvar_dataset(df, nome, camada='raw', esquema=esquema)
+    except Exception as e:
+        logging.error(f"Erro ao salvar {nome}: {e}")
+    return df
 
-# 5. Função para salvar dados de endpoints em CSV
 def save_to_csv(data, filename, directory=data_dir):
     """
     Salva os dados em um arquivo CSV e retorna o DataFrame
@@ -1,9 +1,10 @@
 import pandas as pd
-import time
 from pathlib import Path
 from datetime import datetime
-import requests
 import logging
+import extract
+from documentos import analisar_documentos, normalizar_documentos
+from lookup import buscar_por_ids
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%H:%M:%S")
@@ -23,7 +24,8 @@ data_dir.mkdir(parents=True, exist_ok=True)
 def extract_data(url, endpoint, max_records=10000, params=None, max_retries=3):
     """
     Extrai dados de um endpoint da API até atingir max_records.
-    Mantém paginação e retry em caso de falha.
+    Usa a extração de extract.py: páginas em paralelo sob o limitador adaptativo,
+    backoff exponencial com jitter e respeito ao Retry-After da API.
     Args:
         url: URL base da API
         endpoint: Endpoint específico a ser consultado
@@ -32,59 +34,10 @@ def extract_data(url, endpoint, max_records=10000, params=None, max_retries=3):
         max_retries: Número máximo de tentativas em caso de falha
     Returns:
         Lista de dicionários com os dados extraídos
+    Raises:
+        requests.RequestException: se uma página falhar após max_retries tentativas
     """
-    params = {} if params is None else params.copy()
-    params.setdefault("pagina", 1)
-    params.setdefault("tamanhoPagina", 500)
-    page_size = params["tamanhoPagina"]
-    
-    all_data = []
-    total_records = 0
-    max_pages = (max_records // page_size) + 1 # Quantas páginas serão necessárias para atingir o max_records
-
-    logging.info(f"Iniciando extração de {endpoint}...")
-
-    for current_page in range(1, max_pages + 1):
-        params['pagina'] = current_page
-
-        # Tentativas com retry em caso de falha
-        for retry in range(max_retries):
-            try:
-                response = requests.get(url + endpoint, params=params, timeout=20)
-                response.raise_for_status()  # Levanta um erro para códigos de status HTTP 4xx/5xx
-                data = response.json()
-                results = data.get("resultado", [])
-
-                if not results:
-                    logging.info("Nenhum dado retornado. Fim da extração.")
-                    return all_data
-                
-                # Adicionar resultados ao conjunto total
-                all_data.extend(results)
-                total_records += len(results)
-                logging.info(f"Página {current_page}/{max_pages}: {len(results)} registros (Total: {total_records})")
-
-                # Se a página retornou menos que o tamanho, é a última
-                if len(results) < page_size:
-                    logging.info("Última página alcançada.")
-                    return all_data
-                
-                time.sleep(0.5)
-                break # sai do retry se funcionou
-            except requests.RequestException as e:
-                if retry < max_retries - 1:
-                    wait_time = (retry + 1) * 5 # Aumenta o tempo de espera a cada tentativa
-                    logging.warning(f"Erro na requisição: {e}. Tentando novamente em {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logging.error(f"Falha após {max_retries} tentativas: {e}")
-                    return all_data
-        if total_records >= max_records:
-            logging.info(f"Limite de {max_records} registros atingido.")
-            break
-
-    logging.info(f"Extração concluída: {total_records} registros obtidos.")
-    return all_data
+    return extract.extract_data(url, endpoint, max_records=max_records, params=params, max_retries=max_retries)
 
 # 2. Função para extrair contratos por trimestre
 def extract_contratos_por_trimestre(url, endpoint_contratos, ano=2024, contratos_por_trimestre=5000, save=True):
@@ -167,10 +120,9 @@ def transform_contratos_basico(df):
         if col in contratos_df.columns:
             limpar_coluna(col)
 
+    # CPF/CNPJ sem pontuação e com zeros à esquerda; inválidos ficam para extract_fornecedores_por_id descartar
     if 'niFornecedor' in contratos_df.columns:
-        contratos_df['niFornecedor'] = contratos_df['niFornecedor'].astype(str).str.strip()
-        contratos_df['niFornecedor'] = contratos_df['niFornecedor'].str.replace(r'[^\d]', '', regex=True)
-        contratos_df['niFornecedor'] = contratos_df['niFornecedor'].where(pd.notna(contratos_df['niFornecedor']) & (contratos_df['niFornecedor'] != ""))
+        contratos_df['niFornecedor'] = normalizar_documentos(contratos_df['niFornecedor'], manter_invalidos=True)
 
     # Informações sobre o que foi feito
     registros_originais = len(df)
@@ -230,67 +182,29 @@ def extract_dados_relacionados(contratos_df):
 # 4.1. Função para extrair dados do endpoint UASG relacionados
 def extract_uasg_por_codigo(codigos_uasg, save=True):
     """
-    Extrai UASGs usando paginação da API, podendo filtrar por códigos específicos.
-    
+    Extrai UASGs específicas com base nos códigos encontrados nos contratos.
+    Códigos já presentes no catálogo local não são consultados na API (ver lookup.buscar_por_ids).
+
     Args:
-        codigos_uasg: Lista opcional de códigos UASG para filtrar.
-        save: Se True, salva os dados em CSV.
+        codigos_uasg: Lista de códigos UASG para extrair
+        save: Se True, salva os dados em CSV
     """
-    uasg_data = []
-    erros = 0
-    pagina = 1
-    tamanho_pagina = 500  # máximo permitido pela API
-
-    logging.info("Iniciando extração de UASGs...")
-    
-    # Se tiver filtro por códigos, transformar em string separada por vírgula
-    codigos_param = None
-    if codigos_uasg:
-        codigos_unicos = list(set(codigos_uasg))
-        codigos_param = ','.join(map(str, codigos_unicos))
-        logging.info(f"Filtrando por {len(codigos_unicos)} códigos UASG.")
-    
-    while True:
-        params = {
-            'statusUasg': 'true',
-            'pagina': pagina,
-            'tamanhoPagina': tamanho_pagina
-        }
-        if codigos_param:
-            params['codigoUasg'] = codigos_param
-
-        try:
-            resultado = extract_data(url, endpoint_uasg, max_records=tamanho_pagina, params=params)
-            if resultado:
-                uasg_data.extend(resultado)
-                logging.info(f"Página {pagina}: {len(resultado)} registros obtidos.")
-            else:
-                logging.info(f"Página {pagina}: nenhum registro encontrado.")
-                break
-
-            # Verifica se chegou à última página
-            if len(resultado) < tamanho_pagina:
-                logging.info("Última página alcançada.")
-                break
-
-            pagina += 1
-            time.sleep(1)  # pausa leve para evitar sobrecarga
-
-        except Exception as e:
-            erros += 1
-            logging.warning(f"Erro na página {pagina}: {e}. Tentando novamente em 10s...")
-            time.sleep(10)
+    if not codigos_uasg:
+        logging.warning("Lista de códigos UASG vazia!")
+        return pd.DataFrame()
 
-    logging.info(f"Extração concluída: {len(uasg_data)} UASGs (Erros: {erros})")
+    uasg_df = buscar_por_ids('uasg', codigos_uasg, url)
+    logging.info(f"Extração concluída: {len(uasg_df)} UASGs")
 
     if save:
-        return save_to_csv(uasg_data, f"uasg_{datetime.now().strftime('%Y-%m-%d')}.csv")
-    return pd.DataFrame(uasg_data)
+        return save_to_csv(uasg_df, f"uasg_{datetime.now().strftime('%Y-%m-%d')}.csv")
+    return uasg_df
 
 #4.2. Função para extrair dados do endpoint Órgão relacionados
 def extract_orgao_por_codigo(codigos_orgao, save=True):
     """
     Extrai órgãos específicos com base nos códigos encontrados nos contratos.
+    Códigos já presentes no catálogo local não são consultados na API (ver lookup.buscar_por_ids).
 
     Args:
         codigos_orgao: Lista de códigos de órgão para extrair
@@ -299,48 +213,22 @@ def extract_orgao_por_codigo(codigos_orgao, save=True):
     if not codigos_orgao:
         logging.warning("Lista de códigos de órgãos vazia!")
         return pd.DataFrame()
-    
-    orgaos_data = []
-    codigos_unicos = list(set(codigos_orgao))
-    erros = 0
-
-    logging.info(f"Extraindo dados de {len(codigos_unicos)} órgãos...")
-
-    for i, codigo in enumerate(codigos_unicos, 1):
-        if i % 50 == 0:
-            logging.info(f"Progresso: {i}/{len(codigos_unicos)} órgãos consultados.")
 
-        params = {
-            'codigoOrgao': codigo,
-            'statusOrgao': 'true',
-        }
-
-        if 'statusOrgao' not in params:
-            raise ValueError("O parâmetro 'statusOrgao' é obrigatório para o endpoint de Órgão.")
-
-        try:
-            resultado = extract_data(url, endpoint_orgao, max_records=1, params=params)
-            if resultado:
-                orgaos_data.extend(resultado)
-            else:
-                logging.info(f"Nenhum dado encontrado para o órgão {codigo}")
-            time.sleep(1)
-        except Exception as e:
-            erros += 1
-            logging.warning(f"Erro ao consultar órgão {codigo}: {e}")
-
-    logging.info(f"Extração concluída: {len(orgaos_data)} órgãos (Erros: {erros})")
+    orgao_df = buscar_por_ids('orgao', codigos_orgao, url)
+    logging.info(f"Extração concluída: {len(orgao_df)} órgãos")
 
     if save:
-        return save_to_csv(orgaos_data, f"orgao_{datetime.now().strftime('%Y-%m-%d')}.csv")
-    return pd.DataFrame(orgaos_data)
+        return save_to_csv(orgao_df, f"orgao_{datetime.now().strftime('%Y-%m-%d')}.csv")
+    return orgao_df
 
 # 4.3 Função para extrair dados do endpoint Fornecedores relacionados
 def extract_fornecedores_por_id(ni_fornecedores, save=True):
     """
     Extrai fornecedores específicos com base nos NIs encontrados nos contratos.
-    Separa CPF de CNPJ baseado no tamanho do identificador.
-    
+    Os NIs são normalizados e validados de uma vez (ver documentos.analisar_documentos):
+    CPFs e CNPJs com dígitos verificadores errados não viram requisição. As consultas são
+    feitas em paralelo e NIs não encontrados ficam no cache negativo (ver lookup.buscar_por_ids).
+
     Args:
         ni_fornecedores: Lista de NIs (CPF/CNPJ) para extrair
         save: Se True, salva os dados em CSV
@@ -349,57 +237,18 @@ def extract_fornecedores_por_id(ni_fornecedores, save=True):
         logging.warning("Lista de identificadores de fornecedores vazia!")
         return pd.DataFrame()
 
-    fornecedores_data = []
-    nis_unicos = list(set(ni_fornecedores))
-    cpfs, cnpjs, invalidos = [], [], []
-
-    # Separação de CPF/CNPJ
-    for ni in nis_unicos:
-       ni_str = str(ni).strip()
-       if not ni_str or ni_str == 'nan':
-           invalidos.append(ni_str)
-       elif len(ni_str) <= 11:
-           cpfs.append(ni_str)
-       else:
-           cnpjs.append(ni_str)
-
-    logging.info(f"Fornecedores: {len(cpfs)} CPFs, {len(cnpjs)} CNPJs, {len(invalidos)} inválidos")
-
-    # Processamento de CPFs
-    erros_cpf = 0
-    for i, cpf in enumerate(cpfs):
-        if i % 50 == 0:
-            logging.info(f"Progresso: {i}/{len(cpfs)} CPFs consultados.")
-
-        try:
-            resultado = extract_data(url, endpoint_fornecedores, max_records=1, params={"cpf": cpf, "ativo": "true"})
-            if resultado:
-                fornecedores_data.extend(resultado)
-            time.sleep(1)
-        except Exception as e:
-            erros_cpf += 1
-            logging.warning(f"Erro ao consultar fornecedor CPF {cpf}: {e}")
-
-    # Processamento de CNPJs
-    erros_cnpj = 0
-    for i, cnpj in enumerate(cnpjs):
-        if i % 50 == 0:
-            logging.info(f"Progresso: {i}/{len(cnpjs)} CNPJs consultados.")
-
-        try:
-            resultado = extract_data(url, endpoint_fornecedores, max_records=1, params={"cnpj": cnpj, "ativo": "true"})
-            if resultado:
-                fornecedores_data.extend(resultado)
-            time.sleep(1)
-        except Exception as e:
-            erros_cnpj += 1
-            logging.warning(f"Erro ao consultar fornecedor CNPJ {cnpj}: {e}")
+    documentos = analisar_documentos(pd.Series(ni_fornecedores).drop_duplicates())
+    documentos = documentos[documentos['documento'].notna()].drop_duplicates('documento')
+    tipos = documentos['tipo'].value_counts()
+    logging.info(f"Fornecedores: {tipos.get('CPF', 0)} CPFs, {tipos.get('CNPJ', 0)} CNPJs, "
+                 f"{int((~documentos['valido']).sum())} inválidos (não consultados)")
 
-    logging.info(f"Extração de fornecedores concluída: {len(fornecedores_data)} registros (Erros CPF: {erros_cpf}, Erros CNPJ: {erros_cnpj})")
+    fornecedores_df = buscar_por_ids('fornecedor', documentos.loc[documentos['valido'], 'documento'], url)
+    logging.info(f"Extração de fornecedores concluída: {len(fornecedores_df)} registros")
 
     if save:
-        return save_to_csv(fornecedores_data, f"fornecedores_{datetime.now().strftime('%Y-%m-%d')}.csv")
-    return pd.DataFrame(fornecedores_data)
+        return save_to_csv(fornecedores_df, f"fornecedores_{datetime.now().strftime('%Y-%m-%d')}.csv")
+    return fornecedores_df
 
 # 5. Função para salvar dados de endpoints em CSV
 def save_to_csv(data, filename, directory=data_dir):
@@ -0,0 +1,201 @@
+import logging
+import numpy as np
+import pandas as pd
+from schemas import aplicar_esquema
+from storage import ler_dataset, listar_snapshots
+
+SEM_ORGAO = -1  # Posição de "sem pai" (raízes) e de códigos fora do catálogo
+PROFUNDIDADE_MAXIMA = 32  # Cadeias mais longas que isso indicam ciclo no catálogo
+
+# Índice do catálogo mais recente: (versão do catálogo, HierarquiaOrgaos)
+_hierarquia_em_memoria = None
+
+# 1. Índice da árvore de órgãos
+class HierarquiaOrgaos:
+    """
+    Índice em memória da árvore de órgãos (fundo -> prefeitura -> estado -> região -> país),
+    construído uma vez a partir do catálogo. Cada órgão vira uma posição em arrays NumPy:
+
+    - pai: posição do órgão vinculado (SEM_ORGAO nas raízes);
+    - caminho: matriz [órgão, profundidade] com os ancestrais, da raiz até o próprio órgão;
+    - entrada/saida: intervalo do órgão no percurso em profundidade (Euler tour). Os
+      subordinados de A são exatamente os órgãos com entrada em [entrada[A], saida[A]),
+      então "X está sob A" é uma comparação e a subárvore de A é uma fatia de `ordem`.
+
+    O pai de cada órgão é o codigoOrgaoVinculado (o superior, se não houver vinculado).
+    Vinculados e superiores citados mas ausentes do catálogo entram como órgãos com o nome
+    informado na linha que os cita, para que a cadeia não se parta no meio.
+
+    Todas as consultas recebem arrays/Series de códigos e resolvem cada código distinto
+    uma única vez, então milhões de contratos custam uma busca por órgão distinto.
+
+    Args:
+        orgao: DataFrame do catálogo (saída de extract_orgao ou ler_dataset('orgao'))
+    """
+
+    def __init__(self, orgao):
+        orgao = aplicar_esquema(orgao.copy(deep=False), 'orgao').dropna(subset=['codigoOrgao'])
+        orgao = orgao.drop_duplicates('codigoOrgao', keep='last')
+        nos = [
+            pd.DataFrame({'codigo': orgao['codigoOrgao'], 'nome': orgao.get('nomeOrgao'),
+                          'pai': orgao['codigoOrgaoVinculado'].fillna(orgao['codigoOrgaoSuperior'])}),
+            # Vinculado ausente do catálogo: o superior de quem o cita é o seu pai
+            pd.DataFrame({'codigo': orgao['codigoOrgaoVinculado'], 'nome': orgao.get('nomeOrgaoVinculado'),
+                          'pai': orgao['codigoOrgaoSuperior']}),
+            pd.DataFrame({'codigo': orgao['codigoOrgaoSuperior'], 'nome': orgao.get('nomeOrgaoSuperior'), 'pai': None}),
+        ]
+        nos = pd.concat([parte.astype(object) for parte in nos], ignore_index=True)
+        # Linhas do catálogo vêm primeiro e prevalecem sobre os órgãos citados
+        nos = nos.dropna(subset=['codigo'])
+        nos = nos.drop_duplicates('codigo', keep='first').reset_index(drop=True)
+        nos.loc[nos['pai'] == nos['codigo'], 'pai'] = None
+
+        self.codigos = pd.Index(nos['codigo'].to_numpy(dtype=object))
+        self.nomes = nos['nome'].astype(object).to_numpy()
+        self._codigos_ou_nulo = np.append(self.codigos.to_numpy(), None)  # posição SEM_ORGAO -> None
+        self._nomes_ou_nulo = np.append(self.nomes, None)
+        # Nome -> posição (nomes repetidos ficam com o primeiro órgão)
+        self._por_nome = {nome: i for i, nome in reversed(list(enumerate(self.nomes))) if isinstance(nome, str)}
+        self.pai = self.codigos.get_indexer(nos['pai'].to_numpy(dtype=object))
+        self._indexar()
+        logging.info(f"Hierarquia de órgãos: {len(self):,} órgãos, {int((self.pai == SEM_ORGAO).sum())} raízes, "
+                     f"profundidade máxima {self.caminho.shape[1] - 1}")
+
+    def __len__(self):
+        return len(self.pai)
+
+    def _ancestrais(self):
+        """Matriz [órgão, k] com o k-ésimo ancestral (k=0: o próprio órgão), por saltos de ponteiro."""
+        pai = np.append(self.pai, SEM_ORGAO)  # pai[SEM_ORGAO] = SEM_ORGAO
+        niveis = [np.arange(len(self.pai))]
+        while len(niveis) <= PROFUNDIDADE_MAXIMA:
+            proximo = pai[niveis[-1]]
+            if (proximo == SEM_ORGAO).all():
+                return np.column_stack(niveis)
+            niveis.append(proximo)
+        # Ciclo: depois de PROFUNDIDADE_MAXIMA saltos, quem ainda tem pai está no ciclo
+        no_ciclo = np.unique(niveis[-1][niveis[-1] != SEM_ORGAO])
+        logging.warning(f"Ciclo na hierarquia de órgãos: {list(self.codigos[no_ciclo])} viram raízes")
+        self.pai[no_ciclo] = SEM_ORGAO
+        return self._ancestrais()
+
+    def _indexar(self):
+        ancestrais = self._ancestrais()
+        n, niveis = ancestrais.shape
+        self.profundidade = (ancestrais != SEM_ORGAO).sum(axis=1) - 1
+        # Da raiz para o órgão: caminho[i, d] = ancestral de i na profundidade d
+        colunas = self.profundidade[:, None] - np.arange(niveis)[None, :]
+        self.caminho = np.where(colunas >= 0, ancestrais[np.arange(n)[:, None], colunas.clip(0)], SEM_ORGAO)
+        # Ordenar pelos caminhos dá a pré-ordem do percurso em profundidade: cada órgão
+        # vem logo antes dos seus subordinados (SEM_ORGAO < qualquer posição)
+        self.ordem = np.lexsort(self.caminho.T[::-1])
+        self.entrada = np.empty(n, dtype=np.int64)
+        self.entrada[self.ordem] = np.arange(n)
+        # Tamanho da subárvore: quantas vezes o órgão aparece como ancestral (inclui ele mesmo)
+        self.saida = self.entrada + np.bincount(ancestrais[ancestrais != SEM_ORGAO], minlength=n)
+
+    # 2. Resolução de códigos
+    def posicoes(self, codigos):
+        """Posição de cada código no índice (SEM_ORGAO para nulos e códigos fora do catálogo)."""
+        if isinstance(getattr(codigos, 'dtype', None), pd.CategoricalDtype):
+            # Colunas category (ex.: cubos) já trazem os códigos distintos
+            inverso, unicos = np.asarray(codigos.cat.codes if isinstance(codigos, pd.Series) else codigos.codes), codigos.dtype.categories
+        else:
+            inverso, unicos = pd.factorize(codigos if hasattr(codigos, 'dtype') else np.asarray(codigos, dtype=object))
+        posicoes_unicos = self.codigos.get_indexer(pd.Index(unicos, dtype=object).astype(str))
+        return np.where(inverso >= 0, np.append(posicoes_unicos, SEM_ORGAO)[inverso], SEM_ORGAO)
+
+    def resolver(self, orgao):
+        """
+        Posição de um órgão informado pelo código ou pelo nome (ex.: 'ESP-ESTADO DE SÃO PAULO').
+
+        Raises:
+            KeyError: se o órgão não estiver na hierarquia
+        """
+        posicao = self.codigos.get_indexer([str(orgao)])[0]
+        if posicao == SEM_ORGAO:
+            posicao = self._por_nome.get(orgao, SEM_ORGAO)
+        if posicao == SEM_ORGAO:
+            raise KeyError(f"Órgão não encontrado na hierarquia: {orgao}")
+        return int(posicao)
+
+    def _rotulos(self, posicoes, nomes=False):
+        return (self._nomes_ou_nulo if nomes else self._codigos_ou_nulo)[posicoes]
+
+    # 3. Consultas vetorizadas
+    def pai_de(self, codigos, nomes=False):
+        """Código (ou nome) do órgão vinculado de cada código; None nas raízes e fora do catálogo."""
+        posicoes = self.posicoes(codigos)
+        return self._rotulos(np.append(self.pai, SEM_ORGAO)[posicoes], nomes)
+
+    def ancestral(self, codigos, profundidade, nomes=False):
+        """
+        Ancestral de cada código em uma profundidade da árvore (0 = raiz, 1 = região ou
+        ministério...). Órgãos mais rasos que a profundidade pedida retornam None.
+        """
+        posicoes = self.posicoes(codigos)
+        if profundidade >= self.caminho.shape[1]:
+            return self._rotulos(np.full(len(posicoes), SEM_ORGAO), nomes)
+        caminho = np.append(self.caminho[:, profundidade], SEM_ORGAO)
+        return self._rotulos(caminho[posicoes], nomes)
+
+    def ancestrais(self, codigos, nomes=False):
+        """
+        Cadeia completa de cada código, da raiz até o próprio órgão.
+
+        Args:
+            codigos: Códigos de órgão (ex.: a coluna codigoOrgao de milhões de contratos)
+            nomes: Se True, retorna nomes em vez de códigos
+        Returns:
+            DataFrame com uma coluna por profundidade (nivel_0 = raiz), alinhado aos códigos
+        """
+        posicoes = self.posicoes(codigos)
+        caminho = np.vstack([self.caminho, np.full(self.caminho.shape[1], SEM_ORGAO)])[posicoes]
+        indice = codigos.index if isinstance(codigos, pd.Series) else None
+        return pd.DataFrame({f'nivel_{d}': self._rotulos(caminho[:, d], nomes) for d in range(caminho.shape[1])},
+                            index=indice)
+
+    def subordinado_a(self, codigos, orgao, incluir_proprio=True, posicoes=None):
+        """
+        Indica, para cada código, se o órgão está sob `orgao` em qualquer nível.
+        Cada teste é uma comparação de intervalos (Euler tour), sem percorrer a árvore.
+
+        Args:
+            codigos: Códigos de órgão
+            orgao: Código ou nome do órgão de referência
+            incluir_proprio: Se True, o próprio órgão conta como subordinado
+            posicoes: Resultado de self.posicoes(codigos), para reaproveitar entre vários
+                      roll-ups da mesma coluna (codigos é ignorado)
+        Returns:
+            Array booleano alinhado aos códigos (False para códigos fora do catálogo)
+        """
+        raiz = self.resolver(orgao)
+        posicoes = self.posicoes(codigos) if posicoes is None else posicoes
+        entrada = np.append(self.entrada, -1)[posicoes]
+        inicio = self.entrada[raiz] + (0 if incluir_proprio else 1)
+        return (entrada >= inicio) & (entrada < self.saida[raiz])
+
+    def subordinados(self, orgao, incluir_proprio=True, nomes=False):
+        """Códigos (ou nomes) de todos os órgãos sob `orgao`: uma fatia da pré-ordem."""
+        raiz = self.resolver(orgao)
+        inicio = self.entrada[raiz] + (0 if incluir_proprio else 1)
+        return self._rotulos(self.ordem[inicio:self.saida[raiz]], nomes)
+
+# 4. Índice do catálogo mais recente
+def hierarquia_orgaos(df_orgao=None):
+    """
+    Retorna o índice da hierarquia. Sem DataFrame, usa o catálogo de órgãos mais recente
+    (ler_dataset('orgao')) e reaproveita o índice até um novo snapshot ser gravado.
+
+    Args:
+        df_orgao: Catálogo de órgãos (opcional), ex.: o retorno de extract_orgao
+    Returns:
+        HierarquiaOrgaos
+    """
+    global _hierarquia_em_memoria
+    if df_orgao is not None:
+        return HierarquiaOrgaos(df_orgao)
+    versao = (listar_snapshots('orgao') or [None])[-1]
+    if _hierarquia_em_memoria is None or versao is None or _hierarquia_em_memoria[0] != versao:
+        _hierarquia_em_memoria = (versao, HierarquiaOrgaos(ler_dataset('orgao')))
+    return _hierarquia_em_memoria[1]
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+cache_dir = Path('data/cache')
+
+# Resposta guardada no cache. fresca=False indica que o TTL venceu e a resposta precisa ser revalidada.
+EntradaCache = namedtuple('EntradaCache', ['conteudo', 'etag', 'last_modified', 'fresca'])
+
+# 1. Cache persistente de respostas HTTP
+class CacheHttp:
+    """
+    Guarda as respostas JSON da API em um SQLite local, indexadas por URL + parâmetros.
+    O corpo é guardado como chegou (bytes comprimidos), sem decodificar e serializar de novo.
+
+    Cada endpoint tem seu próprio TTL: dentro dele a resposta é usada sem tocar a rede;
+    depois dele, ETag/Last-Modified (quando o servidor os envia) permitem revalidar com
+    uma requisição condicional (304 não traz corpo). O tamanho total é limitado e as
+    respostas menos usadas recentemente (LRU) são descartadas primeiro.
+
+    Args:
+        arquivo: Caminho do banco SQLite
+        ttl_por_endpoint: Dicionário {endpoint: TTL em segundos}
+        ttl_padrao: TTL dos endpoints fora de ttl_por_endpoint
+        tamanho_maximo_mb: Limite de espaço ocupado pelas respostas (comprimidas)
+    """
+
+    def __init__(self, arquivo=cache_dir / 'http_cache.sqlite', ttl_por_endpoint=None, ttl_padrao=3600,
+                 tamanho_maximo_mb=500):
+        self.ttl_por_endpoint = ttl_por_endpoint or {}
+        self.ttl_padrao = ttl_padrao
+        self.tamanho_maximo = tamanho_maximo_mb * 1024 * 1024
+        Path(arquivo).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(arquivo, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                endpoint TEXT,
+                corpo BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                armazenado_em REAL,
+                acessado_em REAL,
+                tamanho INTEGER
+            )
+        """)
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_acesso ON respostas (acessado_em)")
+        self._conexao.commit()
+        self._tamanho_total = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        self.acertos = 0
+        self.revalidacoes = 0
+        self.faltas = 0
+
+    @staticmethod
+    def _chave(url, params):
+        identificacao = json.dumps({'url': url, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha1(identificacao.encode('utf-8')).hexdigest()
+
+    def _ttl(self, endpoint):
+        return self.ttl_por_endpoint.get(endpoint, self.ttl_padrao)
+
+    def obter(self, url, endpoint, params):
+        """
+        Retorna a resposta guardada para a consulta (fresca ou vencida), ou None se não houver.
+        """
+        chave = self._chave(url + endpoint, params)
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT corpo, etag, last_modified, armazenado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                self.faltas += 1
+                return None
+            self._conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+            self._conexao.commit()
+        corpo, etag, last_modified, armazenado_em = linha
+        fresca = time.time() - armazenado_em < self._ttl(endpoint)
+        with self._lock:
+            if fresca:
+                self.acertos += 1
+            else:
+                self.revalidacoes += 1
+        return EntradaCache(zlib.decompress(corpo), etag, last_modified, fresca)
+
+    def guardar(self, url, endpoint, params, conteudo, etag=None, last_modified=None):
+        """Guarda (ou substitui) o corpo (bytes) da resposta de uma consulta e aplica o limite de tamanho."""
+        chave = self._chave(url + endpoint, params)
+        corpo = zlib.compress(conteudo)
+        agora = time.time()
+        with self._lock:
+            anterior = self._conexao.execute("SELECT tamanho FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave, endpoint, corpo, etag, last_modified, agora, agora, len(corpo)),
+            )
+            self._tamanho_total += len(corpo) - (anterior[0] if anterior else 0)
+            self._despejar()
+            self._conexao.commit()
+
+    def renovar(self, url, endpoint, params):
+        """Reinicia o TTL de uma resposta confirmada pelo servidor (304 Not Modified)."""
+        chave = self._chave(url + endpoint, params)
+        with self._lock:
+            self._conexao.execute("UPDATE respostas SET armazenado_em = ? WHERE chave = ?", (time.time(), chave))
+            self._conexao.commit()
+
+    def _despejar(self):
+        """Remove as respostas acessadas há mais tempo até o cache voltar a 90% do limite."""
+        if self._tamanho_total <= self.tamanho_maximo:
+            return
+        alvo = self.tamanho_maximo * 0.9
+        removidas = 0
+        for chave, tamanho in self._conexao.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY acessado_em"
+        ).fetchall():
+            if self._tamanho_total <= alvo:
+                break
+            self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            self._tamanho_total -= tamanho
+            removidas += 1
+        logging.info(f"Cache HTTP: {removidas} respostas antigas descartadas (limite de {self.tamanho_maximo // 2**20} MB)")
+
+    def limpar(self):
+        """Apaga todas as respostas do cache."""
+        with self._lock:
+            self._conexao.execute("DELETE FROM respostas")
+            self._conexao.commit()
+            self._tamanho_total = 0
+
+    def estatisticas(self):
+        """Retorna acertos, revalidações, faltas e o tamanho ocupado (MB) desde a abertura do cache."""
+        return {
+            'acertos': self.acertos,
+            'revalidacoes': self.revalidacoes,
+            'faltas': self.faltas,
+            'tamanho_mb': round(self._tamanho_total / 2**20, 2),
+        }
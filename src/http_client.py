@@ -0,0 +1,160 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+# 1. Função para criar uma sessão HTTP reutilizável
+def criar_sessao(pool_size=10):
+    """
+    Cria uma sessão HTTP com pool de conexões keep-alive.
+    Reaproveitar a conexão evita um novo handshake TCP/TLS a cada página.
+
+    Args:
+        pool_size: Número máximo de conexões mantidas abertas por host
+    Returns:
+        requests.Session configurada
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# 2. Limitador global de requisições por segundo
+class RateLimiter:
+    """
+    Token bucket (agendamento virtual) que respeita um orçamento global de requisições
+    por segundo, permitindo rajadas de até `rajada` requisições. Pode ser compartilhado
+    entre várias threads (e várias extrações).
+
+    Com `maximo` acima da taxa inicial, a taxa se adapta às respostas do servidor:
+    sobe 5% a cada resposta enquanto as respostas chegam rápidas, cai pela metade
+    em 429/5xx/erros de conexão e o limitador inteiro pausa pelo tempo do Retry-After.
+
+    Args:
+        requisicoes_por_segundo: Taxa inicial de requisições por segundo (None ou 0 = sem limite)
+        maximo: Taxa máxima da adaptação (None = taxa fixa)
+        rajada: Número de requisições que podem sair juntas após um período ocioso
+        latencia_saudavel: Latência (s) até a qual uma resposta permite aumentar a taxa
+    """
+
+    def __init__(self, requisicoes_por_segundo, maximo=None, rajada=1, latencia_saudavel=1.0):
+        self.taxa = float(requisicoes_por_segundo or 0)
+        self.minimo = self.taxa / 8
+        self.maximo = max(float(maximo), self.taxa) if maximo and self.taxa else self.taxa
+        self.rajada = rajada
+        self.latencia_saudavel = latencia_saudavel
+        self._lock = threading.Lock()
+        self._agendado = time.monotonic()
+        self._pausa_ate = 0.0
+        self._estatisticas = {}
+
+    @property
+    def intervalo(self):
+        return 1.0 / self.taxa if self.taxa else 0.0
+
+    def aguardar(self):
+        """Bloqueia a thread atual até que a próxima requisição esteja liberada."""
+        if not self.taxa:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            agendado = max(self._agendado, agora, self._pausa_ate)
+            liberacao = max(agora, self._pausa_ate, agendado - (self.rajada - 1) * self.intervalo)
+            self._agendado = agendado + self.intervalo
+        espera = liberacao - agora
+        if espera > 0:
+            time.sleep(espera)
+
+    def registrar(self, endpoint, status, latencia, retry_after=None):
+        """
+        Registra o resultado de uma requisição: atualiza as estatísticas do endpoint
+        e, no modo adaptativo, ajusta a taxa.
+
+        Args:
+            endpoint: Endpoint consultado
+            status: Código HTTP da resposta (None = erro de conexão/timeout)
+            latencia: Tempo da requisição em segundos
+            retry_after: Segundos pedidos pelo servidor no cabeçalho Retry-After (opcional)
+        """
+        sobrecarga = status is None or status == 429 or status >= 500
+        with self._lock:
+            est = self._estatisticas.setdefault(endpoint, {
+                'requisicoes': 0, 'erros': 0, 'throttles': 0, 'latencia_total': 0.0, 'latencia_max': 0.0,
+            })
+            est['requisicoes'] += 1
+            est['latencia_total'] += latencia
+            est['latencia_max'] = max(est['latencia_max'], latencia)
+            if status == 429:
+                est['throttles'] += 1
+            elif sobrecarga:
+                est['erros'] += 1
+
+            if retry_after:
+                self._pausa_ate = max(self._pausa_ate, time.monotonic() + retry_after)
+            if not (self.taxa and self.maximo > self.minimo):
+                return
+            if sobrecarga:
+                self.taxa = max(self.minimo, self.taxa / 2)
+            elif latencia <= self.latencia_saudavel:
+                self.taxa = min(self.maximo, self.taxa * 1.05)
+            else:
+                self.taxa = max(self.minimo, self.taxa * 0.9)
+
+    def estatisticas(self):
+        """
+        Retorna as estatísticas por endpoint desde a criação do limitador.
+
+        Returns:
+            Dicionário {endpoint: {'requisicoes', 'erros', 'throttles', 'latencia_media', 'latencia_max'}}
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    'requisicoes': est['requisicoes'],
+                    'erros': est['erros'],
+                    'throttles': est['throttles'],
+                    'latencia_media': round(est['latencia_total'] / est['requisicoes'], 3),
+                    'latencia_max': round(est['latencia_max'], 3),
+                }
+                for endpoint, est in self._estatisticas.items()
+            }
+
+# 3. Funções de espera entre tentativas
+def ler_retry_after(response):
+    """
+    Lê o cabeçalho Retry-After (segundos ou data HTTP).
+
+    Returns:
+        Segundos a esperar, ou None se o cabeçalho não existir ou for inválido
+    """
+    valor = response.headers.get('Retry-After')
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+def calcular_espera(tentativa, retry_after=None, base=1.0, maximo=60.0):
+    """
+    Tempo de espera antes da próxima tentativa: o Retry-After do servidor, se houver;
+    senão, backoff exponencial com jitter completo (sorteado entre 0 e base * 2^tentativa).
+
+    Args:
+        tentativa: Número da tentativa que falhou (0 = primeira)
+        retry_after: Segundos pedidos pelo servidor (opcional)
+        base: Espera base em segundos
+        maximo: Teto da espera em segundos
+    """
+    if retry_after is not None:
+        return min(retry_after, maximo)
+    return random.uniform(0, min(maximo, base * 2 ** tentativa))
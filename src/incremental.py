@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from datetime import datetime
+import pandas as pd
+from cdc import cdc_inicializado, inicializar_cdc, registrar_snapshot
+from checkpoint import limpar_checkpoint
+from extract import extract_dataframe, save_dataset, endpoint_uasg, endpoint_orgao
+from schemas import aplicar_esquema
+from storage import ler_dataset, remover_snapshots
+
+state_dir = Path('data/state')
+arquivo_marcas = state_dir / 'marcas_dagua.json'
+# Catálogos extraídos em paralelo (orquestrador.py) gravam no mesmo arquivo de marcas
+_lock_marcas = threading.Lock()
+# Snapshots completos mantidos em data/raw; o histórico anterior fica no changelog de CDC
+SNAPSHOTS_RETIDOS = 2
+
+# CONFIGURAÇÃO DA EXTRAÇÃO INCREMENTAL POR DATASET
+# parametro_servidor: nome do filtro da API que recebe a marca d'água (None = diff local).
+# Os endpoints de UASG e órgão não expõem filtro por data de movimento, então o
+# delta é calculado localmente; basta preencher o parâmetro se a API passar a oferecê-lo.
+INCREMENTAL = {
+    'uasg': {
+        'endpoint': endpoint_uasg,
+        'params': {'statusUasg': 'true', 'tamanhoPagina': 500},
+        'chave': 'codigoUasg',
+        'coluna_marca': 'dataHoraMovimento',
+        'parametro_servidor': None,
+    },
+    'orgao': {
+        'endpoint': endpoint_orgao,
+        'params': {'statusOrgao': 'true', 'tamanhoPagina': 500},
+        'chave': 'codigoOrgao',
+        'coluna_marca': 'dataHoraMovimento',
+        'parametro_servidor': None,
+    },
+}
+
+# 1. Funções para ler e gravar as marcas d'água
+def ler_marcas():
+    """Retorna o dicionário {dataset: marca d'água ISO} da última execução."""
+    if not arquivo_marcas.exists():
+        return {}
+    return json.loads(arquivo_marcas.read_text(encoding='utf-8'))
+
+def gravar_marca(dataset, valor):
+    """
+    Atualiza a marca d'água de um dataset (gravação atômica).
+
+    Args:
+        dataset: Nome do dataset
+        valor: Timestamp (pd.Timestamp ou string ISO) do registro mais recente já processado
+    """
+    with _lock_marcas:
+        marcas = ler_marcas()
+        marcas[dataset] = pd.Timestamp(valor).isoformat()
+        state_dir.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo_marcas.with_suffix('.tmp')
+        temporario.write_text(json.dumps(marcas, indent=2), encoding='utf-8')
+        os.replace(temporario, arquivo_marcas)
+
+# 2. Função para calcular o delta localmente
+def calcular_delta(df_novo, snapshot, chave, coluna_marca, marca):
+    """
+    Seleciona os registros novos ou alterados desde a marca d'água: movimento
+    posterior à marca ou chave ausente do snapshot anterior. Operação vetorizada.
+
+    Returns:
+        DataFrame com o delta
+    """
+    novos = ~df_novo[chave].isin(snapshot[chave])
+    if marca is not None and coluna_marca in df_novo.columns:
+        alterados = df_novo[coluna_marca] > pd.Timestamp(marca)
+        return df_novo[novos | alterados.fillna(False)]
+    return df_novo[novos]
+
+# 3. Função genérica de extração incremental
+def extract_incremental(url, dataset, save=True, session=None, limiter=None):
+    """
+    Extrai apenas os registros alterados desde a última execução e os mescla
+    no snapshot armazenado. Na primeira execução (sem snapshot ou sem marca
+    d'água), faz a extração completa.
+
+    Com parametro_servidor configurado, a marca d'água vai como filtro da API e só o
+    delta é baixado e mesclado. Sem ele, o catálogo baixado substitui o snapshot (registros
+    que a API deixou de devolver são removidos) e o delta, calculado localmente, só
+    define a nova marca d'água.
+
+    Args:
+        url: URL base da API
+        dataset: Nome do dataset configurado em INCREMENTAL ('uasg' ou 'orgao')
+        save: Se True, salva o snapshot atualizado
+        session: Sessão HTTP a reutilizar (opcional)
+        limiter: RateLimiter compartilhado (opcional), para dividir o orçamento com outras extrações
+    Returns:
+        DataFrame com o snapshot completo atualizado
+    """
+    config = INCREMENTAL[dataset]
+    chave, coluna_marca = config['chave'], config['coluna_marca']
+    marca = ler_marcas().get(dataset)
+
+    try:
+        # data_extracao é coluna de partição do snapshot, não do catálogo
+        snapshot = ler_dataset(dataset).drop(columns='data_extracao', errors='ignore')
+    except FileNotFoundError:
+        snapshot = None
+
+    params = dict(config['params'])
+    filtro_servidor = snapshot is not None and marca is not None and config['parametro_servidor']
+    if filtro_servidor:
+        params[config['parametro_servidor']] = marca
+        logging.info(f"Extração incremental de {dataset}: registros alterados desde {marca}")
+    elif snapshot is not None:
+        logging.info(f"Extração incremental de {dataset}: diff local contra o snapshot anterior ({len(snapshot)} registros)")
+    else:
+        logging.info(f"Nenhum snapshot de {dataset} encontrado. Extração completa.")
+
+    grupo_checkpoint = f"{dataset}_incremental"
+    df_novo = aplicar_esquema(
+        extract_dataframe(url, config['endpoint'], dataset, params=params, checkpoint=grupo_checkpoint,
+                          session=session, limiter=limiter), dataset
+    )
+    limpar_checkpoint(grupo_checkpoint)
+
+    removidos = 0
+    if snapshot is None or df_novo.empty:
+        atualizado = df_novo if snapshot is None else snapshot
+        delta = df_novo
+    elif filtro_servidor:
+        # Só o delta foi baixado: substitui as versões anteriores das mesmas chaves
+        delta = df_novo
+        atualizado = pd.concat(
+            [snapshot[~snapshot[chave].isin(delta[chave])], delta.reindex(columns=snapshot.columns)],
+            ignore_index=True,
+        )
+    else:
+        # O catálogo inteiro foi baixado: ele é o novo snapshot, e chaves que a API deixou de
+        # devolver (ex.: desativadas) saem dele. O delta serve só para o log e a marca d'água
+        delta = calcular_delta(df_novo, snapshot, chave, coluna_marca, marca)
+        removidos = int((~snapshot[chave].isin(df_novo[chave])).sum())
+        atualizado = df_novo
+
+    logging.info(f"{dataset}: {len(delta)} registros novos ou alterados, {removidos} removidos "
+                 f"(snapshot com {len(atualizado)} registros)")
+
+    if save and (not delta.empty or removidos):
+        save_dataset(atualizado, dataset)
+        # Changelog de CDC: na primeira vez reprocessa todos os snapshots já guardados
+        if cdc_inicializado(dataset):
+            registrar_snapshot(dataset, atualizado, datetime.now().strftime('%Y-%m-%d'))
+        else:
+            inicializar_cdc(dataset)
+        remover_snapshots(dataset, SNAPSHOTS_RETIDOS)
+    if not delta.empty and coluna_marca in delta.columns and delta[coluna_marca].notna().any():
+        gravar_marca(dataset, delta[coluna_marca].max())
+    return atualizado
+
+def extract_uasg_incremental(url, save=True, session=None, limiter=None):
+    """Extração incremental do catálogo de UASGs (ver extract_incremental)."""
+    return extract_incremental(url, 'uasg', save=save, session=session, limiter=limiter)
+
+def extract_orgao_incremental(url, save=True, session=None, limiter=None):
+    """Extração incremental do catálogo de órgãos (ver extract_incremental)."""
+    return extract_incremental(url, 'orgao', save=save, session=session, limiter=limiter)
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+import pandas as pd
+import requests
+from documentos import CPF, analisar_documentos
+from http_client import criar_sessao
+from extract import _requisitar_pagina, criar_limiter, registrar_estatisticas, MAX_WORKERS, REQUISICOES_POR_SEGUNDO, endpoint_uasg, endpoint_orgao
+from storage import ler_dataset
+
+endpoint_fornecedores = 'modulo-fornecedor/1_consultarFornecedor'
+state_dir = Path('data/state')
+arquivo_ausentes = state_dir / 'ids_ausentes.json'
+AUSENTES_TTL_DIAS = 30  # IDs não encontrados só voltam a ser consultados depois desse prazo
+
+# CONFIGURAÇÃO DAS CONSULTAS POR ENTIDADE
+# catalogo: dataset completo salvo localmente (extract_uasg/extract_orgao), consultado antes da API.
+# parametro: função (ID, tipo) que monta os parâmetros da consulta de um único ID.
+# analisar: função vetorizada que devolve, para cada ID, o ID padronizado ('documento'), se é
+# válido ('valido'; inválidos não viram requisição) e o tipo ('tipo'), repassado a parametro.
+LOOKUPS = {
+    'uasg': {
+        'endpoint': endpoint_uasg,
+        'catalogo': 'uasg',
+        'chave': 'codigoUasg',
+        'parametro': lambda codigo, tipo: {'codigoUasg': codigo, 'statusUasg': 'true'},
+    },
+    'orgao': {
+        'endpoint': endpoint_orgao,
+        'catalogo': 'orgao',
+        'chave': 'codigoOrgao',
+        'parametro': lambda codigo, tipo: {'codigoOrgao': codigo, 'statusOrgao': 'true'},
+    },
+    'fornecedor': {
+        'endpoint': endpoint_fornecedores,
+        'catalogo': None,
+        'chave': None,
+        'parametro': lambda ni, tipo: {'cpf' if tipo == CPF else 'cnpj': ni, 'ativo': 'true'},
+        'analisar': analisar_documentos,
+    },
+}
+
+# 1. Funções do cache negativo (IDs que a API não conhece)
+def ler_ausentes(entidade):
+    """
+    Retorna os IDs da entidade que não foram encontrados na API dentro do prazo AUSENTES_TTL_DIAS.
+
+    Returns:
+        Dicionário {id: data da consulta (YYYY-MM-DD)}
+    """
+    if not arquivo_ausentes.exists():
+        return {}
+    limite = (datetime.now() - timedelta(days=AUSENTES_TTL_DIAS)).strftime('%Y-%m-%d')
+    ausentes = json.loads(arquivo_ausentes.read_text(encoding='utf-8')).get(entidade, {})
+    return {ident: data for ident, data in ausentes.items() if data >= limite}
+
+def gravar_ausentes(entidade, ids):
+    """Acrescenta IDs não encontrados ao cache negativo da entidade (gravação atômica)."""
+    if not ids:
+        return
+    todos = json.loads(arquivo_ausentes.read_text(encoding='utf-8')) if arquivo_ausentes.exists() else {}
+    hoje = datetime.now().strftime('%Y-%m-%d')
+    todos.setdefault(entidade, {}).update({ident: hoje for ident in ids})
+    state_dir.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo_ausentes.with_suffix('.tmp')
+    temporario.write_text(json.dumps(todos, indent=2), encoding='utf-8')
+    os.replace(temporario, arquivo_ausentes)
+
+# 2. Função para consultar os catálogos locais
+def _buscar_no_catalogo(config, ids):
+    """
+    Procura os IDs no catálogo completo já salvo em disco (filtro empurrado para o armazenamento).
+
+    Returns:
+        DataFrame com os registros encontrados (vazio se não houver catálogo)
+    """
+    if config['catalogo'] is None:
+        return pd.DataFrame()
+    try:
+        return ler_dataset(config['catalogo'], filtros=[(config['chave'], 'in', list(ids))])
+    except FileNotFoundError:
+        logging.info(f"Catálogo local '{config['catalogo']}' não encontrado. Todos os IDs serão consultados na API.")
+        return pd.DataFrame()
+
+# 3. Função principal de consulta em lote
+def buscar_por_ids(entidade, ids, url, max_workers=MAX_WORKERS, requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+                   max_retries=3, session=None, limiter=None):
+    """
+    Busca os registros de uma lista de IDs com o mínimo de requisições:
+    1. Remove duplicados e valores vazios (e, em fornecedores, CPFs/CNPJs inválidos);
+    2. Resolve o que já está no catálogo local (orgao/uasg);
+    3. Descarta IDs do cache negativo (não encontrados em consultas recentes);
+    4. Consulta o restante em paralelo, sob o orçamento global de requisições.
+    IDs que a API não conhece entram no cache negativo; IDs com erro de rede não.
+
+    Args:
+        entidade: Entidade configurada em LOOKUPS ('orgao', 'uasg' ou 'fornecedor')
+        ids: Lista (ou Series) de códigos / CPFs / CNPJs
+        url: URL base da API
+        max_workers: Número de consultas simultâneas
+        requisicoes_por_segundo: Orçamento de requisições por segundo
+        max_retries: Número máximo de tentativas por consulta
+        session: Sessão HTTP compartilhada (opcional)
+        limiter: RateLimiter compartilhado (opcional)
+    Returns:
+        DataFrame com os registros encontrados (catálogo local + API)
+    """
+    config = LOOKUPS[entidade]
+    unicos = pd.Series(ids, dtype='string').str.strip().dropna()
+    unicos = unicos[unicos != '']
+    tipos = {}
+    if config.get('analisar'):
+        analise = config['analisar'](unicos)
+        if not analise['valido'].all():
+            logging.info(f"{entidade}: {int((~analise['valido']).sum())} IDs inválidos descartados sem consulta à API")
+        analise = analise[analise['valido']]
+        tipos = dict(zip(analise['documento'], analise['tipo']))
+        unicos = analise['documento']
+    unicos = set(unicos)
+    if not unicos:
+        logging.warning(f"Nenhum ID válido de {entidade} para consultar")
+        return pd.DataFrame()
+
+    locais = _buscar_no_catalogo(config, unicos)
+    encontrados = set(locais[config['chave']]) if not locais.empty else set()
+    ausentes = ler_ausentes(entidade)
+    pendentes = sorted(unicos - encontrados - set(ausentes))
+    logging.info(f"{entidade}: {len(unicos)} IDs únicos, {len(encontrados)} no catálogo local, "
+                 f"{len(unicos - encontrados) - len(pendentes)} no cache negativo, {len(pendentes)} a consultar na API")
+
+    registros, nao_encontrados, erros = [], [], 0
+    if pendentes:
+        propria_sessao = session is None
+        session = criar_sessao(pool_size=max_workers) if propria_sessao else session
+        proprio_limiter = limiter is None
+        limiter = criar_limiter(requisicoes_por_segundo) if proprio_limiter else limiter
+
+        def consultar(ident):
+            params = {**config['parametro'](ident, tipos.get(ident)), 'tamanhoPagina': 10}
+            return _requisitar_pagina(session, url, config['endpoint'], params, 1, max_retries, limiter).get('resultado', [])
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futuros = {executor.submit(consultar, ident): ident for ident in pendentes}
+                for i, futuro in enumerate(as_completed(futuros), 1):
+                    ident = futuros[futuro]
+                    try:
+                        resultado = futuro.result()
+                    except requests.RequestException as e:
+                        erros += 1
+                        logging.warning(f"Erro ao consultar {entidade} {ident}: {e}")
+                        continue
+                    if resultado:
+                        registros.extend(resultado)
+                    else:
+                        nao_encontrados.append(ident)
+                    if i % 50 == 0:
+                        logging.info(f"Progresso: {i}/{len(pendentes)} {entidade} consultados.")
+        finally:
+            if propria_sessao:
+                session.close()
+            if proprio_limiter:
+                registrar_estatisticas(limiter)
+        gravar_ausentes(entidade, nao_encontrados)
+
+    logging.info(f"{entidade}: {len(registros)} registros obtidos da API "
+                 f"({len(nao_encontrados)} não encontrados, {erros} erros)")
+    # Colunas de partição do catálogo local não fazem parte do registro
+    locais = locais.drop(columns='data_extracao', errors='ignore')
+    partes = [df for df in (locais, pd.DataFrame(registros)) if not df.empty]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
@@ -1,7 +1,15 @@
-from extract import extract_contratos_por_trimestre, extract_uasg, extract_orgao
+from extract import extract_contratos_particionado, extract_uasg, extract_orgao
 from extract import url, endpoint_contratos, endpoint_uasg, endpoint_orgao
-from transform import transform_contratos, transform_uasg, transform_orgao
-import time
+from extract import criar_limiter, registrar_estatisticas, JANELAS_PARALELAS, MAX_WORKERS
+from incremental import extract_uasg_incremental, extract_orgao_incremental
+from transform import transform_contratos, transform_contratos_em_lotes, transform_contratos_paralelo
+from load import carregar_modelo_estrela, warehouse_dir
+from analysis import atualizar_cubos, cubos_dir
+from modelo_dimensional import construir_modelo_estrela
+from storage import ler_dataset
+from metricas import iniciar_etapa, finalizar_etapa, salvar_relatorio, perfilar
+from orquestrador import Pipeline, saidas_dataset
+from http_client import criar_sessao
 from datetime import datetime
 import logging
 
@@ -12,119 +20,148 @@ logging.basicConfig(
     datefmt="%H:%M:%S"
 )
 
+# Perfil de CPU (cProfile) da execução inteira em data/metrics/perfil_*.prof (configurável)
+PERFILAR = False
+
 def main():
     print("=" * 50)
     logging.info(f"INICIANDO PIPELINE ETL - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
-    
-    inicio_total = time.time()
-    
-    # === FASE DE EXTRAÇÃO ===
-    print()
-    logging.info("=== FASE DE EXTRAÇÃO ===")
-    inicio_extracao = time.time()
-    
-    # Extraindo dados de contratos estratificados por trimestre
-    logging.info(">>> Extraindo dados de contratos com amostragem por trimestre...")
-    contratos_por_trimestre = 5000 # Máximo de contratos a extrair por trimestre (configurável)
-    ano = datetime.now().year - 1  # Ano de referência para extração -> ano anterior (configurável)
-    logging.info(f">> Iniciando extração: {contratos_por_trimestre} contratos por trimestre do ano {ano}")
-    df_contratos = extract_contratos_por_trimestre(url=url, endpoint_contratos=endpoint_contratos, contratos_por_trimestre=contratos_por_trimestre, save=True, ano=ano)
-
-    # Extraindo todos os dados de UASG e Órgãos
-    print()
-    logging.info(">>> Extraindo todos os dados de UASGs...")
-    df_uasg = extract_uasg(url=url, endpoint_uasg=endpoint_uasg, save=True)
-    print()
-    logging.info(">>> Extraindo todos os dados de Órgãos...")
-    df_orgao = extract_orgao(url=url, endpoint_orgao=endpoint_orgao, save=True)
 
-    fim_extracao = time.time()
-    tempo_extracao = round((fim_extracao - inicio_extracao) / 60, 2)
+    iniciar_etapa('pipeline')
 
-    print()
-    logging.info("=== RESUMO DA EXTRAÇÃO ===")
-    logging.info(f"Contratos: {len(df_contratos):,} registros (amostra estratificada por trimestre)")
+    # === CONFIGURAÇÃO ===
+    contratos_por_trimestre = 5000 # Máximo de contratos a extrair por janela (configurável, None = ano completo)
+    granularidade = 'trimestre'  # Tamanho das janelas: 'trimestre', 'mes', 'semana' ou 'dia' (configurável)
+    ano = datetime.now().year - 1  # Ano de referência para extração -> ano anterior (configurável)
+    modo_incremental = True  # Catálogos: mescla no último snapshot apenas o que mudou (configurável)
+    # 'memoria': DataFrame inteiro; 'lotes': lê data/raw em lotes (fora da memória);
+    # 'paralelo': um processo por partição ano/trimestre (requer Parquet) (configurável)
+    modo_transformacao = 'memoria'
+    banco = 'sqlite'  # Banco de destino: 'sqlite', 'duckdb' ou 'postgres' (configurável)
+    dataset_contratos = 'contratos_amostra' if contratos_por_trimestre else 'contratos'
+
+    # === ETAPAS ===
+    # Grafo de dependências (orquestrador.py): as três extrações rodam em paralelo, a
+    # transformação de contratos começa assim que os contratos chegam, e etapas cujas
+    # entradas não mudaram desde a última execução são puladas.
+    #
+    #   extracao/contratos -> transformacao/contratos -> carregamento/modelo_estrela, carregamento/cubos
+    #   extracao/uasg      -> carregamento/modelo_estrela
+    #   extracao/orgao     -> carregamento/modelo_estrela, carregamento/cubos
+    pipeline = Pipeline()
+    # As extrações simultâneas dividem um só orçamento de requisições por segundo (e o
+    # recuo adaptativo após 429/Retry-After vale para todas) e um só pool de conexões
+    limiter = criar_limiter()
+    session = criar_sessao((JANELAS_PARALELAS + 2) * MAX_WORKERS)
+
+    def extrair_contratos():
+        logging.info(f">> Iniciando extração: {contratos_por_trimestre} contratos por {granularidade} do ano {ano}")
+        df_contratos = extract_contratos_particionado(url=url, endpoint_contratos=endpoint_contratos, contratos_por_janela=contratos_por_trimestre, granularidade=granularidade, save=True, ano=ano, session=session, limiter=limiter)
+        logging.info(f"Contratos: {len(df_contratos):,} registros (amostra estratificada por trimestre)")
+        # Exibir distribuição por trimestre para confirmação (antes da transformação, que modifica o DataFrame)
+        try:
+            distribuicao = df_contratos['trimestre'].value_counts().sort_index()
+            logging.info("Distribuição de contratos por trimestre:")
+            for trim, count in distribuicao.items():
+                logging.info(f"Trimestre {trim}: {count:,} contratos")
+        except:
+            logging.warning("Não foi possível exibir a distribuição por trimestre.")
+        logging.info(f"Colunas: {', '.join(sorted(df_contratos.columns.tolist())[:10])}...")
+        return df_contratos
+
+    def extrair_uasg():
+        if modo_incremental:
+            df_uasg = extract_uasg_incremental(url=url, save=True, session=session, limiter=limiter)
+        else:
+            df_uasg = extract_uasg(url=url, endpoint_uasg=endpoint_uasg, save=True, session=session, limiter=limiter)
+        logging.info(f"UASGs: {len(df_uasg):,} registros (todos disponíveis)")
+        logging.info(f"Colunas: {', '.join(sorted(df_uasg.columns.tolist())[:10])}...")
+        return df_uasg
+
+    def extrair_orgao():
+        if modo_incremental:
+            df_orgao = extract_orgao_incremental(url=url, save=True, session=session, limiter=limiter)
+        else:
+            df_orgao = extract_orgao(url=url, endpoint_orgao=endpoint_orgao, save=True, session=session, limiter=limiter)
+        logging.info(f"Órgãos: {len(df_orgao):,} registros (todos disponíveis)")
+        logging.info(f"Colunas: {', '.join(sorted(df_orgao.columns.tolist())[:10])}...")
+        return df_orgao
+
+    def ler_contratos_limpos():
+        return ler_dataset('contratos_limpos', camada='processed', esquema='contratos')
+
+    def transformar_contratos():
+        if modo_transformacao == 'paralelo':
+            transform_contratos_paralelo(origem=dataset_contratos)
+        elif modo_transformacao == 'lotes':
+            transform_contratos_em_lotes(origem=dataset_contratos)
+        else:
+            return transform_contratos(pipeline.resultado('extracao/contratos'))
+        return ler_contratos_limpos()
+
+    def carregar_modelo(df_contratos_limpo, df_uasg, df_orgao):
+        # Modelo estrela: fato_contratos + dimensões de órgão (hierarquia achatada), UASG, fornecedor e data
+        modelo = construir_modelo_estrela(df_contratos_limpo, df_uasg=df_uasg, df_orgao=df_orgao)
+        carregar_modelo_estrela(modelo, banco=banco)
+        return modelo
+
+    pipeline.tarefa('extracao/contratos', extrair_contratos, saidas=saidas_dataset(dataset_contratos),
+                    carregar=lambda: ler_dataset(dataset_contratos, esquema='contratos'))
+    pipeline.tarefa('extracao/uasg', extrair_uasg, saidas=saidas_dataset('uasg'), carregar=lambda: ler_dataset('uasg'))
+    pipeline.tarefa('extracao/orgao', extrair_orgao, saidas=saidas_dataset('orgao'), carregar=lambda: ler_dataset('orgao'))
+    # Em memória, os contratos extraídos são lidos do resultado da extração (ou do disco, se ela foi pulada)
+    pipeline.tarefa('transformacao/contratos', transformar_contratos, depende_de=['extracao/contratos'],
+                    saidas=saidas_dataset('contratos_limpos', 'processed'), carregar=ler_contratos_limpos,
+                    parametros={'modo': modo_transformacao})
+    pipeline.tarefa('carregamento/modelo_estrela', carregar_modelo,
+                    entradas=['transformacao/contratos', 'extracao/uasg', 'extracao/orgao'],
+                    saidas=[warehouse_dir], parametros={'banco': banco},
+                    contar=lambda modelo: sum(len(tabela) for tabela in modelo.values()))
+    # Cubos de análise (data/analysis): recalcula só as partições de contratos_limpos que mudaram
+    # Os atributos de órgão dos cubos (superior, esfera, poder) vêm do catálogo de órgãos
+    pipeline.tarefa('carregamento/cubos', lambda: atualizar_cubos(origem='contratos_limpos'),
+                    depende_de=['transformacao/contratos', 'extracao/orgao'], saidas=[cubos_dir])
 
-    # Exibir distribuição por trimestre para confirmação
     try:
-        distribuicao = df_contratos['trimestre'].value_counts().sort_index()
-        print()
-        logging.info("Distribuição de contratos por trimestre:")
-        for trim, count in distribuicao.items():
-            logging.info(f"Trimestre {trim}: {count:,} contratos")
-    except:
-        logging.warning("Não foi possível exibir a distribuição por trimestre.")
-
-    logging.info(f"Colunas: {', '.join(sorted(df_contratos.columns.tolist())[:10])}...")
-
-    logging.info(f"UASGs: {len(df_uasg):,} registros (todos disponíveis)")
-    logging.info(f"Colunas: {', '.join(sorted(df_uasg.columns.tolist())[:10])}...")
-
-    logging.info(f"Órgãos: {len(df_orgao):,} registros (todos disponíveis)")
-    logging.info(f"Colunas: {', '.join(sorted(df_orgao.columns.tolist())[:10])}...")
-
-    print()
-    logging.info(f"Tempo de extração: {tempo_extracao} minutos")
-    logging.info("=== Extração concluída com sucesso! ===")
-
-    # === FASE DE TRANSFORMAÇÃO ===
-    print()
-    logging.info("=== FASE DE TRANSFORMAÇÃO ===")
-    inicio_transformacao = time.time()
-
-
-
-
-    df_contratos_limpo = transform_contratos(df_contratos)
-    #df_uasg_limpo = transform_uasg(df_uasg)
-    #df_orgao_limpo = transform_orgao(df_orgao)
-
-
-
-
-    fim_transformacao = time.time()
-    tempo_transformacao = round((fim_transformacao - inicio_transformacao) / 60, 2)
-    logging.info(f"Tempo de transformação: {tempo_transformacao} minutos")
-    logging.info("=== Transformação concluída com sucesso! ===")
-
-
-    """
-    # === FASE DE CARREGAMENTO ===
-    print()
-    logging.info("=== FASE DE CARREGAMENTO ===")
-    inicio_carga = time.time()
-    
-    # Adicionar lógica de carregamento aqui
-    # TODO: Implementar funções de carregamento dos dados
-
-    fim_carregamento = time.time()
-    tempo_carregamento = round((fim_carregamento - inicio_carregamento) / 60, 2)
-    print(f"\nTempo de carregamento: {tempo_carregamento} minutos")
-    print("\n=== Carregamento concluído com sucesso! ===")
-    """
+        pipeline.executar()
+    finally:
+        session.close()
+    registrar_estatisticas(limiter)
 
     # === RESUMO FINAL ===
-    fim_total = time.time()
-    tempo_total = round((fim_total - inicio_total) / 60, 2)
-    
+    # As fases se sobrepõem: cada tempo vai do início da primeira etapa da fase ao fim da última
+    tempo_extracao = round(pipeline.duracao_fase('extracao') / 60, 2)
+    tempo_transformacao = round(pipeline.duracao_fase('transformacao') / 60, 2)
+    tempo_carregamento = round(pipeline.duracao_fase('carregamento') / 60, 2)
+    tempo_total = round(finalizar_etapa('pipeline') / 60, 2)
+
     print("\n" + "=" * 50)
     logging.info(f"PIPELINE ETL CONCLUÍDO - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logging.info("=" * 50)
     logging.info(f"Tempo total de processamento: {tempo_total} minutos")
     logging.info(f"- Extração: {tempo_extracao} minutos")
-    #logging.info(f"- Transformação: {tempo_transformacao} minutos")
-    #logging.info(f"- Carregamento: {tempo_carregamento} minutos")
+    logging.info(f"- Transformação: {tempo_transformacao} minutos")
+    logging.info(f"- Carregamento: {tempo_carregamento} minutos")
+    if pipeline.puladas:
+        logging.info(f"- Etapas puladas (entradas sem mudanças): {', '.join(pipeline.puladas)}")
     logging.info("=" * 50)
 
 
 if __name__ == "__main__":
     try:
-        main()
+        if PERFILAR:
+            with perfilar():
+                main()
+        else:
+            main()
     except KeyboardInterrupt:
         print()
         logging.info("Processo interrompido pelo usuário.")
     except Exception as e:
         print()
         logging.error(f"Erro durante a execução do pipeline: {e}")
-        raise
\ No newline at end of file
+        raise
+    finally:
+        # Relatório JSON (etapas, HTTP por endpoint, memória) mesmo se a execução falhar
+        salvar_relatorio()
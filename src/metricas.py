@@ -0,0 +1,212 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource  # Indisponível no Windows: o pico de memória fica fora do relatório
+except ImportError:
+    resource = None
+
+metricas_dir = Path('data/metrics')
+
+# Tempos de cada requisição, em segundos: rede (requisição + download), parse (JSON) e
+# espera (limitador de requisições e backoff entre tentativas). Somados entre as threads,
+# então podem passar da duração da etapa quando há páginas em paralelo
+TEMPOS_HTTP = ['tempo_rede', 'tempo_parse', 'tempo_espera']
+CONTADORES_HTTP = ['requisicoes', 'paginas', 'paginas_checkpoint', 'cache', 'revalidacoes', 'bytes',
+                   'retries', 'erros', 'throttles']
+
+_lock = threading.Lock()
+_inicio = None
+_etapas = []  # Etapas finalizadas, na ordem em que terminaram
+_abertas = {}  # {nome: etapa em andamento}
+_endpoints = {}  # {endpoint: contadores, tempos e latências}
+
+
+# 1. Funções auxiliares
+def _novo_http():
+    return {**dict.fromkeys(CONTADORES_HTTP, 0), **dict.fromkeys(TEMPOS_HTTP, 0.0)}
+
+def _rss_pico_mb():
+    """Pico de memória residente do processo (e dos processos filhos já encerrados), em MB."""
+    if resource is None:
+        return None, None
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    escala = 1 / 1024 ** 2 if sys.platform == 'darwin' else 1 / 1024
+    return (round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * escala, 1),
+            round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * escala, 1))
+
+def _arredondar(valores):
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in valores.items()}
+
+
+# 2. Etapas do pipeline
+def iniciar_etapa(nome):
+    """
+    Começa a medir uma etapa (ex.: 'extracao', 'extracao/contratos'). Etapas podem ser
+    aninhadas; eventos HTTP registrados enquanto a etapa está aberta entram na sua contagem.
+    """
+    global _inicio
+    with _lock:
+        _inicio = _inicio or time.time()
+        _abertas[nome] = {'inicio': time.time(), 'inicio_perf': time.perf_counter(),
+                          'inicio_cpu': time.process_time(), 'http': _novo_http()}
+
+def finalizar_etapa(nome, registros=None):
+    """
+    Encerra a etapa e guarda duração, tempo de CPU, registros/s e pico de memória.
+
+    Args:
+        nome: Nome usado em iniciar_etapa
+        registros: Quantidade de registros processados na etapa (opcional)
+    Returns:
+        Duração da etapa em segundos
+    """
+    with _lock:
+        etapa = _abertas.pop(nome)
+    duracao = time.perf_counter() - etapa['inicio_perf']
+    rss, rss_filhos = _rss_pico_mb()
+    resumo = {
+        'nome': nome,
+        'inicio': datetime.fromtimestamp(etapa['inicio']).isoformat(timespec='seconds'),
+        'duracao_s': round(duracao, 3),
+        'cpu_s': round(time.process_time() - etapa['inicio_cpu'], 3),
+        'registros': registros,
+        'registros_por_s': round(registros / duracao, 1) if registros and duracao else None,
+        'rss_pico_mb': rss,
+        'rss_pico_filhos_mb': rss_filhos,
+        'http': _arredondar(etapa['http']),
+    }
+    with _lock:
+        _etapas.append(resumo)
+    return duracao
+
+@contextmanager
+def etapa(nome):
+    """
+    Mede um bloco como etapa. O dicionário retornado aceita 'registros'.
+
+    Ex.:
+        with etapa('extracao/uasg') as e:
+            df = extract_uasg(...)
+            e['registros'] = len(df)
+    """
+    info = {'registros': None}
+    iniciar_etapa(nome)
+    try:
+        yield info
+    finally:
+        finalizar_etapa(nome, registros=info['registros'])
+
+
+# 3. Eventos HTTP (chamados pelas threads de extração)
+def registrar_http(endpoint, latencia=None, **valores):
+    """
+    Soma contadores e tempos de uma requisição ao endpoint e às etapas abertas.
+
+    Args:
+        endpoint: Endpoint consultado
+        latencia: Latência da resposta em segundos (entra nos percentis)
+        **valores: Contadores de CONTADORES_HTTP e tempos de TEMPOS_HTTP (ex.: bytes=1024, tempo_parse=0.01)
+    """
+    with _lock:
+        alvos = [_endpoints.setdefault(endpoint, {**_novo_http(), 'latencias': []})]
+        alvos += [aberta['http'] for aberta in _abertas.values()]
+        for alvo in alvos:
+            for chave, valor in valores.items():
+                alvo[chave] += valor
+        if latencia is not None:
+            alvos[0]['latencias'].append(latencia)
+
+
+# 4. Relatório da execução
+def relatorio():
+    """
+    Relatório da execução até agora: etapas (na ordem em que terminaram), etapas ainda
+    abertas (se a execução falhou no meio) e, por endpoint, contadores, tempos e percentis
+    de latência.
+
+    Returns:
+        Dicionário serializável em JSON
+    """
+    with _lock:
+        etapas = [dict(e) for e in _etapas]
+        abertas = list(_abertas)
+        endpoints = {ep: dict(est) for ep, est in _endpoints.items()}
+    for est in endpoints.values():
+        latencias = np.array(est.pop('latencias'))
+        if len(latencias):
+            p50, p90, p99 = np.percentile(latencias, [50, 90, 99])
+            est.update(latencia_p50=float(p50), latencia_p90=float(p90), latencia_p99=float(p99),
+                       latencia_max=float(latencias.max()))
+        est.update(_arredondar(est))
+    rss, rss_filhos = _rss_pico_mb()
+    return {
+        'inicio': datetime.fromtimestamp(_inicio).isoformat(timespec='seconds') if _inicio else None,
+        'duracao_s': round(time.time() - _inicio, 3) if _inicio else 0.0,
+        'python': sys.version.split()[0],
+        'rss_pico_mb': rss,
+        'rss_pico_filhos_mb': rss_filhos,
+        'etapas': etapas,
+        'etapas_abertas': abertas,
+        'endpoints': endpoints,
+    }
+
+def salvar_relatorio(directory=metricas_dir):
+    """
+    Grava o relatório em JSON (data/metrics/execucao_<data>_<hora>.json).
+
+    Returns:
+        Path do arquivo gravado
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    caminho = directory / f"execucao_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json"
+    caminho.write_text(json.dumps(relatorio(), indent=2, ensure_ascii=False), encoding='utf-8')
+    logging.info(f"Relatório de métricas salvo em {caminho}")
+    return caminho
+
+def reiniciar():
+    """Descarta etapas e eventos registrados (nova execução no mesmo processo)."""
+    global _inicio
+    with _lock:
+        _inicio = None
+        _etapas.clear()
+        _abertas.clear()
+        _endpoints.clear()
+
+
+# 5. Perfil de CPU (opcional)
+@contextmanager
+def perfilar(directory=metricas_dir, linhas=20):
+    """
+    Roda o bloco sob o cProfile e grava o perfil em data/metrics/perfil_<data>_<hora>.prof.
+    O arquivo abre em visualizadores de flame graph/icicle (ex.: `snakeviz arquivo.prof`).
+    Só a thread que entra no bloco é perfilada: o tempo das threads de extração aparece
+    nos tempos HTTP do relatório.
+
+    Args:
+        directory: Diretório de saída
+        linhas: Quantidade de funções (por tempo acumulado) registradas no log
+    """
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield perfil
+    finally:
+        perfil.disable()
+        directory.mkdir(parents=True, exist_ok=True)
+        caminho = directory / f"perfil_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.prof"
+        perfil.dump_stats(caminho)
+        resumo = io.StringIO()
+        pstats.Stats(perfil, stream=resumo).sort_stats('cumulative').print_stats(linhas)
+        logging.info(f"Perfil de CPU salvo em {caminho}\n{resumo.getvalue()}")
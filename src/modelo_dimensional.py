@@ -0,0 +1,267 @@
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from deduplicacao import COLUNA_ANO_CHAVE, ano_contrato
+from documentos import CNPJ, CPF, analisar_documentos
+from schemas import TEXTO, aplicar_esquema
+
+chaves_dir = Path('data/state/chaves')
+SK_DESCONHECIDO = 0  # Membro "Não Informado" de cada dimensão (chave natural nula ou ausente)
+NAO_INFORMADO = 'Não Informado'
+# tipoPessoa do fornecedor pelo tipo do documento (documentos inválidos ficam NAO_INFORMADO)
+TIPOS_PESSOA = {CPF: 'Pessoa Física', CNPJ: 'Pessoa Jurídica'}
+
+# Atributos de cada dimensão (além da chave substituta e da chave natural)
+COLUNAS_ORGAO = [
+    'codigoOrgao', 'nomeOrgao', 'nomeMnemonicoOrgao', 'cnpjCpfOrgao',
+    'codigoOrgaoVinculado', 'nomeOrgaoVinculado', 'codigoOrgaoSuperior', 'nomeOrgaoSuperior',
+    'codigoTipoAdministracao', 'nomeTipoAdministracao', 'poder', 'esfera',
+]
+COLUNAS_UASG = [
+    'codigoUasg', 'nomeUasg', 'siglaUf', 'codigoMunicipioIbge', 'nomeMunicipioIbge',
+    'codigoOrgao', 'usoSisg', 'statusUasg',
+]
+# Colunas dos contratos que ficam no fato (medidas, dimensões degeneradas e flags)
+COLUNAS_FATO = [
+    'codigoOrgao', 'codigoUnidadeGestora', 'numeroContrato', 'processo', 'numeroCompra', 'idCompra', 'objeto',
+    'receitaDespesa', 'nomeModalidadeCompra', 'nomeCategoria',
+    'valorGlobal', 'valorParcela', 'numeroParcelas',
+]
+
+# 1. Chaves substitutas
+def atribuir_chaves(dimensao, naturais):
+    """
+    Retorna a chave substituta (inteiro) de cada chave natural, criando chaves novas
+    para as que ainda não existem. O mapa natural -> substituta fica em
+    data/state/chaves/<dimensao>.parquet, então a mesma chave natural recebe sempre a
+    mesma chave substituta entre execuções (e fatos já carregados continuam válidos).
+
+    A busca usa a tabela hash de um pd.Index (get_indexer), sem merge.
+
+    Args:
+        dimensao: Nome da dimensão (ex.: 'orgao')
+        naturais: Series com as chaves naturais (texto)
+    Returns:
+        Array int64 alinhado a naturais (SK_DESCONHECIDO para nulos)
+    """
+    arquivo = chaves_dir / f"{dimensao}.parquet"
+    if arquivo.exists():
+        mapa = pd.read_parquet(arquivo)
+    else:
+        mapa = pd.DataFrame({'natural': pd.Series(dtype=object), 'sk': pd.Series(dtype='int64')})
+    naturais = pd.Series(naturais, dtype=TEXTO).astype(object)
+    nulos = naturais.isna().to_numpy()
+    indice = pd.Index(mapa['natural'])
+    posicoes = indice.get_indexer(naturais)
+
+    novos = pd.unique(naturais[(posicoes < 0) & ~nulos])
+    if len(novos):
+        inicio = int(mapa['sk'].max()) + 1 if len(mapa) else SK_DESCONHECIDO + 1
+        mapa = pd.concat([mapa, pd.DataFrame({'natural': novos, 'sk': np.arange(inicio, inicio + len(novos))})],
+                         ignore_index=True)
+        chaves_dir.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo.with_suffix('.tmp')
+        mapa.to_parquet(temporario, index=False)
+        os.replace(temporario, arquivo)
+        logging.info(f"{len(novos)} chaves novas na dimensão {dimensao}")
+        posicoes = pd.Index(mapa['natural']).get_indexer(naturais)
+
+    chaves = mapa['sk'].to_numpy()[posicoes]
+    chaves[nulos] = SK_DESCONHECIDO
+    return chaves
+
+def _procurar(dimensao, coluna_sk, coluna_natural, valores):
+    """Resolve chaves naturais do fato para as chaves substitutas da dimensão já construída."""
+    posicoes = pd.Index(dimensao[coluna_natural].astype(object)).get_indexer(pd.Series(valores).astype(object))
+    chaves = dimensao[coluna_sk].to_numpy()[posicoes]
+    chaves[posicoes < 0] = SK_DESCONHECIDO
+    return chaves
+
+def _membro_desconhecido(dimensao, coluna_sk):
+    """
+    Acrescenta a linha SK_DESCONHECIDO: descrições 'Não Informado'; códigos, documentos
+    e atributos não textuais ficam nulos.
+    """
+    linha = {
+        col: NAO_INFORMADO if pd.api.types.is_string_dtype(dimensao[col]) and not col.startswith(('codigo', 'cnpj', 'ni'))
+        else pd.NA
+        for col in dimensao.columns
+    }
+    linha[coluna_sk] = SK_DESCONHECIDO
+    desconhecido = pd.DataFrame([linha]).astype(dimensao.dtypes.to_dict())
+    return pd.concat([desconhecido, dimensao], ignore_index=True)
+
+# 2. Dimensões
+def achatar_hierarquia_orgao(orgao):
+    """
+    Preenche os níveis vinculado e superior de cada órgão (código e nome), no lugar.
+    Níveis ausentes (órgãos que são topo da própria hierarquia) recebem o ancestral
+    conhecido mais próximo ou o próprio órgão; nomes vêm do próprio catálogo.
+
+    Args:
+        orgao: DataFrame com as colunas de COLUNAS_ORGAO, um registro por codigoOrgao
+    Returns:
+        O próprio DataFrame
+    """
+    nomes = pd.Series(orgao['nomeOrgao'].to_numpy(), index=orgao['codigoOrgao'].to_numpy())
+    vinculado = orgao['codigoOrgaoVinculado'].fillna(orgao['codigoOrgao'])
+    superior = orgao['codigoOrgaoSuperior'].fillna(vinculado)
+    orgao['nomeOrgaoVinculado'] = orgao['nomeOrgaoVinculado'].fillna(vinculado.map(nomes)).fillna(orgao['nomeOrgao'])
+    orgao['nomeOrgaoSuperior'] = orgao['nomeOrgaoSuperior'].fillna(superior.map(nomes)).fillna(orgao['nomeOrgaoVinculado'])
+    orgao['codigoOrgaoVinculado'], orgao['codigoOrgaoSuperior'] = vinculado, superior
+    return orgao
+
+def _concatenar(partes, colunas):
+    """
+    Concatena as partes de uma dimensão (catálogo + contratos). Partes vazias e colunas só com
+    nulos ficam de fora, como em lookup.py: o pandas deixará de ignorá-las ao escolher o dtype
+    do resultado. As colunas ausentes voltam, nulas, no reindex.
+    """
+    partes = [parte.dropna(axis=1, how='all') for parte in partes if not parte.empty]
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    return pd.concat(partes, ignore_index=True).reindex(columns=colunas)
+
+def construir_dim_orgao(df_orgao=None, df_contratos=None):
+    """
+    Dimensão de órgãos com a hierarquia achatada (achatar_hierarquia_orgao): cada linha
+    já traz o órgão vinculado e o superior, então agregações por nomeOrgaoSuperior ou
+    esfera são uma única junção com o fato, sem joins recursivos. Órgãos que só
+    aparecem nos contratos entram com o nome informado no contrato.
+    """
+    partes = []
+    if df_orgao is not None and not df_orgao.empty:
+        partes.append(aplicar_esquema(df_orgao.reindex(columns=COLUNAS_ORGAO), 'orgao'))
+    if df_contratos is not None and not df_contratos.empty:
+        partes.append(pd.DataFrame({
+            'codigoOrgao': df_contratos['codigoOrgao'],
+            'nomeOrgao': df_contratos['nomeOrgao'],
+        }).reindex(columns=COLUNAS_ORGAO))
+    dim = _concatenar([parte.astype(TEXTO) for parte in partes], COLUNAS_ORGAO).astype(TEXTO)
+    # Catálogo primeiro: a linha do catálogo prevalece sobre a vinda dos contratos
+    dim = dim.dropna(subset=['codigoOrgao']).drop_duplicates('codigoOrgao', keep='first').reset_index(drop=True)
+
+    achatar_hierarquia_orgao(dim)
+    dim.insert(0, 'sk_orgao', atribuir_chaves('orgao', dim['codigoOrgao']))
+    return _membro_desconhecido(dim, 'sk_orgao')
+
+def construir_dim_uasg(df_uasg=None, df_contratos=None):
+    """
+    Dimensão de UASGs (unidades gestoras e unidades que realizaram a compra).
+    Unidades que só aparecem nos contratos entram com o nome informado no contrato.
+    """
+    partes = []
+    if df_uasg is not None and not df_uasg.empty:
+        partes.append(df_uasg.reindex(columns=COLUNAS_UASG))
+    if df_contratos is not None and not df_contratos.empty:
+        for codigo, nome in (('codigoUnidadeGestora', 'nomeUnidadeGestora'),
+                             ('codigoUnidadeRealizadoraCompra', 'nomeUnidadeRealizadoraCompra'),
+                             ('codigoUnidadeGestoraOrigemContrato', 'nomeUnidadeGestoraOrigemContrato')):
+            if codigo in df_contratos.columns:
+                partes.append(pd.DataFrame({
+                    'codigoUasg': df_contratos[codigo],
+                    'nomeUasg': df_contratos[nome],
+                }).reindex(columns=COLUNAS_UASG))
+    dim = aplicar_esquema(_concatenar([aplicar_esquema(parte, 'uasg') for parte in partes], COLUNAS_UASG), 'uasg')
+    dim = dim.dropna(subset=['codigoUasg']).drop_duplicates('codigoUasg', keep='first').reset_index(drop=True)
+    dim.insert(0, 'sk_uasg', atribuir_chaves('uasg', dim['codigoUasg']))
+    return _membro_desconhecido(dim, 'sk_uasg')
+
+def construir_dim_fornecedor(df_contratos):
+    """Dimensão de fornecedores (CPF/CNPJ), com o nome mais recente informado nos contratos."""
+    fornecedores = pd.DataFrame({
+        'niFornecedor': df_contratos['niFornecedor'].astype(TEXTO).str.strip(),
+        'nomeRazaoSocialFornecedor': df_contratos['nomeRazaoSocialFornecedor'].astype(TEXTO),
+    })
+    fornecedores = fornecedores.dropna(subset=['niFornecedor'])
+    # Nome não nulo mais recente de cada fornecedor (o último informado prevalece)
+    dim = fornecedores.groupby('niFornecedor', sort=False, observed=True)['nomeRazaoSocialFornecedor'].last().reset_index()
+    # Tipo pelos dígitos verificadores, não pelo tamanho: CNPJ alfanumérico e documentos
+    # mantidos sem normalizar (inválidos) não são classificados pelo número de caracteres
+    tipo = analisar_documentos(dim['niFornecedor'])['tipo']
+    dim['tipoPessoa'] = tipo.map(TIPOS_PESSOA).astype(object).fillna(NAO_INFORMADO).astype(TEXTO)
+    dim.insert(0, 'sk_fornecedor', atribuir_chaves('fornecedor', dim['niFornecedor']))
+    return _membro_desconhecido(dim, 'sk_fornecedor')
+
+def chave_data(datas):
+    """Chave da dimensão de datas: inteiro AAAAMMDD (SK_DESCONHECIDO para datas nulas)."""
+    datas = pd.DatetimeIndex(datas)
+    chaves = (datas.year * 10000 + datas.month * 100 + datas.day).to_numpy(dtype='float64')
+    return np.where(np.isnan(chaves), SK_DESCONHECIDO, chaves).astype('int64')
+
+def construir_dim_data(datas):
+    """
+    Dimensão de datas cobrindo do menor ao maior valor informado (um registro por dia).
+    A chave é calculada (AAAAMMDD), então o fato não precisa de busca para resolvê-la.
+    """
+    datas = pd.Series(datas).dropna()
+    dias = pd.date_range(datas.min(), datas.max(), freq='D') if len(datas) else pd.DatetimeIndex([])
+    dim = pd.DataFrame({
+        'sk_data': chave_data(dias),
+        'data': dias,
+        'ano': pd.array(dias.year, dtype='Int16'),
+        'semestre': pd.array((dias.quarter + 1) // 2, dtype='Int8'),
+        'trimestre': pd.array(dias.quarter, dtype='Int8'),
+        'mes': pd.array(dias.month, dtype='Int8'),
+        'dia': pd.array(dias.day, dtype='Int8'),
+        'diaSemana': pd.array(dias.dayofweek, dtype='Int8'),
+        'anoMes': pd.Series(dias.strftime('%Y-%m'), dtype=TEXTO),
+    })
+    return _membro_desconhecido(dim, 'sk_data')
+
+# 3. Fato e modelo completo
+def construir_fato_contratos(df_contratos, dim_orgao, dim_uasg, dim_fornecedor):
+    """
+    Tabela fato de contratos: medidas, dimensões degeneradas (órgão, UG e número do
+    contrato, processo, modalidade, categoria), flags de qualidade e as chaves substitutas
+    de cada dimensão. Chaves naturais sem correspondência apontam para SK_DESCONHECIDO.
+    """
+    fato = df_contratos[[c for c in COLUNAS_FATO if c in df_contratos.columns]].copy()
+    fato.insert(0, 'sk_orgao', _procurar(dim_orgao, 'sk_orgao', 'codigoOrgao', df_contratos['codigoOrgao']))
+    fato.insert(1, 'sk_unidade_gestora',
+                _procurar(dim_uasg, 'sk_uasg', 'codigoUasg', df_contratos['codigoUnidadeGestora']))
+    fato.insert(2, 'sk_unidade_compra',
+                _procurar(dim_uasg, 'sk_uasg', 'codigoUasg', df_contratos['codigoUnidadeRealizadoraCompra']))
+    fato.insert(3, 'sk_fornecedor', _procurar(dim_fornecedor, 'sk_fornecedor', 'niFornecedor',
+                                              df_contratos['niFornecedor'].astype(TEXTO).str.strip()))
+    fato.insert(4, 'sk_data_vigencia_inicial', chave_data(df_contratos['dataVigenciaInicial']))
+    fato.insert(5, 'sk_data_vigencia_final', chave_data(df_contratos['dataVigenciaFinal']))
+    # Ano da vigência inicial: completa a identidade do contrato (chave natural da carga)
+    fato[COLUNA_ANO_CHAVE] = ano_contrato(df_contratos)
+    flags = [c for c in df_contratos.columns if c.startswith('flag_')]
+    fato[flags] = df_contratos[flags]
+    return fato
+
+def construir_modelo_estrela(df_contratos, df_uasg=None, df_orgao=None):
+    """
+    Monta o modelo dimensional a partir dos contratos limpos e dos catálogos:
+    fato_contratos + dim_orgao, dim_uasg, dim_fornecedor e dim_data.
+
+    Args:
+        df_contratos: Contratos limpos (saída de transform_contratos)
+        df_uasg: Catálogo de UASGs (opcional)
+        df_orgao: Catálogo de órgãos (opcional)
+    Returns:
+        Dicionário {nome da tabela: DataFrame}
+    """
+    dim_orgao = construir_dim_orgao(df_orgao, df_contratos)
+    dim_uasg = construir_dim_uasg(df_uasg, df_contratos)
+    dim_fornecedor = construir_dim_fornecedor(df_contratos)
+    dim_data = construir_dim_data(pd.concat([df_contratos['dataVigenciaInicial'], df_contratos['dataVigenciaFinal']]))
+    fato = construir_fato_contratos(df_contratos, dim_orgao, dim_uasg, dim_fornecedor)
+
+    for nome, coluna in (('órgão', 'sk_orgao'), ('unidade gestora', 'sk_unidade_gestora'), ('fornecedor', 'sk_fornecedor')):
+        sem_dimensao = int((fato[coluna] == SK_DESCONHECIDO).sum())
+        if sem_dimensao:
+            logging.info(f"{sem_dimensao} contratos sem {nome} informado")
+    logging.info(f"Modelo estrela: {len(fato):,} contratos, {len(dim_orgao) - 1:,} órgãos, {len(dim_uasg) - 1:,} UASGs, "
+                 f"{len(dim_fornecedor) - 1:,} fornecedores, {len(dim_data) - 1:,} datas")
+    return {
+        'fato_contratos': fato,
+        'dim_orgao': dim_orgao,
+        'dim_uasg': dim_uasg,
+        'dim_fornecedor': dim_fornecedor,
+        'dim_data': dim_data,
+    }
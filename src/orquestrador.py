@@ -0,0 +1,268 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from metricas import etapa, finalizar_etapa, iniciar_etapa
+from storage import CAMADAS
+
+state_dir = Path('data/state')
+arquivo_estado = state_dir / 'pipeline.json'
+
+# CONFIGURAÇÃO DO ORQUESTRADOR
+PARALELISMO_PIPELINE = 4  # Etapas executadas ao mesmo tempo (threads)
+# Como detectar que as entradas de uma etapa não mudaram: 'conteudo' (hash dos arquivos,
+# recalculado só quando tamanho ou mtime mudam) ou 'mtime' (só tamanho e mtime)
+MODO_ASSINATURA = 'conteudo'
+TAMANHO_LEITURA = 1024 * 1024  # Bytes lidos por vez no hash de arquivos
+
+# 1. Assinatura dos arquivos de saída
+def saidas_dataset(nome, camada='raw'):
+    """Arquivos de um dataset nos dois formatos: diretório Parquet e snapshots CSV datados."""
+    return [CAMADAS[camada] / nome, str(CAMADAS[camada] / f"{nome}_????-??-??.csv")]
+
+def _arquivos(saidas):
+    """Expande diretórios (recursivamente) e padrões glob em uma lista ordenada de arquivos."""
+    arquivos = set()
+    for saida in saidas:
+        caminho = Path(saida)
+        if any(c in caminho.name for c in '*?['):
+            arquivos.update(p for p in caminho.parent.glob(caminho.name) if p.is_file())
+        elif caminho.is_dir():
+            arquivos.update(p for p in caminho.rglob('*') if p.is_file() and p.suffix != '.tmp')
+        elif caminho.is_file():
+            arquivos.add(caminho)
+    return sorted(arquivos)
+
+def _hash_arquivo(caminho):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        while bloco := f.read(TAMANHO_LEITURA):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _hash_texto(*partes):
+    return hashlib.blake2b('\n'.join(partes).encode('utf-8'), digest_size=16).hexdigest()
+
+# 2. Etapas e execução do grafo
+class Tarefa:
+    """
+    Uma etapa do pipeline.
+
+    Args:
+        nome: Nome da etapa; o prefixo antes da '/' é a fase (ex.: 'extracao/uasg')
+        funcao: Função chamada com os resultados de `entradas`, na ordem declarada
+        entradas: Etapas cujos resultados a função recebe
+        depende_de: Etapas que precisam terminar antes, sem passar resultado (ex.: só leem o disco)
+        saidas: Arquivos, diretórios ou padrões glob que a etapa grava
+        carregar: Função sem argumentos que lê o resultado do disco quando a etapa é pulada
+        parametros: Configuração que também entra na assinatura (mudou = a etapa roda de novo)
+        contar: Função resultado -> registros, para as métricas (padrão: len do resultado)
+    """
+
+    def __init__(self, nome, funcao, entradas=(), depende_de=(), saidas=(), carregar=None, parametros=None,
+                 contar=None):
+        self.nome = nome
+        self.funcao = funcao
+        self.entradas = list(entradas)
+        self.depende_de = list(entradas) + [d for d in depende_de if d not in entradas]
+        self.saidas = list(saidas)
+        self.carregar = carregar
+        self.parametros = parametros or {}
+        self.contar = contar
+        self.fase = nome.split('/')[0]
+
+class Pipeline:
+    """
+    Executa as etapas como um grafo de dependências: cada etapa começa assim que as etapas
+    de que depende terminam, com até `paralelismo` etapas ao mesmo tempo. Extrações
+    independentes rodam juntas, e a transformação de contratos não espera os catálogos;
+    o tempo total fica próximo do ramo mais longo, não da soma das etapas.
+
+    Uma etapa com dependências é pulada quando a assinatura das saídas das dependências
+    (e dos seus parâmetros) é a mesma da última execução bem-sucedida e as suas próprias
+    saídas não foram alteradas desde então. Etapas sem dependências (extrações da API)
+    sempre rodam: a origem é externa. O estado fica em data/state/pipeline.json.
+
+    As etapas rodam em threads do mesmo processo: com etapas simultâneas, os contadores
+    HTTP de uma extração também entram nas outras etapas abertas (os totais por endpoint
+    do relatório continuam exatos).
+
+    Args:
+        paralelismo: Número máximo de etapas simultâneas
+        arquivo: Arquivo de estado (assinaturas da última execução)
+        modo: 'conteudo' ou 'mtime' (ver MODO_ASSINATURA)
+    """
+
+    def __init__(self, paralelismo=PARALELISMO_PIPELINE, arquivo=arquivo_estado, modo=MODO_ASSINATURA):
+        self.paralelismo = paralelismo
+        self.arquivo = Path(arquivo)
+        self.modo = modo
+        self.tarefas = {}
+        self.tempos = {}  # {etapa: (início, fim)} em time.perf_counter()
+        self.puladas = []
+        self._lock = threading.Lock()
+        self._resultados = {}
+        self._assinaturas = {}  # {etapa: assinatura das saídas nesta execução}
+        self._carregando = {}  # {etapa: lock da leitura do resultado de etapa pulada}
+        estado = json.loads(self.arquivo.read_text(encoding='utf-8')) if self.arquivo.exists() else {}
+        self._estado = {'etapas': estado.get('etapas', {}), 'arquivos': estado.get('arquivos', {})}
+
+    def tarefa(self, nome, funcao, **kwargs):
+        """Registra uma etapa (argumentos de Tarefa). Dependências precisam ser registradas antes."""
+        tarefa = Tarefa(nome, funcao, **kwargs)
+        faltando = [d for d in tarefa.depende_de if d not in self.tarefas]
+        if faltando:
+            raise ValueError(f"Etapa {nome} depende de etapas não registradas: {faltando}")
+        self.tarefas[nome] = tarefa
+        return tarefa
+
+    # Assinaturas
+    def _assinatura_saidas(self, tarefa):
+        linhas = []
+        for caminho in _arquivos(tarefa.saidas):
+            info = caminho.stat()
+            marca = [info.st_size, info.st_mtime_ns]
+            chave = str(caminho)
+            if self.modo == 'mtime':
+                linhas.append(f"{chave}:{marca[0]}:{marca[1]}")
+                continue
+            with self._lock:
+                anterior = self._estado['arquivos'].get(chave)
+            # Arquivo com mesmo tamanho e mtime da última vez: o hash guardado vale
+            conteudo = anterior[2] if anterior and anterior[:2] == marca else _hash_arquivo(caminho)
+            with self._lock:
+                self._estado['arquivos'][chave] = marca + [conteudo]
+            linhas.append(f"{chave}:{conteudo}")
+        return _hash_texto(*linhas)
+
+    def _assinatura_entradas(self, tarefa):
+        parametros = json.dumps(tarefa.parametros, sort_keys=True, default=str)
+        return _hash_texto(parametros, *(f"{d}:{self._assinaturas[d]}" for d in tarefa.depende_de))
+
+    def _gravar_estado(self):
+        # Gravação atômica; o lock evita que duas etapas usem o mesmo arquivo temporário
+        with self._lock:
+            self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+            temporario = self.arquivo.with_suffix('.tmp')
+            temporario.write_text(json.dumps(self._estado, indent=2), encoding='utf-8')
+            os.replace(temporario, self.arquivo)
+
+    # Resultados
+    def resultado(self, nome):
+        """Resultado de uma etapa; se ela foi pulada, é lido do disco (uma vez) com `carregar`."""
+        with self._lock:
+            if nome in self._resultados:
+                return self._resultados[nome]
+            trava = self._carregando.setdefault(nome, threading.Lock())
+        with trava:
+            with self._lock:
+                if nome in self._resultados:
+                    return self._resultados[nome]
+            carregar = self.tarefas[nome].carregar
+            valor = carregar() if carregar else None
+            with self._lock:
+                self._resultados[nome] = valor
+            return valor
+
+    def _executar_tarefa(self, tarefa, forcar):
+        """Roda (ou pula) uma etapa numa thread do pool. Retorna True se a etapa foi pulada."""
+        inicio = time.perf_counter()
+        assinatura = self._assinatura_entradas(tarefa)
+        anterior = self._estado['etapas'].get(tarefa.nome, {})
+        if (not forcar and tarefa.depende_de and anterior.get('entradas') == assinatura
+                and anterior.get('saidas') == self._assinatura_saidas(tarefa)):
+            self._assinaturas[tarefa.nome] = anterior['saidas']
+            self.tempos[tarefa.nome] = (inicio, time.perf_counter())
+            logging.info(f"Etapa {tarefa.nome}: entradas sem mudanças desde a última execução, pulada")
+            return True
+
+        logging.info(f">>> Etapa {tarefa.nome}")
+        argumentos = [self.resultado(nome) for nome in tarefa.entradas]
+        with etapa(tarefa.nome) as e:
+            valor = tarefa.funcao(*argumentos)
+            if tarefa.contar is not None:
+                e['registros'] = tarefa.contar(valor)
+            elif hasattr(valor, '__len__'):
+                e['registros'] = len(valor)
+        with self._lock:
+            self._resultados[tarefa.nome] = valor
+        saidas = self._assinatura_saidas(tarefa)
+        self._assinaturas[tarefa.nome] = saidas
+        with self._lock:
+            self._estado['etapas'][tarefa.nome] = {'entradas': assinatura, 'saidas': saidas}
+        self._gravar_estado()
+        self.tempos[tarefa.nome] = (inicio, time.perf_counter())
+        return False
+
+    def executar(self, forcar=False):
+        """
+        Executa o grafo. Uma falha interrompe o agendamento: as etapas em andamento
+        terminam, as que dependem da que falhou não rodam, e a exceção é repassada.
+
+        Args:
+            forcar: Se True, roda todas as etapas mesmo com entradas inalteradas
+        Returns:
+            Lista das etapas puladas. Os resultados ficam disponíveis em resultado(etapa);
+            os de etapas puladas só são lidos do disco quando pedidos.
+        """
+        pendentes = dict(self.tarefas)
+        concluidas = set()
+        restantes_fase = {}
+        for tarefa in self.tarefas.values():
+            restantes_fase[tarefa.fase] = restantes_fase.get(tarefa.fase, 0) + 1
+        fases_abertas = set()
+        inicio = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.paralelismo) as executor:
+            em_andamento = {}
+            erro = None
+            while (pendentes and erro is None) or em_andamento:
+                if erro is None:
+                    prontas = [t for t in pendentes.values() if set(t.depende_de) <= concluidas]
+                    for tarefa in prontas:
+                        del pendentes[tarefa.nome]
+                        if tarefa.fase not in fases_abertas:
+                            fases_abertas.add(tarefa.fase)
+                            iniciar_etapa(tarefa.fase)
+                        em_andamento[executor.submit(self._executar_tarefa, tarefa, forcar)] = tarefa
+                if not em_andamento:
+                    break
+                feitas, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                for futuro in feitas:
+                    tarefa = em_andamento.pop(futuro)
+                    try:
+                        if futuro.result():
+                            self.puladas.append(tarefa.nome)
+                        concluidas.add(tarefa.nome)
+                    except Exception as e:
+                        logging.error(f"Etapa {tarefa.nome} falhou: {e}")
+                        erro = erro or e
+                    restantes_fase[tarefa.fase] -= 1
+                    if restantes_fase[tarefa.fase] == 0:
+                        fases_abertas.discard(tarefa.fase)
+                        finalizar_etapa(tarefa.fase)
+            # Depois de uma falha, fases com etapas que não rodaram ficam abertas
+            for fase in fases_abertas:
+                finalizar_etapa(fase)
+            if erro is not None:
+                nao_executadas = sorted(pendentes)
+                if nao_executadas:
+                    logging.error(f"Etapas não executadas por causa da falha: {', '.join(nao_executadas)}")
+                raise erro
+
+        parede = time.perf_counter() - inicio
+        soma = sum(fim - comeco for comeco, fim in self.tempos.values())
+        logging.info(f"Pipeline: {len(self.tarefas)} etapas ({len(self.puladas)} puladas) em {parede:.1f}s "
+                     f"(soma das etapas: {soma:.1f}s)")
+        return self.puladas
+
+    def duracao_fase(self, fase):
+        """Tempo de parede de uma fase: do início da primeira etapa ao fim da última, em segundos."""
+        tempos = [t for nome, t in self.tempos.items() if self.tarefas[nome].fase == fase]
+        if not tempos:
+            return 0.0
+        return max(fim for _, fim in tempos) - min(inicio for inicio, _ in tempos)
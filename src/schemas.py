@@ -0,0 +1,188 @@
+import logging
+import sys
+import pandas as pd
+import pyarrow as pa
+
+# ESQUEMAS EXPLÍCITOS POR DATASET
+# Códigos que identificam entidades (órgão, UASG, município) e documentos (CNPJ/CPF) são texto:
+# preserva zeros à esquerda, evita '96320.0' e são as chaves das junções entre os datasets.
+# Códigos de enumerações pequenas viram Int32 nulo e nomes com poucos valores distintos, category.
+ESQUEMAS = {
+    'contratos': {
+        'codigoOrgao': 'string',
+        'nomeOrgao': 'string',
+        'codigoUnidadeGestora': 'string',
+        'nomeUnidadeGestora': 'string',
+        'codigoUnidadeGestoraOrigemContrato': 'string',
+        'nomeUnidadeGestoraOrigemContrato': 'string',
+        'receitaDespesa': 'category',
+        'numeroContrato': 'string',
+        'codigoUnidadeRealizadoraCompra': 'string',
+        'nomeUnidadeRealizadoraCompra': 'string',
+        'numeroCompra': 'string',
+        'codigoModalidadeCompra': 'Int32',
+        'nomeModalidadeCompra': 'category',
+        'codigoCategoria': 'Int32',
+        'nomeCategoria': 'category',
+        'niFornecedor': 'string',
+        'nomeRazaoSocialFornecedor': 'string',
+        'processo': 'string',
+        'objeto': 'string',
+        'informacoesComplementares': 'string',
+        'dataVigenciaInicial': 'datetime64[ns]',
+        'dataVigenciaFinal': 'datetime64[ns]',
+        'valorGlobal': 'float64',
+        'numeroParcelas': 'Int32',
+        'valorParcela': 'float64',
+        'valorAcumulado': 'float64',
+        'dataHoraInclusao': 'datetime64[ns]',
+        'idCompra': 'string',
+        'contratoExcluido': 'boolean',
+    },
+    'uasg': {
+        'codigoUasg': 'string',
+        'nomeUasg': 'string',
+        'usoSisg': 'boolean',
+        'adesaoSiasg': 'boolean',
+        'siglaUf': 'category',
+        'codigoMunicipio': 'string',
+        'codigoMunicipioIbge': 'string',
+        'nomeMunicipioIbge': 'string',
+        'codigoUnidadePolo': 'string',
+        'nomeUnidadePolo': 'string',
+        'uasgCadastradora': 'boolean',
+        'cnpjCpfUasg': 'string',
+        'codigoOrgao': 'string',
+        'cnpjCpfOrgao': 'string',
+        'cnpjCpfOrgaoVinculado': 'string',
+        'cnpjCpfOrgaoSuperior': 'string',
+        'codigoSiorg': 'string',
+        'statusUasg': 'boolean',
+        'dataImplantacaoSidec': 'datetime64[ns]',
+        'dataHoraMovimento': 'datetime64[ns]',
+    },
+    'orgao': {
+        'codigoOrgao': 'string',
+        'nomeOrgao': 'string',
+        'nomeMnemonicoOrgao': 'string',
+        'cnpjCpfOrgao': 'string',
+        'codigoOrgaoVinculado': 'string',
+        'cnpjCpfOrgaoVinculado': 'string',
+        'nomeOrgaoVinculado': 'string',
+        'codigoOrgaoSuperior': 'string',
+        'cnpjCpfOrgaoSuperior': 'string',
+        'nomeOrgaoSuperior': 'string',
+        'codigoTipoAdministracao': 'Int32',
+        'nomeTipoAdministracao': 'category',
+        'poder': 'category',
+        'esfera': 'category',
+        'usoSisg': 'boolean',
+        'statusOrgao': 'boolean',
+        'dataHoraMovimento': 'datetime64[ns]',
+    },
+}
+
+# Texto armazenado no Arrow: operações de string vetorizadas e menos objetos Python em memória
+TEXTO = pd.StringDtype('pyarrow')
+# Arrow -> pandas na leitura: texto em string[pyarrow] e códigos Int32 com nulos sem virar float64
+TIPOS_PANDAS = {pa.string(): TEXTO, pa.large_string(): TEXTO, pa.int32(): pd.Int32Dtype()}
+_VALORES_BOOLEANOS = {True: True, False: False, 'True': True, 'False': False, 'true': True, 'false': False}
+
+# 1. Funções de conversão por tipo
+def _para_texto(serie):
+    """Converte para texto sem o sufixo '.0' que o pandas cria em códigos com nulos."""
+    if pd.api.types.is_float_dtype(serie):
+        inteiros = serie.round()
+        if (inteiros.isna() | (inteiros == serie)).all():
+            return inteiros.astype('Int64').astype(TEXTO)
+    # Códigos que já chegam como texto de um CSV ('96320.0'): só valores numéricos são tocados
+    texto = serie.astype(TEXTO)
+    sufixo = texto.str.endswith('.0', na=False)
+    if sufixo.any():
+        sufixo &= texto.str.fullmatch(r'\d+\.0', na=False)
+        texto = texto.mask(sufixo, texto.str[:-2])
+    return texto
+
+def _converter(serie, dtype):
+    if dtype == 'string':
+        return _para_texto(serie)
+    if dtype.startswith('datetime64'):
+        datas = pd.to_datetime(serie, errors='coerce', format='ISO8601', utc=True)
+        return datas.dt.tz_convert(None)
+    if dtype == 'boolean':
+        if pd.api.types.is_bool_dtype(serie):
+            return serie.astype('boolean')
+        return serie.map(_VALORES_BOOLEANOS).astype('boolean')
+    if dtype in ('Int32', 'Int64', 'float64'):
+        return pd.to_numeric(serie, errors='coerce').astype(dtype)
+    if dtype == 'category':
+        return _para_texto(serie).astype('category')
+    return serie.astype(dtype)
+
+# 2. Função para aplicar o esquema de um dataset
+def aplicar_esquema(df, dataset):
+    """
+    Converte as colunas conhecidas do dataset para os tipos declarados em ESQUEMAS.
+    Colunas fora do esquema são mantidas como estão.
+
+    Args:
+        df: DataFrame a ser convertido (modificado no lugar)
+        dataset: Nome do esquema ('contratos', 'uasg' ou 'orgao')
+    Returns:
+        O próprio DataFrame, com os tipos aplicados
+    """
+    esquema = ESQUEMAS.get(dataset)
+    if esquema is None:
+        logging.warning(f"Nenhum esquema declarado para '{dataset}'. Tipos inferidos pelo pandas serão mantidos.")
+        return df
+
+    for col, dtype in esquema.items():
+        if col not in df.columns:
+            continue
+        # category de texto já atende a 'string' (mantém a economia de memória)
+        if dtype == 'string' and isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        # Texto é sempre normalizado: colunas lidas como string de um CSV podem trazer '96320.0'
+        if dtype == 'string' or str(df[col].dtype) != dtype:
+            try:
+                df[col] = _converter(df[col], dtype)
+            except (ValueError, TypeError) as e:
+                logging.warning(f"Não foi possível converter '{col}' para {dtype}: {e}")
+    return df
+
+# 3. Relatório de memória do esquema
+def relatorio_memoria(df, dataset):
+    """
+    Compara, coluna a coluna, a memória do DataFrame como chegou (tipos inferidos pelo
+    pandas) com a memória após aplicar o esquema do dataset.
+
+    Args:
+        df: DataFrame antes do esquema (ex.: pd.read_csv sem dtype ou pd.DataFrame(registros))
+        dataset: Nome do esquema ('contratos', 'uasg' ou 'orgao')
+    Returns:
+        DataFrame com tipo e bytes antes/depois e a economia por coluna (maior economia
+        primeiro), mais uma linha 'TOTAL'
+    """
+    tipado = aplicar_esquema(df.copy(), dataset)
+    relatorio = pd.DataFrame({
+        'tipo_inferido': df.dtypes.astype(str),
+        'tipo_esquema': tipado.dtypes.astype(str),
+        'bytes_inferido': df.memory_usage(deep=True, index=False),
+        'bytes_esquema': tipado.memory_usage(deep=True, index=False),
+    })
+    relatorio.loc['TOTAL'] = ['', '', relatorio['bytes_inferido'].sum(), relatorio['bytes_esquema'].sum()]
+    relatorio['economia_bytes'] = relatorio['bytes_inferido'] - relatorio['bytes_esquema']
+    relatorio['economia_pct'] = (100 * relatorio['economia_bytes'] / relatorio['bytes_inferido'].where(lambda b: b > 0)).round(1)
+    colunas = relatorio.drop(index='TOTAL').sort_values('economia_bytes', ascending=False)
+    return pd.concat([colunas, relatorio.loc[['TOTAL']]]).rename_axis('coluna')
+
+# EXECUÇÃO DIRETA: relatório de memória de um arquivo bruto
+# Ex.: python src/schemas.py data/raw/orgao_2025-08-29.csv
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-6s | %(message)s", datefmt="%H:%M:%S")
+    arquivo = sys.argv[1]
+    # Dataset pelo prefixo do arquivo (orgao_2025-08-29.csv -> 'orgao'), ou pelo segundo argumento
+    dataset = sys.argv[2] if len(sys.argv) > 2 else arquivo.replace('\\', '/').split('/')[-1].split('_')[0]
+    bruto = pd.read_csv(arquivo, encoding='utf-8', low_memory=False)
+    with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.max_columns', None):
+        print(relatorio_memoria(bruto, dataset))
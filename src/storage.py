@@ -0,0 +1,283 @@
+import logging
+import operator
+import shutil
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from schemas import ESQUEMAS, TIPOS_PANDAS, aplicar_esquema
+
+# CONFIGURAÇÕES DE ARMAZENAMENTO
+FORMATO_ARMAZENAMENTO = 'parquet'  # 'parquet' ou 'csv'
+CAMADAS = {
+    'raw': Path('data/raw'),
+    'processed': Path('data/processed'),
+}
+# Colunas de partição (e seus tipos) por esquema. Catálogos são guardados como snapshots datados.
+PARTICOES = {
+    'contratos': pa.schema([('ano', pa.int16()), ('trimestre', pa.int8())]),
+    'uasg': pa.schema([('data_extracao', pa.string())]),
+    'orgao': pa.schema([('data_extracao', pa.string())]),
+}
+
+_OPERADORES = {
+    '=': operator.eq, '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+# 1. Função para aplicar filtros no formato do pyarrow em um DataFrame
+def aplicar_filtros(df, filtros):
+    """
+    Aplica filtros [(coluna, operador, valor), ...] (todos combinados com AND)
+    em um DataFrame já carregado. Usado pelo backend CSV, que não tem pushdown.
+    """
+    if not filtros:
+        return df
+    mascara = pd.Series(True, index=df.index)
+    for coluna, op, valor in filtros:
+        if op == 'in':
+            mascara &= df[coluna].isin(valor)
+        elif op == 'not in':
+            mascara &= ~df[coluna].isin(valor)
+        else:
+            mascara &= _OPERADORES[op](df[coluna], valor)
+    return df[mascara]
+
+def _colunas_particao(df, esquema):
+    """Cria as colunas de partição do esquema (ano/trimestre ou data_extracao)."""
+    particoes = PARTICOES[esquema].names if esquema in PARTICOES else []
+    if 'ano' in particoes:
+        vigencia = pd.to_datetime(df['dataVigenciaInicial'], errors='coerce')
+        df['ano'] = vigencia.dt.year.astype('Int16')
+        df['trimestre'] = vigencia.dt.quarter.astype('Int8')
+    if 'data_extracao' in particoes:
+        df['data_extracao'] = datetime.now().strftime('%Y-%m-%d')
+    return particoes
+
+def _campo_estavel(campo):
+    """
+    Ajusta um campo Arrow inferido de um único lote para que sirva a todos os lotes:
+    índices de dicionário (category) com largura fixa, já que cada lote tem um número
+    diferente de categorias, e colunas só com nulos tratadas como texto.
+    """
+    tipo = campo.type
+    if pa.types.is_dictionary(tipo):
+        valores = pa.string() if pa.types.is_null(tipo.value_type) else tipo.value_type
+        return campo.with_type(pa.dictionary(pa.int32(), valores))
+    if pa.types.is_null(tipo):
+        return campo.with_type(pa.string())
+    return campo
+
+# 2. Backend CSV (formato original do projeto)
+class CsvStorage:
+    """
+    Grava cada dataset como <nome>_YYYY-MM-DD.csv e lê o arquivo mais recente.
+    Projeção de colunas é feita na leitura (usecols); filtros são aplicados após carregar.
+    """
+
+    def salvar(self, df, nome, directory, esquema=None):
+        directory.mkdir(parents=True, exist_ok=True)
+        file_path = directory / f"{nome}_{datetime.now().strftime('%Y-%m-%d')}.csv"
+        df.to_csv(file_path, index=False, encoding='utf-8')
+        return file_path
+
+    def ler(self, nome, directory, colunas=None, filtros=None, esquema=None):
+        arquivos = sorted(directory.glob(f"{nome}_????-??-??.csv"))
+        if not arquivos:
+            raise FileNotFoundError(f"Nenhum arquivo {nome}_*.csv em {directory}")
+        # Colunas de texto do esquema são lidas como texto para não perder zeros à esquerda
+        dtype = {col: 'string' for col, tipo in ESQUEMAS.get(esquema or nome, {}).items() if tipo == 'string'}
+        usecols = None
+        if colunas is not None:
+            usecols = list(dict.fromkeys(list(colunas) + [f[0] for f in (filtros or [])]))
+        df = pd.read_csv(arquivos[-1], usecols=usecols, dtype=dtype, encoding='utf-8', low_memory=False)
+        df = aplicar_filtros(aplicar_esquema(df, esquema or nome), filtros)
+        return df[colunas] if colunas is not None else df
+
+    def iter_lotes(self, nome, directory, tamanho_lote, colunas=None, esquema=None):
+        arquivos = sorted(directory.glob(f"{nome}_????-??-??.csv"))
+        if not arquivos:
+            raise FileNotFoundError(f"Nenhum arquivo {nome}_*.csv em {directory}")
+        dtype = {col: 'string' for col, tipo in ESQUEMAS.get(esquema or nome, {}).items() if tipo == 'string'}
+        with pd.read_csv(arquivos[-1], usecols=colunas, dtype=dtype, encoding='utf-8', chunksize=tamanho_lote) as leitor:
+            for lote in leitor:
+                yield aplicar_esquema(lote, esquema or nome)
+
+# 3. Backend Parquet particionado
+class ParquetStorage:
+    """
+    Grava cada dataset como um diretório Parquet particionado no estilo Hive
+    (ex.: contratos/ano=2024/trimestre=1/), com tipos definidos pelo esquema.
+    Partições reescritas substituem as anteriores; as demais são preservadas.
+    Na leitura, colunas são projetadas e filtros são empurrados para o Parquet,
+    então apenas as partições e colunas necessárias são lidas do disco.
+    """
+
+    def salvar(self, df, nome, directory, esquema=None):
+        esquema = esquema or nome
+        df = aplicar_esquema(df.copy(deep=False), esquema)
+        particoes = _colunas_particao(df, esquema)
+        caminho = directory / nome
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(
+            tabela, root_path=caminho, partition_cols=particoes or None,
+            existing_data_behavior='delete_matching', basename_template='part-{i}.parquet',
+        )
+        return caminho
+
+    def ler(self, nome, directory, colunas=None, filtros=None, esquema=None):
+        caminho = directory / nome
+        if not caminho.exists():
+            raise FileNotFoundError(f"Dataset Parquet {caminho} não encontrado")
+        filtros = list(filtros or [])
+        # Sem filtro de snapshot, catálogos retornam apenas o snapshot mais recente
+        particoes = PARTICOES.get(esquema or nome)
+        if particoes is not None and 'data_extracao' in particoes.names and not any(f[0] == 'data_extracao' for f in filtros):
+            snapshots = listar_snapshots(nome, directory)
+            if snapshots:
+                filtros.append(('data_extracao', '=', snapshots[-1]))
+        particionamento = ds.partitioning(particoes, flavor='hive') if particoes is not None else 'hive'
+        tabela = pq.read_table(caminho, columns=colunas, filters=filtros or None, partitioning=particionamento)
+        return tabela.to_pandas(types_mapper=TIPOS_PANDAS.get)
+
+    def iter_lotes(self, nome, directory, tamanho_lote, colunas=None, esquema=None):
+        caminho = directory / nome
+        if not caminho.exists():
+            raise FileNotFoundError(f"Dataset Parquet {caminho} não encontrado")
+        particoes = PARTICOES.get(esquema or nome)
+        particionamento = ds.partitioning(particoes, flavor='hive') if particoes is not None else 'hive'
+        dataset = ds.dataset(caminho, format='parquet', partitioning=particionamento)
+        # Lotes são lidos sob demanda: só um lote (mais o read-ahead do Arrow) fica em memória
+        for batch in dataset.to_batches(columns=colunas, batch_size=tamanho_lote):
+            if batch.num_rows:
+                yield batch.to_pandas(types_mapper=TIPOS_PANDAS.get)
+
+    def salvar_lote(self, df, nome, directory, esquema=None, lote=0, schema=None):
+        """
+        Acrescenta um lote ao dataset particionado sem apagar os arquivos já gravados.
+        O schema Arrow do primeiro lote (retornado) deve ser passado aos lotes seguintes,
+        para que todos os arquivos do dataset tenham os mesmos tipos.
+
+        Returns:
+            Schema Arrow usado na gravação
+        """
+        esquema = esquema or nome
+        df = aplicar_esquema(df.copy(deep=False), esquema)
+        particoes = _colunas_particao(df, esquema)
+        if schema is not None:
+            df = df.reindex(columns=schema.names)
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        if schema is None:
+            schema = pa.schema([_campo_estavel(f) for f in tabela.schema], metadata=tabela.schema.metadata)
+        pq.write_to_dataset(
+            tabela.cast(schema), root_path=directory / nome, partition_cols=particoes or None,
+            existing_data_behavior='overwrite_or_ignore', basename_template=f"lote-{lote:05d}-{{i}}.parquet",
+        )
+        return schema
+
+BACKENDS = {
+    'csv': CsvStorage(),
+    'parquet': ParquetStorage(),
+}
+
+# 4. Funções de acesso ao armazenamento
+def registrar_backend(formato, backend):
+    """
+    Registra um novo backend de armazenamento.
+
+    Args:
+        formato: Nome do formato (usado em salvar_dataset/ler_dataset)
+        backend: Objeto com os métodos salvar(df, nome, directory, esquema), ler(nome, directory, colunas, filtros, esquema)
+                 e iter_lotes(nome, directory, tamanho_lote, colunas, esquema)
+    """
+    BACKENDS[formato] = backend
+
+def iter_dataset(nome, camada='raw', tamanho_lote=100_000, colunas=None, formato=None, esquema=None):
+    """
+    Lê um dataset salvo em lotes de tamanho limitado, sem carregá-lo inteiro na memória.
+
+    Args:
+        nome: Nome do dataset
+        camada: 'raw' ou 'processed'
+        tamanho_lote: Número máximo de registros por lote
+        colunas: Lista de colunas a carregar (None = todas)
+        formato: 'parquet' ou 'csv' (None = FORMATO_ARMAZENAMENTO)
+        esquema: Esquema do dataset (None = mesmo nome do dataset)
+    Yields:
+        DataFrame com até tamanho_lote registros, com os tipos do esquema
+    """
+    formato = formato or FORMATO_ARMAZENAMENTO
+    yield from BACKENDS[formato].iter_lotes(nome, CAMADAS[camada], tamanho_lote, colunas=colunas, esquema=esquema)
+
+def listar_snapshots(nome, directory=CAMADAS['raw']):
+    """Retorna as datas de extração (YYYY-MM-DD) disponíveis para um catálogo Parquet, em ordem."""
+    caminho = Path(directory) / nome
+    return sorted(p.name.split('=', 1)[1] for p in caminho.glob('data_extracao=*'))
+
+def listar_particoes(nome, directory=CAMADAS['raw']):
+    """
+    Retorna os diretórios das partições de um dataset Parquet (ex.: contratos/ano=2024/trimestre=1),
+    em ordem. Cada partição pode ser lida de forma independente com ler_particao.
+    """
+    caminho = Path(directory) / nome
+    return sorted({arquivo.parent for arquivo in caminho.rglob('*.parquet')})
+
+def ler_particao(caminho, esquema, colunas=None):
+    """
+    Lê uma única partição Parquet com os tipos do esquema. As colunas de partição
+    não são incluídas (estão no caminho) e podem ser recriadas a partir dos dados.
+    """
+    tabela = pq.read_table(caminho, columns=colunas, partitioning=None)
+    return aplicar_esquema(tabela.to_pandas(types_mapper=TIPOS_PANDAS.get), esquema)
+
+def remover_snapshots(nome, manter, directory=CAMADAS['raw']):
+    """
+    Remove os snapshots Parquet mais antigos de um catálogo, mantendo os `manter` mais recentes.
+
+    Returns:
+        Lista das datas removidas
+    """
+    removidos = listar_snapshots(nome, directory)[:-manter] if manter > 0 else []
+    for data in removidos:
+        shutil.rmtree(Path(directory) / nome / f"data_extracao={data}")
+    if removidos:
+        logging.info(f"{len(removidos)} snapshots antigos de {nome} removidos (mantidos {manter})")
+    return removidos
+
+def salvar_dataset(df, nome, camada='raw', formato=None, esquema=None):
+    """
+    Salva um DataFrame na camada informada usando o backend configurado.
+
+    Args:
+        df: DataFrame a ser salvo
+        nome: Nome do dataset (ex.: 'contratos', 'orgao', 'contratos_limpos')
+        camada: 'raw' ou 'processed'
+        formato: 'parquet' ou 'csv' (None = FORMATO_ARMAZENAMENTO)
+        esquema: Esquema a aplicar (None = mesmo nome do dataset)
+    Returns:
+        Path do arquivo ou diretório salvo
+    """
+    formato = formato or FORMATO_ARMAZENAMENTO
+    caminho = BACKENDS[formato].salvar(df, nome, CAMADAS[camada], esquema=esquema)
+    logging.info(f"Dados salvos em {caminho} ({len(df)} registros, {formato})")
+    return caminho
+
+def ler_dataset(nome, camada='raw', colunas=None, filtros=None, formato=None, esquema=None):
+    """
+    Lê um dataset salvo, com projeção de colunas e filtros.
+
+    Args:
+        nome: Nome do dataset
+        camada: 'raw' ou 'processed'
+        colunas: Lista de colunas a carregar (None = todas)
+        filtros: Lista de tuplas (coluna, operador, valor), combinadas com AND.
+                 Ex.: [('ano', '=', 2024), ('trimestre', 'in', [1, 2])]
+        formato: 'parquet' ou 'csv' (None = FORMATO_ARMAZENAMENTO)
+        esquema: Esquema do dataset (None = mesmo nome do dataset)
+    Returns:
+        DataFrame com os dados lidos
+    """
+    formato = formato or FORMATO_ARMAZENAMENTO
+    return BACKENDS[formato].ler(nome, CAMADAS[camada], colunas=colunas, filtros=filtros, esquema=esquema)
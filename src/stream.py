@@ -0,0 +1,189 @@
+import logging
+import os
+import shutil
+from contextlib import ExitStack
+from datetime import datetime
+import pandas as pd
+from extract import data_dir
+from storage import BACKENDS, CAMADAS
+
+TAMANHO_LOTE = 5000  # Registros por lote ao consumir uma extração em streaming
+
+# 1. Função para agrupar páginas em lotes
+def agrupar_em_lotes(paginas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Agrupa as páginas geradas por iter_data/iter_* em DataFrames de tamanho limitado.
+
+    Args:
+        paginas: Iterável de listas de dicionários (uma lista por página)
+        tamanho_lote: Número máximo de registros por lote
+    Yields:
+        DataFrame com até tamanho_lote registros
+    """
+    buffer = []
+    for pagina in paginas:
+        buffer.extend(pagina)
+        while len(buffer) >= tamanho_lote:
+            yield pd.DataFrame(buffer[:tamanho_lote])
+            del buffer[:tamanho_lote]
+    if buffer:
+        yield pd.DataFrame(buffer)
+
+# 2. Função para aplicar uma transformação lote a lote
+def transformar_lotes(lotes, funcao):
+    """
+    Aplica uma transformação a cada lote, sem materializar o conjunto completo.
+
+    Args:
+        lotes: Iterável de DataFrames
+        funcao: Função que recebe e retorna um DataFrame
+                (ex.: functools.partial(transform_contratos, save=False))
+    Yields:
+        DataFrame transformado
+    """
+    for lote in lotes:
+        yield funcao(lote)
+
+# 3. Sink que grava os lotes em um único CSV
+class CsvSink:
+    """
+    Grava lotes de forma incremental em um CSV. O arquivo é escrito como
+    <nome>.csv.part e só ganha o nome final quando o sink é fechado com sucesso.
+    As colunas do primeiro lote definem o cabeçalho; lotes seguintes são alinhados a ele.
+
+    Qualquer objeto com os métodos escrever(lote) e fechar() pode ser usado como sink.
+
+    Args:
+        filename: Nome do arquivo CSV
+        directory: Diretório onde o arquivo será salvo
+    """
+
+    def __init__(self, filename, directory=data_dir):
+        if not filename.endswith(".csv"):
+            filename += ".csv"
+        directory.mkdir(parents=True, exist_ok=True)
+        self.file_path = directory / filename
+        self._temporario = self.file_path.with_name(self.file_path.name + '.part')
+        self.colunas = None
+        self.registros = 0
+
+    def escrever(self, lote):
+        if self.colunas is None:
+            self.colunas = list(lote.columns)
+            lote.to_csv(self._temporario, index=False, encoding='utf-8')
+        else:
+            extras = set(lote.columns) - set(self.colunas)
+            if extras:
+                logging.warning(f"Colunas ignoradas em {self.file_path.name}: {', '.join(sorted(extras))}")
+            lote.reindex(columns=self.colunas).to_csv(self._temporario, mode='a', header=False, index=False, encoding='utf-8')
+        self.registros += len(lote)
+
+    def fechar(self):
+        if self.colunas is None:
+            logging.warning(f"Nenhum dado para salvar em {self.file_path.name}")
+            return
+        os.replace(self._temporario, self.file_path)
+        logging.info(f"Dados salvos em {self.file_path} ({self.registros} registros)")
+
+    def abortar(self):
+        """Descarta o arquivo parcial."""
+        if self._temporario.exists():
+            self._temporario.unlink()
+
+# 3.1. Sink que grava os lotes em um dataset Parquet particionado
+class ParquetSink:
+    """
+    Grava lotes de forma incremental em um dataset Parquet particionado (mesmo layout
+    de storage.ParquetStorage). Os arquivos são escritos em <nome>.part/ e o dataset
+    anterior só é substituído quando o sink é fechado com sucesso. Lotes gravados
+    por outros processos em nome_temporario são contabilizados com registrar().
+
+    Args:
+        nome: Nome do dataset (ex.: 'contratos_limpos')
+        camada: 'raw' ou 'processed'
+        esquema: Esquema de tipos e partições (None = mesmo nome do dataset)
+    """
+
+    def __init__(self, nome, camada='processed', esquema=None):
+        self.directory = CAMADAS[camada]
+        self.caminho = self.directory / nome
+        self.esquema = esquema or nome
+        self.nome_temporario = f"{nome}.part"
+        self._schema = None
+        self.lotes = 0
+        self.registros = 0
+        shutil.rmtree(self.directory / self.nome_temporario, ignore_errors=True)
+
+    def escrever(self, lote):
+        self._schema = BACKENDS['parquet'].salvar_lote(
+            lote, self.nome_temporario, self.directory, esquema=self.esquema, lote=self.lotes, schema=self._schema
+        )
+        self.lotes += 1
+        self.registros += len(lote)
+
+    def registrar(self, registros):
+        """Contabiliza um lote gravado diretamente em nome_temporario (ex.: por outro processo)."""
+        self.lotes += 1
+        self.registros += registros
+
+    def fechar(self):
+        if not self.lotes:
+            logging.warning(f"Nenhum dado para salvar em {self.caminho}")
+            return
+        antigo = self.caminho.with_name(self.caminho.name + '.old')
+        if self.caminho.exists():
+            os.replace(self.caminho, antigo)
+        os.replace(self.directory / self.nome_temporario, self.caminho)
+        shutil.rmtree(antigo, ignore_errors=True)
+        logging.info(f"Dados salvos em {self.caminho} ({self.registros} registros, {self.lotes} lotes)")
+
+    def abortar(self):
+        """Descarta os arquivos parciais."""
+        shutil.rmtree(self.directory / self.nome_temporario, ignore_errors=True)
+
+# 4. Função para consumir um stream de lotes em um ou mais sinks
+def consumir(lotes, *sinks):
+    """
+    Consome os lotes entregando cada um a todos os sinks, na ordem informada.
+    Os sinks são fechados ao final; em caso de erro, os que tiverem abortar() descartam a saída parcial.
+
+    Args:
+        lotes: Iterável de DataFrames
+        sinks: Objetos com escrever(lote) e fechar()
+    Returns:
+        Número total de registros consumidos
+    """
+    total = 0
+    with ExitStack() as stack:
+        for sink in sinks:
+            if hasattr(sink, 'abortar'):
+                stack.callback(sink.abortar)
+        for lote in lotes:
+            for sink in sinks:
+                sink.escrever(lote)
+            total += len(lote)
+        for sink in sinks:
+            sink.fechar()
+        stack.pop_all()
+    return total
+
+# 5. Função de conveniência: extração em streaming direto para CSV
+def salvar_stream_csv(paginas, prefixo, directory=data_dir, tamanho_lote=TAMANHO_LOTE, transformacao=None):
+    """
+    Grava uma extração em streaming em <prefixo>_YYYY-MM-DD.csv, lote a lote.
+
+    Args:
+        paginas: Iterável de páginas (ex.: iter_orgao(url, endpoint_orgao))
+        prefixo: Prefixo do nome do arquivo
+        directory: Diretório onde o arquivo será salvo
+        tamanho_lote: Número máximo de registros por lote
+        transformacao: Função opcional aplicada a cada lote antes da gravação
+    Returns:
+        Path do arquivo salvo
+    """
+    lotes = agrupar_em_lotes(paginas, tamanho_lote)
+    if transformacao is not None:
+        lotes = transformar_lotes(lotes, transformacao)
+    sink = CsvSink(f"{prefixo}_{datetime.now().strftime('%Y-%m-%d')}.csv", directory)
+    consumir(lotes, sink)
+    return sink.file_path
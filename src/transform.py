@@ -1,50 +1,410 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
+from deduplicacao import (COLUNA_ANO, COLUNA_VERSAO, COLUNAS_IDENTIDADE, chave_contrato, marcar_duplicatas_contratos,
+                          versao_contrato, versoes_mais_recentes)
+from documentos import analisar_documentos, normalizar_documentos
+from schemas import aplicar_esquema
+from storage import BACKENDS, CAMADAS, FORMATO_ARMAZENAMENTO, iter_dataset, ler_particao, listar_particoes, salvar_dataset
+from stream import CsvSink, ParquetSink, consumir
 
 processed_dir = Path('data/processed')
 processed_dir.mkdir(parents=True, exist_ok=True)
+reference_dir = Path('data/reference')
+
+# REGRAS DE LIMPEZA DE CONTRATOS (análise em notebooks/transform_contratos.ipynb)
+# Colunas com alta proporção de nulos ou pouca informação
+COLUNAS_DESCARTADAS = [
+    'numeroControlePncpContrato',
+    'dataHoraExclusao',
+    'totalDespesasAcessorias',
+    'nomeSubcategoria',
+    'codigoSubcategoria',
+    'unidadesRequisitantes',
+    'valorAcumulado',
+    'nomeTipo',
+    'codigoTipo',
+]
+# Colunas de texto padronizadas (strip + title). Códigos e números não entram.
+# As categóricas têm poucos valores distintos: viram category e só as categorias são padronizadas.
+COLUNAS_CATEGORICAS = [
+    'nomeOrgao',
+    'nomeUnidadeGestora',
+    'nomeUnidadeGestoraOrigemContrato',
+    'nomeUnidadeRealizadoraCompra',
+    'nomeModalidadeCompra',
+    'nomeCategoria',
+    'receitaDespesa',
+]
+COLUNAS_TEXTO_LIVRE = [
+    'nomeRazaoSocialFornecedor',
+    'objeto',
+    'informacoesComplementares',
+]
+COLUNAS_VIGENCIA = ['dataVigenciaInicial', 'dataVigenciaFinal']
+COLUNAS_OUTLIER = ['valorGlobal', 'valorParcela']
+FATOR_IQR = 3  # Valores fora de [Q1 - 3*IQR, Q3 + 3*IQR] são marcados como outliers
+MODALIDADE_SEM_COMPRA = 'Não se Aplica'
+MODALIDADES_VIGENCIA_OBRIGATORIA = ['Dispensa', 'Pregão']
+# CPF/CNPJ dos catálogos: normalizados com zeros à esquerda; inválidos (ex.: '0' = sem vínculo) viram nulo
+COLUNAS_DOCUMENTO = {
+    'uasg': ['cnpjCpfUasg', 'cnpjCpfOrgao', 'cnpjCpfOrgaoVinculado', 'cnpjCpfOrgaoSuperior'],
+    'orgao': ['cnpjCpfOrgao', 'cnpjCpfOrgaoVinculado', 'cnpjCpfOrgaoSuperior'],
+}
 
-def save_processed_data(df, filename):
+# TRANSFORMAÇÃO EM LOTES E EM PARALELO (volumes de vários anos)
+TAMANHO_LOTE_TRANSFORMACAO = 100_000  # Registros por lote: define o pico de memória
+AMOSTRA_QUANTIS = 1_000_000  # Valores amostrados por coluna para os quartis (exatos abaixo disso)
+PROCESSOS_TRANSFORMACAO = None  # Processos do modo paralelo (None = número de núcleos)
+
+def save_processed_data(df, filename, esquema=None):
     """
-    Salva o DataFrame processado em um arquivo CSV.
+    Salva o DataFrame processado no formato configurado em storage.FORMATO_ARMAZENAMENTO
+    (Parquet particionado ou CSV).
     Args:
         df (pd.DataFrame): DataFrame a ser salvo.
-        filename (str): Nome do arquivo CSV (sem extensão)
+        filename (str): Nome do dataset (sem extensão)
+        esquema (str): Esquema de tipos do dataset ('contratos', 'uasg' ou 'orgao')
 
     Returns:
         Path do arquivo salvo.
     """
 
-    timestamp = datetime.now().strftime('%Y-%m-%d')
-    file_path = processed_dir / f"{filename}_{timestamp}.csv"
-
-    df.to_csv(file_path, index=False, encoding='utf-8')
+    file_path = salvar_dataset(df, filename, camada='processed', esquema=esquema)
     print(f"Dados processados salvos em: {file_path} ({len(df)} registros)")
 
     return file_path
 
+# 1. Funções vetorizadas de padronização de texto
+def _padronizar_categoria(serie):
+    """
+    Converte para category e aplica strip + title apenas nos valores distintos.
+    Valores que ficam iguais após a padronização são unificados na mesma categoria.
+    """
+    codigos, valores = pd.factorize(serie)
+    padronizados = pd.Index(valores, dtype='object').str.strip().str.title()
+    categorias = padronizados.unique()
+    novos_codigos = categorias.get_indexer(padronizados)
+    codigos = np.where(codigos >= 0, novos_codigos[codigos], -1)
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=categorias), index=serie.index, name=serie.name)
+
+def _padronizar_texto_livre(serie):
+    """Aplica strip + title com os kernels do Arrow (sem loop Python por linha)."""
+    return serie.astype('string[pyarrow]').str.strip().str.title()
+
+def _preencher_fornecedores(df, arquivo=None):
+    """
+    Preenche nomeRazaoSocialFornecedor nulo a partir da referência preenchida manualmente
+    (data/reference/fornecedores_para_completar.csv). Os dois lados são comparados com
+    os documentos normalizados (CPFs e CNPJs sem pontuação e com zeros à esquerda).
+    """
+    arquivo = arquivo or reference_dir / 'fornecedores_para_completar.csv'
+    if 'nomeRazaoSocialFornecedor' not in df.columns or not arquivo.exists():
+        return
+    referencia = pd.read_csv(arquivo, sep=';', dtype='string', encoding='utf-8').dropna()
+    referencia['niFornecedor'] = normalizar_documentos(referencia['niFornecedor'], manter_invalidos=True)
+    mapeamento = referencia.drop_duplicates('niFornecedor').set_index('niFornecedor')['nomeRazaoSocialFornecedor']
+
+    nulos = df['nomeRazaoSocialFornecedor'].isna()
+    if nulos.any():
+        ni_df = normalizar_documentos(df.loc[nulos, 'niFornecedor'], manter_invalidos=True)
+        df.loc[nulos, 'nomeRazaoSocialFornecedor'] = ni_df.map(mapeamento)
+
+def _coluna_opcional(df, col):
+    """Coluna do DataFrame, ou uma coluna só de nulos quando a página da API não trouxe o campo."""
+    if col in df.columns:
+        return df[col]
+    return pd.Series(np.nan, index=df.index, dtype='category')
+
+# 2. Regras de limpeza de contratos
+def limpar_contratos(df):
+    """
+    Aplica as regras de limpeza que dependem apenas de cada linha: descarte de colunas,
+    tipos do esquema, vigência sem hora, CPF/CNPJ do fornecedor normalizado e validado,
+    preenchimento de fornecedores, padronização de texto e flags de consistência. Todas as operações são vetorizadas e feitas no lugar.
+
+    Args:
+        df: DataFrame de contratos brutos (modificado no lugar)
+    Returns:
+        O próprio DataFrame, limpo
+    """
+    df.drop(columns=[c for c in COLUNAS_DESCARTADAS if c in df.columns], inplace=True)
+    aplicar_esquema(df, 'contratos')
+    for col in COLUNAS_VIGENCIA:
+        if col in df.columns:
+            df[col] = df[col].dt.normalize()
+    if 'niFornecedor' in df.columns:
+        documentos = analisar_documentos(df['niFornecedor'])
+        df['niFornecedor'] = documentos['documento']
+        df['flag_fornecedor_invalido'] = df['niFornecedor'].notna() & ~documentos['valido']
+
+    _preencher_fornecedores(df)
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = _padronizar_categoria(df[col])
+    for col in COLUNAS_TEXTO_LIVRE:
+        if col in df.columns:
+            df[col] = _padronizar_texto_livre(df[col])
+
+    # Flags calculadas sobre os valores já padronizados; campo ausente conta como nulo
+    modalidade = _coluna_opcional(df, 'nomeModalidadeCompra')
+    sem_compra = modalidade == MODALIDADE_SEM_COMPRA.title()
+    df['flag_inconsistencia_compra'] = sem_compra & (_coluna_opcional(df, 'numeroCompra').notna()
+                                                     | _coluna_opcional(df, 'nomeUnidadeRealizadoraCompra').notna())
+    df['flag_vigencia_final_nula'] = _coluna_opcional(df, 'dataVigenciaFinal').isna()
+    obrigatoria = modalidade.isin([m.title() for m in MODALIDADES_VIGENCIA_OBRIGATORIA])
+    df['flag_vigencia_obrigatoria_ausente'] = df['flag_vigencia_final_nula'] & obrigatoria
+    for col in COLUNAS_OUTLIER:
+        if col in df.columns:
+            df[f'flag_{col}_negativo'] = df[col] < 0
+    return df
+
+def calcular_limites_iqr(df, colunas=COLUNAS_OUTLIER, fator=FATOR_IQR):
+    """
+    Calcula os limites da regra IQR de cada coluna numérica.
+
+    Returns:
+        Dicionário {coluna: (limite_inferior, limite_superior)}
+    """
+    colunas = [c for c in colunas if c in df.columns]
+    quartis = df[colunas].quantile([0.25, 0.75])
+    limites = {}
+    for col in colunas:
+        q1, q3 = quartis.at[0.25, col], quartis.at[0.75, col]
+        limites[col] = (q1 - fator * (q3 - q1), q3 + fator * (q3 - q1))
+    return limites
+
+def marcar_outliers(df, limites):
+    """Cria flag_<coluna>_outlier para os valores fora dos limites IQR (nulos não são outliers)."""
+    for col, (inferior, superior) in limites.items():
+        df[f'flag_{col}_outlier'] = (df[col] < inferior) | (df[col] > superior)
+    return df
+
+def calcular_limites_iqr_em_lotes(lotes, colunas=COLUNAS_OUTLIER, fator=FATOR_IQR,
+                                  tamanho_amostra=AMOSTRA_QUANTIS, seed=0):
+    """
+    Calcula os limites IQR percorrendo o dataset em lotes (primeira passada).
+    Cada coluna mantém uma amostra uniforme de até tamanho_amostra valores
+    (reservatório por prioridades aleatórias), então a memória não cresce com o
+    dataset; com menos valores que isso, os quartis são exatos.
+
+    Args:
+        lotes: Iterável de DataFrames com as colunas numéricas
+    Returns:
+        Dicionário {coluna: (limite_inferior, limite_superior)}
+    """
+    rng = np.random.default_rng(seed)
+    amostras = {}
+    for lote in lotes:
+        for col in colunas:
+            if col not in lote.columns:
+                continue
+            valores = lote[col].dropna().to_numpy(dtype='float64')
+            anteriores, prioridades = amostras.get(col, (np.empty(0), np.empty(0)))
+            valores = np.concatenate([anteriores, valores])
+            prioridades = np.concatenate([prioridades, rng.random(len(valores) - len(anteriores))])
+            if len(valores) > tamanho_amostra:
+                manter = np.argpartition(prioridades, tamanho_amostra)[:tamanho_amostra]
+                valores, prioridades = valores[manter], prioridades[manter]
+            amostras[col] = (valores, prioridades)
+
+    limites = {}
+    for col, (valores, _) in amostras.items():
+        if len(valores):
+            q1, q3 = np.quantile(valores, [0.25, 0.75])
+            limites[col] = (q1 - fator * (q3 - q1), q3 + fator * (q3 - q1))
+    return limites
+
+def _registrar_versao(lote, chaves, versoes):
+    chaves.append(chave_contrato(lote))
+    versoes.append(versao_contrato(lote))
+    return lote
 
+def _primeira_passada(lotes):
+    """
+    Primeira passada dos modos em lotes e paralelo, sobre as colunas de valor, de identidade
+    e dataHoraInclusao: uma só leitura alimenta os quartis (calcular_limites_iqr_em_lotes)
+    e guarda chave e versão de cada lote (16 bytes por linha), descartadas ao final.
+
+    Args:
+        lotes: Iterável de DataFrames de contratos brutos, na ordem da segunda passada
+    Returns:
+        Tupla (limites IQR, array booleano de versões mantidas do dataset inteiro,
+        lista com o número de linhas de cada lote)
+    """
+    chaves, versoes = [], []
+    limites = calcular_limites_iqr_em_lotes(_registrar_versao(lote, chaves, versoes) for lote in lotes)
+    return limites, versoes_mais_recentes(chaves, versoes), [len(chave) for chave in chaves]
+
+# 3. Funções de transformação por dataset
 def transform_contratos(df_contratos, save=True):
-    # Copia do DataFrame para evitar modificar o original
-    df = df_contratos.copy()
+    """
+    Limpa os contratos em uma única passada vetorizada (regras de notebooks/transform_contratos.ipynb):
+    colunas descartadas, tipos, padronização de texto, categorias, preenchimento de
+    fornecedores e flags de inconsistência, vigência, valores negativos, outliers (IQR)
+    e duplicatas (versões antigas do mesmo contrato, ver deduplicacao.py). Para evitar
+    dobrar a memória, o DataFrame recebido é modificado no lugar.
 
+    Args:
+        df_contratos: DataFrame de contratos brutos (modificado no lugar)
+        save: Se True, salva o resultado em data/processed
+    Returns:
+        DataFrame com os contratos limpos
+    """
+    df = limpar_contratos(df_contratos)
+    marcar_outliers(df, calcular_limites_iqr(df))
+    marcar_duplicatas_contratos(df)
+
+    logging.info(f"Contratos limpos: {len(df)} registros, {int(df['flag_duplicata'].sum())} duplicatas, "
+                 f"{int(df['flag_inconsistencia_compra'].sum())} inconsistências de compra")
     if save:
-        save_processed_data(df, 'contratos_limpos')
+        save_processed_data(df, 'contratos_limpos', esquema='contratos')
     return df
 
+def transform_contratos_em_lotes(origem='contratos', destino='contratos_limpos',
+                                 tamanho_lote=TAMANHO_LOTE_TRANSFORMACAO, formato=None):
+    """
+    Versão fora da memória de transform_contratos: lê os contratos brutos em lotes,
+    aplica as mesmas regras e grava cada lote em data/processed assim que fica pronto.
+    O pico de memória depende de tamanho_lote, não do tamanho do dataset.
+
+    As etapas que dependem do conjunto inteiro são tratadas em duas passadas:
+    1. Lê apenas as colunas de valor, de identidade e dataHoraInclusao, calcula os limites
+       IQR (calcular_limites_iqr_em_lotes) e qual linha é a versão mais recente de cada
+       contrato (versoes_mais_recentes);
+    2. Limpa cada lote, marca outliers com os limites globais e marca como duplicata
+       toda linha que não é a versão mais recente do contrato.
+
+    Args:
+        origem: Dataset de contratos brutos em data/raw
+        destino: Dataset de saída em data/processed
+        tamanho_lote: Número máximo de registros por lote
+        formato: 'parquet' ou 'csv' (None = FORMATO_ARMAZENAMENTO), para leitura e gravação
+    Returns:
+        Número de contratos processados
+    """
+    formato = formato or FORMATO_ARMAZENAMENTO
+    logging.info(f"Transformação em lotes de {origem}: calculando limites de outliers e versões dos contratos...")
+    colunas = COLUNAS_OUTLIER + COLUNAS_IDENTIDADE + [COLUNA_ANO, COLUNA_VERSAO]
+    limites, mantidas, _ = _primeira_passada(
+        iter_dataset(origem, tamanho_lote=tamanho_lote, colunas=colunas, formato=formato, esquema='contratos')
+    )
+
+    def lotes_limpos():
+        inicio = 0
+        for i, lote in enumerate(iter_dataset(origem, tamanho_lote=tamanho_lote, formato=formato, esquema='contratos'), 1):
+            limpar_contratos(lote)
+            marcar_outliers(lote, limites)
+            # A segunda leitura percorre o dataset na mesma ordem da primeira
+            lote['flag_duplicata'] = ~mantidas[inicio:inicio + len(lote)]
+            inicio += len(lote)
+            logging.info(f"Lote {i}: {len(lote)} contratos limpos ({int(lote['flag_duplicata'].sum())} duplicatas)")
+            yield lote
+
+    if formato == 'parquet':
+        sink = ParquetSink(destino, camada='processed', esquema='contratos')
+    else:
+        sink = CsvSink(f"{destino}_{datetime.now().strftime('%Y-%m-%d')}.csv", CAMADAS['processed'])
+    total = consumir(lotes_limpos(), sink)
+    logging.info(f"Transformação em lotes concluída: {total} contratos")
+    return total
+
+def _transformar_particao(caminho, destino, indice, limites, mantidas):
+    """
+    Executada em um processo do pool: lê uma partição dos contratos brutos, aplica as
+    regras de limpeza e grava o resultado direto em data/processed/<destino>.
+    Só as contagens voltam ao processo principal; o DataFrame nunca é serializado.
+
+    Args:
+        mantidas: Array booleano com uma posição por linha da partição (True = versão mais
+            recente do contrato no dataset inteiro)
+    Returns:
+        Tupla (registros, duplicatas)
+    """
+    df = limpar_contratos(ler_particao(caminho, 'contratos'))
+    marcar_outliers(df, limites)
+    df['flag_duplicata'] = ~mantidas
+    BACKENDS['parquet'].salvar_lote(df, destino, CAMADAS['processed'], esquema='contratos', lote=indice)
+    return len(df), int(df['flag_duplicata'].sum())
+
+def transform_contratos_paralelo(origem='contratos', destino='contratos_limpos', processos=PROCESSOS_TRANSFORMACAO):
+    """
+    Versão multiprocesso de transform_contratos para contratos brutos em Parquet
+    particionado (ano/trimestre). Cada partição é limpa em um processo separado,
+    que lê e grava seus próprios arquivos; o processo principal só distribui o
+    trabalho e recebe as contagens.
+
+    O que depende do dataset inteiro é calculado antes, no processo principal, em uma
+    leitura só das colunas de valor, de identidade e dataHoraInclusao de cada partição:
+    os limites IQR e qual linha é a versão mais recente de cada contrato
+    (versoes_mais_recentes). Cada processo recebe os limites e o array de versões
+    mantidas da sua partição, então um contrato reenviado com a vigência em outro
+    trimestre também é marcado, e as flags são as mesmas da versão em memória. Cada
+    partição grava arquivos com o índice dela no nome, e o dataset final é lido na
+    ordem das partições, independentemente de qual processo terminou primeiro.
+
+    Args:
+        origem: Dataset de contratos brutos em data/raw (Parquet)
+        destino: Dataset de saída em data/processed
+        processos: Número de processos (None = número de núcleos)
+    Returns:
+        Número de contratos processados
+    """
+    particoes = listar_particoes(origem, CAMADAS['raw'])
+    if not particoes:
+        raise FileNotFoundError(f"Nenhuma partição Parquet de {origem} em {CAMADAS['raw']}")
+    processos = min(processos or os.cpu_count() or 1, len(particoes))
+    logging.info(f"Transformação paralela de {origem}: {len(particoes)} partições em {processos} processos")
+    colunas = COLUNAS_OUTLIER + COLUNAS_IDENTIDADE + [COLUNA_ANO, COLUNA_VERSAO]
+    # Uma partição por lote, na ordem das partições
+    limites, mantidas, tamanhos = _primeira_passada(
+        ler_particao(caminho, 'contratos', colunas=colunas) for caminho in particoes
+    )
+    # Duplicatas entre partições: a versão mais recente vale para o dataset inteiro
+    mantidas = np.split(mantidas, np.cumsum(tamanhos)[:-1])
+
+    sink = ParquetSink(destino, camada='processed', esquema='contratos')
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = executor.map(_transformar_particao, particoes, repeat(sink.nome_temporario),
+                                      range(len(particoes)), repeat(limites), mantidas)
+            # map devolve os resultados na ordem das partições
+            for caminho, (registros, duplicatas) in zip(particoes, resultados):
+                sink.registrar(registros)
+                logging.info(f"Partição {caminho.relative_to(CAMADAS['raw'] / origem)}: "
+                             f"{registros} contratos limpos ({duplicatas} duplicatas)")
+    except BaseException:
+        sink.abortar()
+        raise
+    sink.fechar()
+    logging.info(f"Transformação paralela concluída: {sink.registros} contratos")
+    return sink.registros
+
+def _normalizar_documentos_catalogo(df, dataset):
+    """Normaliza as colunas de CPF/CNPJ do catálogo (COLUNAS_DOCUMENTO), no lugar."""
+    for col in COLUNAS_DOCUMENTO[dataset]:
+        if col in df.columns:
+            df[col] = normalizar_documentos(df[col])
+
 def transform_uasg(df_uasg, save=True):
     # Copia do DataFrame para evitar modificar o original
     df = df_uasg.copy()
+    _normalizar_documentos_catalogo(df, 'uasg')
 
     if save:
-        save_processed_data(df, 'uasg_limpos')
+        save_processed_data(df, 'uasg_limpos', esquema='uasg')
     return df
 
 def transform_orgao(df_orgao, save=True):
     # Copia do DataFrame para evitar modificar o original
     df = df_orgao.copy()
+    _normalizar_documentos_catalogo(df, 'orgao')
 
     if save:
-        save_processed_data(df, 'orgao_limpos')
-    return df
\ No newline at end of file
+        save_processed_data(df, 'orgao_limpos', esquema='orgao')
+    return df
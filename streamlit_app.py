@@ -0,0 +1,139 @@
+"""
+Dashboard de contratos governamentais.
+
+Usa apenas os cubos materializados de src/analysis.py (data/analysis/). Os contratos
+de um órgão só são lidos quando o detalhamento é aberto, e só com as colunas exibidas e
+a partição do ano escolhido. Os resultados ficam em caches de tamanho limitado, com o
+estado dos filtros e a versão dos cubos como chave.
+
+Uso:
+    python src/main.py           # gera data/processed/contratos_limpos e os cubos
+    streamlit run streamlit_app.py
+
+benchmarks/bench_dashboard.py mede, sem navegador, o tempo de abertura e de cada interação.
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'src'))
+import analysis  # noqa: E402
+from storage import ler_dataset  # noqa: E402
+
+# CACHE E DETALHAMENTO
+LIMITE_CONSULTAS = 256  # Resultados de consultas aos cubos mantidos em cache (um por combinação de filtros)
+LIMITE_DETALHES = 16  # Listas de contratos mantidas em cache (cada uma pode ter milhares de linhas)
+LINHAS_DETALHE = 500  # Máximo de contratos exibidos no detalhamento de um órgão
+COLUNAS_DETALHE = ['numeroContrato', 'nomeUnidadeGestora', 'nomeRazaoSocialFornecedor', 'niFornecedor',
+                   'objeto', 'nomeModalidadeCompra', 'dataVigenciaInicial', 'dataVigenciaFinal',
+                   'valorGlobal', 'flag_duplicata']
+TODOS = 'Todos'
+NIVEIS = {'Órgão superior': 'nomeOrgaoSuperior', 'Órgão': 'nomeOrgao', 'Esfera': 'esfera', 'Poder': 'poder'}
+
+
+# 1. Consultas com cache
+def versao_cubos():
+    """Muda a cada atualizar_cubos(): faz parte da chave dos caches."""
+    return analysis.arquivo_estado.stat().st_mtime_ns if analysis.arquivo_estado.exists() else None
+
+@st.cache_data(max_entries=LIMITE_CONSULTAS, show_spinner=False)
+def consulta(por, filtros, versao, ordenar_por='soma_valorGlobal', limite=None, cubo=None):
+    return analysis.consultar(por=list(por) or None, filtros=list(filtros) or None,
+                              ordenar_por=ordenar_por, limite=limite, cubo=cubo)
+
+@st.cache_data(max_entries=LIMITE_DETALHES, show_spinner=False)
+def contratos_do_orgao(codigo_orgao, filtros, versao):
+    """
+    Contratos de um órgão com os filtros ativos (os mesmos da linha agregada), lidos só quando
+    o detalhamento é aberto (projeção + filtro no Parquet). Atributos do órgão (esfera, poder)
+    não estão nos contratos: valem para o órgão inteiro e são conferidos no cubo.
+    """
+    do_orgao = tuple(f for f in filtros if f[0] in analysis.ATRIBUTOS_ORGAO)
+    if do_orgao and not consulta((), do_orgao + (('codigoOrgao', '=', codigo_orgao),), versao).iloc[0]['quantidade']:
+        return pd.DataFrame(columns=COLUNAS_DETALHE[:-1]), 0
+    filtros = [('codigoOrgao', '=', codigo_orgao)] + [(coluna, op, list(valor) if isinstance(valor, tuple) else valor)
+                                                      for coluna, op, valor in filtros if (coluna, op, valor) not in do_orgao]
+    df = ler_dataset('contratos_limpos', camada='processed', colunas=COLUNAS_DETALHE, filtros=filtros, esquema='contratos')
+    df = df[~df['flag_duplicata'].fillna(False).astype(bool)].drop(columns='flag_duplicata')
+    return df.nlargest(LINHAS_DETALHE, 'valorGlobal').reset_index(drop=True), len(df)
+
+@st.cache_data(max_entries=LIMITE_CONSULTAS, show_spinner=False)
+def maiores_fornecedores(ano, versao, limite=10):
+    return analysis.top_fornecedores(ano=ano, limite=limite)
+
+def opcoes(coluna, versao):
+    return sorted(consulta((coluna,), (), versao, ordenar_por=None)[coluna].dropna().tolist())
+
+def reais(valor):
+    return f"R$ {valor:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+# 2. Página
+st.set_page_config(page_title='Contratos Governamentais', layout='wide')
+inicio = time.perf_counter()
+versao = versao_cubos()
+if versao is None:
+    st.error("Cubos não encontrados em data/analysis/: execute `python src/main.py` antes de abrir o dashboard.")
+    st.stop()
+
+st.title('Contratos Governamentais')
+
+with st.sidebar:
+    st.header('Filtros')
+    anos = sorted(opcoes('ano', versao), reverse=True)
+    ano = st.selectbox('Ano (início da vigência)', [TODOS] + anos, key='ano')
+    esferas = st.multiselect('Esfera', opcoes('esfera', versao), key='esfera')
+    modalidades = st.multiselect('Modalidade de compra', opcoes('nomeModalidadeCompra', versao), key='modalidade')
+    nivel = NIVEIS[st.radio('Agrupar órgãos por', list(NIVEIS), key='nivel')]
+
+ano = None if ano == TODOS else int(ano)
+filtros = tuple(f for f in [('ano', '=', ano) if ano else None,
+                            ('esfera', 'in', tuple(esferas)) if esferas else None,
+                            ('nomeModalidadeCompra', 'in', tuple(modalidades)) if modalidades else None] if f)
+
+total = consulta((), filtros, versao).iloc[0]
+coluna1, coluna2, coluna3 = st.columns(3)
+coluna1.metric('Contratos', f"{int(total['quantidade']):,}".replace(',', '.'))
+coluna2.metric('Valor global', reais(total['soma_valorGlobal']))
+coluna3.metric('Valor médio', reais(total['media_valorGlobal']) if total['quantidade'] else '-')
+
+st.subheader('Valor contratado por trimestre')
+trimestres = consulta(('ano', 'trimestre'), filtros, versao, ordenar_por=None).sort_values(['ano', 'trimestre'])
+trimestres.index = trimestres['ano'].astype(str) + '-T' + trimestres['trimestre'].astype(str)
+st.bar_chart(trimestres['soma_valorGlobal'])
+
+esquerda, direita = st.columns(2)
+with esquerda:
+    st.subheader('Maiores órgãos')
+    orgaos = consulta((nivel,), filtros, versao, limite=15)
+    st.bar_chart(orgaos.set_index(nivel)['soma_valorGlobal'], horizontal=True)
+with direita:
+    st.subheader('Modalidades de compra')
+    st.dataframe(consulta(('nomeModalidadeCompra',), filtros, versao)[['nomeModalidadeCompra', 'quantidade', 'soma_valorGlobal', 'media_valorGlobal']],
+                 hide_index=True, width='stretch')
+
+st.subheader('Maiores fornecedores' + (f' em {ano}' if ano else ''))
+if esferas or modalidades:
+    st.caption('O cubo de fornecedores não tem esfera nem modalidade: só o filtro de ano se aplica.')
+st.dataframe(maiores_fornecedores(ano, versao), hide_index=True, width='stretch')
+
+# 3. Detalhamento: órgão superior -> órgão -> contratos, carregado só quando pedido
+st.subheader('Detalhamento')
+superior = st.selectbox('Órgão superior', opcoes('nomeOrgaoSuperior', versao), index=None,
+                        placeholder='Escolha um órgão superior', key='superior')
+if superior:
+    subordinados = consulta(('codigoOrgao', 'nomeOrgao'), filtros + (('nomeOrgaoSuperior', '=', superior),), versao)
+    st.dataframe(subordinados[['codigoOrgao', 'nomeOrgao', 'quantidade', 'soma_valorGlobal', 'max_valorGlobal']],
+                 hide_index=True, width='stretch')
+    nomes = dict(zip(subordinados['codigoOrgao'], subordinados['nomeOrgao']))
+    codigo = st.selectbox('Órgão', list(nomes), format_func=lambda c: f"{c} - {nomes[c]}", index=None,
+                          placeholder='Escolha um órgão', key='orgao')
+    if codigo and st.toggle('Ver contratos', key='contratos'):
+        contratos, quantidade = contratos_do_orgao(codigo, filtros, versao)
+        st.caption(f"{min(quantidade, LINHAS_DETALHE)} de {quantidade} contratos (maiores valores)")
+        st.dataframe(contratos, hide_index=True, width='stretch')
+
+st.caption(f"Página gerada em {(time.perf_counter() - inicio) * 1000:.0f} ms")